@@ -0,0 +1,301 @@
+"""Serve the name analytics over HTTP, as JSON or Arrow, without Streamlit reruns.
+
+    python bin/api_server.py --port 8600 --processes 4
+
+    GET /names/MARIE/evolution
+    GET /names/MARIE/departments?start=1990&end=2020
+    GET /top?start=2020&end=2020&k=3&sex=2
+    GET /peaks?start=1990&end=2020&min=6000&max=10000
+    GET /search?q=marie&limit=20
+    GET /names/MARIE/similar?n=10&method=dtw
+    GET /regional?name=MARIE&name=JEAN&start=1990&end=2020&n=3&by=location_quotient
+    GET /metrics
+
+Tables are answered as ``{"columns": [...], "data": [[...], ...]}``, or as an Arrow IPC
+stream with ``?format=arrow``. Queries and their serialization run on the IOLoop's
+thread pool, so a heavy request does not hold up the other clients of the process.
+Every process maps the indexes of the published dataset version and switches to a new
+version at the first request after a refresh; the processes forked by ``--processes``
+share the mapped pages, each exporting its own /metrics.
+"""
+
+import argparse
+import contextvars
+import logging
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+import tornado.ioloop
+import tornado.netutil
+import tornado.process
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+from namesviz import NameIndex, detect_recent_popularity, top_names_per_department
+from namesviz.charts import department_proportions
+from namesviz.instrument import METRICS, finish_profile, stage, start_profile
+from namesviz.regional import METRICS as REGIONAL_METRICS, RegionalProfile
+from namesviz.similarity import METHODS as SIMILARITY_METHODS
+from namesviz.versions import DatasetRegistry
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+# /regional answers one row per (name, department) cell: a request names at most
+# MAX_REGIONAL_NAMES names, or asks for the top n <= MAX_TOP_DEPARTMENTS of every name
+MAX_REGIONAL_NAMES = 100
+MAX_TOP_DEPARTMENTS = 10
+# Upper bounds of the other result sizes: names per department on /top, matches on
+# /search and neighbours on /similar
+MAX_TOP_NAMES = 100
+MAX_SEARCH_RESULTS = 500
+MAX_SIMILAR_NAMES = 100
+
+logger = logging.getLogger(__name__)
+
+
+class Dataset:
+    """The mapped indexes of one dataset version, with memoized range queries."""
+
+    def __init__(self, registry, version):
+        self.version = version
+        names = lru_cache(maxsize=1)(lambda: registry.load(version))
+        self.cube = registry.structure(version, 'cube', names)
+        self.range_index = registry.structure(version, 'year_range_index', names)
+        self.name_trends = registry.structure(version, 'name_trends', names)
+        self.ranking = registry.structure(version, 'ranking', names)
+        self.trajectories = registry.structure(version, 'trajectories', names)
+        self.name_index = NameIndex(self.ranking.names)
+        self.top_names = lru_cache(maxsize=256)(self._top_names)
+        self.peaks = lru_cache(maxsize=256)(self._peaks)
+
+    def _top_names(self, start_year, end_year, k, sex):
+        top = top_names_per_department(self.range_index.range_totals(start_year, end_year), k=k)
+        if sex is not None:
+            top = top[top['sexe'] == sex]
+        return top.assign(dpt=top['dpt'].astype(str), preusuel=top['preusuel'].astype(str)).reset_index(drop=True)
+
+    def _peaks(self, start_year, end_year, min_threshold, max_threshold):
+        popular_names, name_trends = detect_recent_popularity(self.name_trends, start_year, end_year, min_threshold,
+                                                              max_threshold)
+        return pd.DataFrame({
+            'preusuel': [name for name, _, _ in popular_names],
+            'annais': [[int(name_trends.index[p]) for p in peaks] for _, peaks, _ in popular_names],
+            'nombre': [[int(value) for value in values] for _, _, values in popular_names],
+        })
+
+
+class CurrentDataset:
+    """The dataset of the published version, reopened when the registry moves to a new one."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._dataset = None
+
+    def get(self):
+        version = self.registry.current()['version']
+        if self._dataset is None or self._dataset.version != version:
+            with stage('load'):
+                self._dataset = Dataset(self.registry, version)
+            logger.info("serving dataset version %s", version)
+        return self._dataset
+
+
+class QueryHandler(tornado.web.RequestHandler):
+    endpoint = None
+
+    def initialize(self, current):
+        self.current = current
+
+    def prepare(self):
+        start_profile(f"api_{self.endpoint}")
+        # One version per request, even if a refresh lands while it is answered
+        self.dataset = self.current.get()
+
+    def on_finish(self):
+        # One log line per request would drown the logs; the histograms keep the timings
+        finish_profile(log=False)
+
+    def int_argument(self, name, default=None, minimum=None, maximum=None):
+        """The integer argument ``name``, ``default`` if absent; 400 if it is not within [minimum, maximum]."""
+        value = self.get_argument(name, None)
+        if value is None or value == '':
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"'{name}' must be an integer")
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            bounds = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+            raise tornado.web.HTTPError(400, reason=f"'{name}' must be {bounds}")
+        return value
+
+    def year_range(self):
+        years = self.dataset.cube.years
+        return self.int_argument('start', int(years[0])), self.int_argument('end', int(years[-1]))
+
+    def sex_argument(self):
+        sex = self.int_argument('sex')
+        if sex not in (None, 1, 2):
+            raise tornado.web.HTTPError(400, reason="'sex' must be 1 or 2")
+        return sex
+
+    def name_argument(self, name):
+        if name not in self.dataset.cube.names:
+            raise tornado.web.HTTPError(404, reason=f"unknown name {name!r}")
+        return name
+
+    async def compute(self, func, *args):
+        """``func(*args)`` run on the IOLoop's thread pool, its stages counted in the request's profile."""
+        context = contextvars.copy_context()
+        return await tornado.ioloop.IOLoop.current().run_in_executor(None, context.run, func, *args)
+
+    async def write_frame(self, frame):
+        body, media_type = await self.compute(serialize, frame, self.get_argument('format', 'json'))
+        self.set_header('Content-Type', media_type)
+        self.set_header('X-Dataset-Version', str(self.dataset.version))
+        self.finish(body)
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({'error': self._reason})
+
+
+class EvolutionHandler(QueryHandler):
+    endpoint = 'evolution'
+
+    async def get(self, name):
+        await self.write_frame(await self.compute(self.dataset.cube.evolution, self.name_argument(name)))
+
+
+class DepartmentsHandler(QueryHandler):
+    endpoint = 'departments'
+
+    async def get(self, name):
+        frame = await self.compute(department_proportions, self.dataset.range_index, self.name_argument(name),
+                                   *self.year_range())
+        await self.write_frame(frame.assign(dpt=frame['dpt'].astype(str)))
+
+
+class TopHandler(QueryHandler):
+    endpoint = 'top'
+
+    async def get(self):
+        await self.write_frame(await self.compute(self.dataset.top_names, *self.year_range(),
+                                                  self.int_argument('k', 3, 1, MAX_TOP_NAMES), self.sex_argument()))
+
+
+class PeaksHandler(QueryHandler):
+    endpoint = 'peaks'
+
+    async def get(self):
+        await self.write_frame(await self.compute(self.dataset.peaks, *self.year_range(),
+                                                  self.int_argument('min', 6000), self.int_argument('max')))
+
+
+class SearchHandler(QueryHandler):
+    endpoint = 'search'
+
+    async def get(self):
+        await self.write_frame(await self.compute(self.search, self.get_argument('q'), *self.year_range(),
+                                                  self.int_argument('limit', 50, 1, MAX_SEARCH_RESULTS)))
+
+    def search(self, query, start_year, end_year, limit):
+        ranking = self.dataset.ranking
+        return self.dataset.name_index.search(query, ranking.counts(start_year, end_year),
+                                              ranking.ranks(start_year, end_year), limit=limit)
+
+
+class RegionalHandler(QueryHandler):
+    endpoint = 'regional'
+
+    async def get(self):
+        names = [self.name_argument(name) for name in self.get_arguments('name')] or None
+        if names is not None and len(names) > MAX_REGIONAL_NAMES:
+            raise tornado.web.HTTPError(400, reason=f"at most {MAX_REGIONAL_NAMES} 'name' per request")
+        top = self.int_argument('n', None, 1, MAX_TOP_DEPARTMENTS)
+        if names is None and top is None:
+            raise tornado.web.HTTPError(400, reason="'name' or 'n' is required")
+        sex = self.sex_argument()
+        by = self.get_argument('by', 'location_quotient')
+        if by not in REGIONAL_METRICS:
+            raise tornado.web.HTTPError(400, reason=f"'by' must be one of {', '.join(REGIONAL_METRICS)}")
+        await self.write_frame(await self.compute(self.regional, names, *self.year_range(), sex, top, by,
+                                                  self.int_argument('min_births', 1, 1)))
+
+    def regional(self, names, start_year, end_year, sex, top, by, min_births):
+        profile = RegionalProfile.from_index(self.dataset.range_index, start_year, end_year, names, sex)
+        return profile.top_departments(top, by, min_births) if top else profile.frame()
+
+
+class SimilarHandler(QueryHandler):
+    endpoint = 'similar'
+
+    async def get(self, name):
+        if name not in self.dataset.trajectories.names:
+            raise tornado.web.HTTPError(404, reason=f"{name!r} is too rare to compare its trajectory")
+        method = self.get_argument('method', 'cosine')
+        if method not in SIMILARITY_METHODS:
+            raise tornado.web.HTTPError(400, reason=f"'method' must be one of {', '.join(SIMILARITY_METHODS)}")
+        similar = await self.compute(self.dataset.trajectories.similar, name,
+                                     self.int_argument('n', 10, 1, MAX_SIMILAR_NAMES), method)
+        await self.write_frame(similar.assign(preusuel=similar['preusuel'].astype(str)))
+
+
+def serialize(frame, format='json'):
+    """Body and media type of ``frame`` as JSON, or as an Arrow IPC stream for ``format='arrow'``."""
+    with stage('serialize'):
+        if format == 'arrow':
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes(), ARROW_MEDIA_TYPE
+        return frame.to_json(orient='split', index=False), 'application/json'
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4')
+        self.finish(METRICS.prometheus_text())
+
+
+def make_app(current):
+    handlers = [
+        (r'/names/([^/]+)/evolution', EvolutionHandler),
+        (r'/names/([^/]+)/departments', DepartmentsHandler),
+        (r'/names/([^/]+)/similar', SimilarHandler),
+        (r'/top', TopHandler),
+        (r'/peaks', PeaksHandler),
+        (r'/search', SearchHandler),
+        (r'/regional', RegionalHandler),
+    ]
+    return tornado.web.Application(
+        [(pattern, handler, {'current': current}) for pattern, handler in handlers] + [(r'/metrics', MetricsHandler)]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--processes', type=int, default=1, help="0 forks one process per CPU")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    registry = DatasetRegistry()
+    if registry.current() is None:
+        registry.refresh()
+    current = CurrentDataset(registry)
+    # Build and save the indexes once before forking, so every process only maps them
+    current.get()
+
+    sockets = tornado.netutil.bind_sockets(args.port, args.address)
+    if args.processes != 1:
+        tornado.process.fork_processes(args.processes)
+    server = HTTPServer(make_app(current))
+    server.add_sockets(sockets)
+    logger.info("listening on http://%s:%s", args.address, args.port)
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
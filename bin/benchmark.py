@@ -0,0 +1,336 @@
+"""Time the shared analytics against the implementations they replaced, with their peak memory.
+
+    python bin/benchmark.py top_k peaks --repeat 5
+    python bin/benchmark.py --scale 1 10 100 --no-legacy --json benchmarks.json
+
+Every benchmark reports, per case and implementation, the best wall time over ``--repeat``
+runs and the peak memory traced by tracemalloc during one more run (numpy and pandas buffers
+are traced, Arrow's own allocator is not). ``--scale`` replays the benchmarks on the data
+replicated into that many times more names and rows. Unless ``--no-legacy`` skips the slow
+reference implementations, the benchmarks that replace one check that both give the same
+result: the detected peaks, the department proportions, the map values, the name list
+labels and, on a single year where the legacy top rows are the yearly totals, the top-k
+counts. The typed CSV parse of ``load`` is slower than the legacy ``read_csv``: it builds
+the categorical table once per refresh, and the apps read the Arrow snapshot instead.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+from shapely.affinity import translate
+
+from namesviz import (NameCube, NameIndex, NameRanking, NameTrends, RegionalProfile, YearRangeIndex, aggregate_range,
+                      detect_recent_popularity, name_labels, top_names_labels, top_names_per_department)
+from namesviz.charts import department_proportions
+from namesviz.data import NAMES_CSV, load_names, read_names_cache, read_names_csv
+from namesviz.geometry import DEPARTMENTS_GEOJSON, DOM_TOM_TRANSLATION, load_geometry
+from namesviz.maps import GeometryAsset, department_values
+from namesviz.peaks import find_popular_names
+
+
+def legacy_load_names(csv_path):
+    names = pd.read_csv(csv_path, sep=";")
+    names.drop(names[names.preusuel == '_PRENOMS_RARES'].index, inplace=True)
+    names.drop(names[names.dpt == 'XX'].index, inplace=True)
+    return names
+
+
+def legacy_load_geo_data(source):
+    depts = gpd.read_file(source)
+    for code, translation in DOM_TOM_TRANSLATION.items():
+        depts.loc[depts['code'] == code, 'geometry'] = depts.loc[depts['code'] == code, 'geometry'].apply(
+            lambda geom: translate(geom, xoff=translation[0], yoff=translation[1])
+        )
+    return depts
+
+
+def legacy_map_payload(depts, dept_values):
+    depts = depts.merge(dept_values, left_on='code', right_on='dpt', how='left')
+    return json.dumps(json.loads(depts.to_json())['features'])
+
+
+def legacy_top_names(filtered_names):
+    result = {}
+    for sex in [1, 2]:
+        filtered_sex = filtered_names[filtered_names['sexe'] == sex]
+        result[sex] = filtered_sex.groupby('dpt', observed=True).apply(lambda x: x.nlargest(3, 'nombre')).reset_index(drop=True)
+    return result
+
+
+def legacy_name_list(filtered_names):
+    name_counts = filtered_names.groupby('preusuel', observed=True)['nombre'].sum().reset_index()
+    name_counts = name_counts.sort_values(by='nombre', ascending=False)
+    name_counts['rank'] = name_counts['nombre'].rank(method='min', ascending=False).astype(int)
+    return name_counts.apply(lambda row: f"{row['preusuel']} ({row['nombre']}, #{row['rank']})", axis=1).tolist()
+
+
+def legacy_popular_names(name_trends, min_threshold, max_threshold):
+    popular_names = []
+    for name in name_trends.columns:
+        popularity = name_trends[name]
+        if min_threshold <= popularity.max() <= max_threshold:
+            peaks, _ = find_peaks(popularity, height=min_threshold)
+            if len(peaks) > 0:
+                popular_names.append((name, peaks, popularity.iloc[peaks].values))
+    return popular_names
+
+
+def assert_same_peaks(expected, actual):
+    assert [name for name, _, _ in expected] == [name for name, _, _ in actual], "detected names differ"
+    for (name, expected_peaks, expected_values), (_, peaks, values) in zip(expected, actual):
+        assert np.array_equal(expected_peaks, peaks), f"peaks differ for {name}"
+        assert np.array_equal(expected_values, values), f"peak values differ for {name}"
+
+
+def assert_same_top_k(expected, top):
+    """Same counts in every (sexe, dpt) top; the names may differ between tied counts."""
+    for sex, frame in expected.items():
+        found = top[top['sexe'] == sex]
+        assert sorted(zip(frame['dpt'].astype(str), frame['nombre'])) == \
+            sorted(zip(found['dpt'].astype(str), found['nombre'])), f"top counts differ for sex {sex}"
+
+
+def assert_same_map_values(payload, values):
+    """The department properties of the legacy GeoJSON payload equal the values sent with the shared geometry."""
+    fields = [column for column in values.columns if column != 'code']
+    expected = {feature['properties']['code']: tuple(feature['properties'].get(field) for field in fields)
+                for feature in json.loads(payload)}
+    actual = {row['code']: tuple(row[field] for field in fields) for row in json.loads(values.to_json(orient='records'))}
+    assert expected == actual, "map values differ"
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(case, implementation, func, repeat, **extra):
+    return {
+        'case': case,
+        'implementation': implementation,
+        'seconds': best_time(func, repeat),
+        'peak_mib': peak_memory(func) / 2**20,
+        **extra,
+    }
+
+
+def scale_names(names, factor, seed=0):
+    """``factor`` copies of the table, each with its own names and jittered counts."""
+    if factor == 1:
+        return names
+    rng = np.random.default_rng(seed)
+    labels = names['preusuel'].cat.categories
+    codes = names['preusuel'].cat.codes.to_numpy().astype(np.int64)
+    copies = []
+    for copy in range(factor):
+        jitter = rng.uniform(0.5, 1.5, len(names))
+        copies.append(names.assign(
+            preusuel=codes + copy * len(labels),
+            nombre=np.maximum(1, names['nombre'].to_numpy() * jitter).astype(np.int32),
+        ))
+    scaled = pd.concat(copies, ignore_index=True)
+    categories = labels.append(pd.Index([f"{label}_{copy}" for copy in range(1, factor) for label in labels]))
+    preusuel = pd.Categorical.from_codes(scaled['preusuel'], categories=categories)
+    scaled['preusuel'] = pd.Categorical(preusuel, categories=sorted(categories))
+    return scaled
+
+
+def bench_load(names, repeat, legacy, csv_path):
+    rows = []
+    if csv_path:
+        if legacy:
+            rows.append(measure('csv', 'legacy', lambda: legacy_load_names(csv_path), repeat))
+        rows.append(measure('csv', 'typed', lambda: read_names_csv(csv_path), repeat))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, 'names.arrow')
+        names.to_feather(cache_path, compression='uncompressed')
+        rows.append(measure('arrow cache', 'memory-mapped', lambda: read_names_cache(cache_path), repeat,
+                            size_mib=os.path.getsize(cache_path) / 2**20))
+    return rows
+
+
+def bench_build(names, repeat, legacy, csv_path):
+    cube = NameCube.from_names(names)
+    ranking = NameRanking.from_cube(cube)
+    return [
+        measure('NameCube', 'from_names', lambda: NameCube.from_names(names), repeat),
+        measure('YearRangeIndex', 'from_names', lambda: YearRangeIndex.from_names(names), repeat),
+        measure('NameTrends', 'from_names', lambda: NameTrends.from_names(names), repeat),
+        measure('NameRanking', 'from_cube', lambda: NameRanking.from_cube(cube), repeat),
+        measure('NameIndex', 'build', lambda: NameIndex(ranking.names), repeat),
+    ]
+
+
+def bench_geo(names, repeat, legacy, csv_path):
+    range_index = YearRangeIndex.from_names(names)
+    last_year = int(range_index.years[-1])
+    dept_values = top_names_labels(top_names_per_department(range_index.range_totals(last_year, last_year)))
+    asset = GeometryAsset(None, load_geometry('full')['code'].astype(str).tolist())
+    rows = []
+    if legacy:
+        depts = legacy_load_geo_data(DEPARTMENTS_GEOJSON)
+        rows.append(measure('geometry', 'legacy', lambda: legacy_load_geo_data(DEPARTMENTS_GEOJSON), repeat))
+        payload = legacy_map_payload(depts, dept_values)
+        assert_same_map_values(payload, department_values(asset, dept_values))
+        rows.append(measure('map payload', 'legacy merge + to_json', lambda: legacy_map_payload(depts, dept_values), repeat,
+                            size_kib=len(payload) / 1024))
+    rows.append(measure('geometry', 'geoparquet cache', lambda: load_geometry('full'), repeat))
+    payload = department_values(asset, dept_values).to_json(orient='records')
+    rows.append(measure('map payload', 'values only', lambda: department_values(asset, dept_values).to_json(orient='records'), repeat,
+                        size_kib=len(payload) / 1024))
+    return rows
+
+
+def bench_top_k(names, repeat, legacy, csv_path):
+    range_index = YearRangeIndex.from_names(names)
+    first_year, last_year = int(range_index.years[0]), int(range_index.years[-1])
+    rows = []
+    for start_year, end_year in [(last_year, last_year), (1980, last_year), (first_year, last_year)]:
+        case = f"{start_year}-{end_year}"
+        if legacy:
+            in_range = names[(names['annais'] >= start_year) & (names['annais'] <= end_year)]
+            if start_year == end_year:
+                assert_same_top_k(legacy_top_names(in_range),
+                                  top_names_per_department(range_index.range_totals(start_year, end_year)))
+            rows.append(measure(case, 'legacy', lambda: legacy_top_names(in_range), repeat))
+        rows.append(measure(case, 'vectorized', lambda: top_names_per_department(aggregate_range(names, start_year, end_year)), repeat))
+        rows.append(measure(case, 'range index', lambda: top_names_per_department(range_index.range_totals(start_year, end_year)), repeat))
+    return rows
+
+
+def bench_name_list(names, repeat, legacy, csv_path):
+    ranking = NameRanking.from_cube(NameCube.from_names(names))
+    name_index = NameIndex(ranking.names)
+    first_year, last_year = int(ranking.years[0]), int(ranking.years[-1])
+
+    def search(query, start_year, end_year):
+        counts, ranks = ranking.counts(start_year, end_year), ranking.ranks(start_year, end_year)
+        return name_labels(name_index.search(query, counts, ranks))
+
+    rows = []
+    for start_year, end_year in [(last_year, last_year), (first_year, last_year)]:
+        case = f"{start_year}-{end_year}"
+        if legacy:
+            in_range = names[(names['annais'] >= start_year) & (names['annais'] <= end_year)]
+            counts, ranks = ranking.counts(start_year, end_year), ranking.ranks(start_year, end_year)
+            labels = name_labels(name_index.search('', counts, ranks, limit=len(counts)))
+            # The legacy sort is not stable, so tied names come in any order
+            assert set(legacy_name_list(in_range)) == set(labels.values()), "name list labels differ"
+            rows.append(measure(case, 'legacy', lambda: legacy_name_list(in_range), repeat))
+        rows.append(measure(case, 'search ""', lambda: search('', start_year, end_year), repeat))
+        rows.append(measure(case, 'search "MARI"', lambda: search('MARI', start_year, end_year), repeat))
+        rows.append(measure(case, 'search "MARYE" (fuzzy)', lambda: search('MARYE', start_year, end_year), repeat))
+    return rows
+
+
+def bench_peaks(names, repeat, legacy, csv_path):
+    sparse_trends = NameTrends.from_names(names)
+    first_year, last_year = int(sparse_trends.years[0]), int(sparse_trends.years[-1])
+    name_trends = None
+    if legacy:
+        name_trends = names.groupby(['annais', 'preusuel'], observed=True)['nombre'].sum().unstack().fillna(0)
+    rows = []
+    for min_threshold, max_threshold in [(500, 10000), (6000, 10000), (50, float('inf'))]:
+        case = f"{min_threshold}-{max_threshold}"
+        if legacy:
+            expected = legacy_popular_names(name_trends, min_threshold, max_threshold)
+            assert_same_peaks(expected, find_popular_names(name_trends, min_threshold, max_threshold))
+            assert_same_peaks(expected, sparse_trends.popular_names(first_year, last_year, min_threshold, max_threshold))
+            rows.append(measure(case, 'legacy', lambda: legacy_popular_names(name_trends, min_threshold, max_threshold), repeat))
+            rows.append(measure(case, 'batched', lambda: find_popular_names(name_trends, min_threshold, max_threshold), repeat))
+        rows.append(measure(case, 'detect_recent_popularity', lambda: detect_recent_popularity(
+            sparse_trends, first_year, last_year, min_threshold, max_threshold), repeat))
+    return rows
+
+
+def bench_regional(names, repeat, legacy, csv_path):
+    range_index = YearRangeIndex.from_names(names)
+    first_year, last_year = int(range_index.years[0]), int(range_index.years[-1])
+    selected = range_index.names[:1000]
+    rows = []
+    if legacy:
+        profile = RegionalProfile.from_index(range_index, first_year, last_year, selected)
+        proportions = profile.proportions()
+        for row, name in enumerate(selected[:50]):
+            expected = department_proportions(range_index, name, first_year, last_year)
+            columns = range_index.departments.get_indexer(expected['dpt'].astype(str))
+            assert np.allclose(proportions[row].toarray().ravel()[columns], expected['proportion_name'])
+        rows.append(measure('1000 names', 'one name at a time', lambda: [
+            department_proportions(range_index, name, first_year, last_year) for name in selected], repeat))
+    rows.append(measure('1000 names', 'batch', lambda: RegionalProfile.from_index(
+        range_index, first_year, last_year, selected).proportions(), repeat))
+    rows.append(measure('all names', 'batch + top 3 by quotient', lambda: RegionalProfile.from_index(
+        range_index, first_year, last_year).top_departments(3), repeat))
+    return rows
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'build': bench_build,
+    'geo': bench_geo,
+    'top_k': bench_top_k,
+    'name_list': bench_name_list,
+    'peaks': bench_peaks,
+    'regional': bench_regional,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmarks', nargs='*', help=f"any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=int, nargs='+', default=[1], help="replication factors of the dataset")
+    parser.add_argument('--csv', default=NAMES_CSV, help="names file, in the dpt2020.csv format")
+    parser.add_argument('--no-legacy', dest='legacy', action='store_false', help="skip the reference implementations")
+    parser.add_argument('--json', help="also write every measurement to this file")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    # The legacy implementations are kept verbatim, deprecated pandas calls included
+    warnings.simplefilter('ignore', DeprecationWarning)
+    names = load_names(args.csv)
+    results = []
+    for factor in args.scale:
+        scaled = scale_names(names, factor)
+        # Only the original file exists as CSV; scaled copies are timed from memory
+        csv_path = args.csv if factor == 1 else None
+        for name in args.benchmarks or BENCHMARKS:
+            rows = pd.DataFrame(BENCHMARKS[name](scaled, args.repeat, args.legacy, csv_path))
+            rows.insert(0, 'rows', len(scaled))
+            rows.insert(0, 'scale', factor)
+            rows.insert(0, 'benchmark', name)
+            print(f"== {name} x{factor} ({len(scaled)} rows)")
+            print(rows.drop(columns=['benchmark', 'scale', 'rows']).to_string(index=False, float_format='{:.4g}'.format))
+            results.extend(rows.to_dict('records'))
+
+    if args.json:
+        with open(args.json, 'w') as target:
+            json.dump(results, target, indent=2, default=float)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Build the translated and simplified department geometries used by the maps.
+
+    python bin/build_geometry.py
+"""
+
+import argparse
+import os
+
+from namesviz.geometry import DEPARTMENTS_GEOJSON, GEOMETRY_CACHE_DIR, LEVELS_OF_DETAIL, build_geometry_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=DEPARTMENTS_GEOJSON)
+    parser.add_argument('--output-dir', default=GEOMETRY_CACHE_DIR)
+    args = parser.parse_args()
+
+    for level, path in build_geometry_cache(args.source, args.output_dir).items():
+        print(f"{level:>6} (tolerance {LEVELS_OF_DETAIL[level]}): {path} {os.path.getsize(path) / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
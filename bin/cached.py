@@ -0,0 +1,246 @@
+"""Streamlit-cached entry points into namesviz, shared by the apps of this folder.
+
+Structures built from the whole dataset are kept once per server process with
+``st.cache_resource``, keyed by the dataset version, and never copied: the names table
+is mapped from its Arrow snapshot and the derived indexes from .npy files saved next to
+it, so every session, server process and export worker on the host reads the same
+read-only pages. Results that depend on widget values are memoized with
+``st.cache_data`` and keyed by years, thresholds or a name along with the fingerprint
+of the years they read, so a rerun that does not change them costs a dictionary
+lookup, and so does one after a refresh that left those years alone.
+
+Each app calls ``use_current_dataset`` once at the top: the session then reads one
+version for the whole run and moves to a newly published one at its next rerun. The
+refresh saves the derived structures of a version before publishing it, so a rerun
+only maps them; the builds below only run for a version published without them.
+
+``start_rerun`` and ``finish_rerun`` bracket every app: the stages timed in between are
+logged to stderr as one JSON line per rerun, written as Prometheus text next to the
+file named by ``NAMESVIZ_METRICS_FILE`` if set (one file per app and process), and
+shown in a debug panel when ``NAMESVIZ_DEBUG`` is set or the page is opened with
+``?debug=1``. A rerun cut short by ``st.stop``, an exception or a newer rerun never
+reaches ``finish_rerun``; it is recorded as interrupted when the session's next rerun
+starts.
+"""
+
+import os
+
+import pandas as pd
+import streamlit as st
+
+from namesviz import NameIndex, detect_recent_popularity, top_names_labels, top_names_per_department
+from namesviz.charts import name_proportions, name_year_frames
+from namesviz.clustering import cluster_departments
+from namesviz.enrichment import Enricher
+from namesviz.geometry import DEPARTMENTS_GEOJSON
+from namesviz.instrument import (METRICS, finish_profile, log_profiles, process_textfile, start_profile, timed,
+                                 write_prometheus_textfile)
+from namesviz.maps import publish_geometry
+from namesviz.shared import freeze
+from namesviz.versions import DatasetRegistry, range_fingerprint
+
+METRICS_FILE_ENV = 'NAMESVIZ_METRICS_FILE'
+DEBUG_ENV = 'NAMESVIZ_DEBUG'
+
+# Frames derived from the shared table copy on write instead of writing into its read-only buffers
+pd.set_option('mode.copy_on_write', True)
+
+log_profiles()
+
+
+def start_rerun(app):
+    """Time the stages of this rerun under ``app`` until ``finish_rerun``."""
+    # Each rerun runs on a thread of its own, so the profile left open by an interrupted one is found in the session
+    finish_profile(profile=st.session_state.get('profile'), interrupted=True)
+    st.session_state['profile'] = start_profile(app)
+
+
+def finish_rerun():
+    profile = finish_profile()
+    metrics_file = os.environ.get(METRICS_FILE_ENV)
+    if metrics_file and profile is not None:
+        write_prometheus_textfile(process_textfile(metrics_file, profile.app), pid=os.getpid())
+    if profile is not None and (os.environ.get(DEBUG_ENV) or st.query_params.get('debug') == '1'):
+        with st.expander("Profilage de l'exécution"):
+            st.write(f"Durée totale : {1000 * profile.total:.0f} ms")
+            st.dataframe(profile.frame(), hide_index=True)
+            st.caption("Cumul par étape depuis le démarrage du serveur")
+            st.dataframe(METRICS.stage_summary(), hide_index=True)
+
+
+@st.cache_resource
+def load_registry():
+    registry = DatasetRegistry()
+    if registry.current() is None:
+        registry.refresh()
+    return registry
+
+
+def use_current_dataset():
+    """Pin the session to the published version until its next rerun."""
+    st.session_state['dataset'] = load_registry().current()
+    return st.session_state['dataset']
+
+
+def current_dataset():
+    return st.session_state.get('dataset') or use_current_dataset()
+
+
+def _derived(kind, version):
+    """The ``kind`` structure of ``version``, memory-mapped from the copy saved next to its snapshot."""
+    return load_registry().structure(version, kind, lambda: _name_data(version))
+
+
+@timed('load')
+def load_name_data():
+    return _name_data(current_dataset()['version'])
+
+
+@st.cache_resource(max_entries=2)
+def _name_data(version):
+    return load_registry().load(version)
+
+
+@timed('load')
+def load_name_cube():
+    return _name_cube(current_dataset()['version'])
+
+
+@st.cache_resource(max_entries=2)
+def _name_cube(version):
+    return _derived('cube', version)
+
+
+@timed('load')
+def load_year_range_index():
+    return _year_range_index(current_dataset()['version'])
+
+
+@st.cache_resource(max_entries=2)
+def _year_range_index(version):
+    return _derived('year_range_index', version)
+
+
+@timed('load')
+def load_name_trends():
+    return _name_trends(current_dataset()['version'])
+
+
+@st.cache_resource(max_entries=2)
+def _name_trends(version):
+    return _derived('name_trends', version)
+
+
+@timed('load')
+def load_name_ranking():
+    return _name_ranking(current_dataset()['version'])
+
+
+@st.cache_resource(max_entries=2)
+def _name_ranking(version):
+    return _derived('ranking', version)
+
+
+@timed('load')
+def load_name_index():
+    return _name_index(current_dataset()['version'])
+
+
+@st.cache_resource(max_entries=2)
+def _name_index(version):
+    return freeze(NameIndex(_name_ranking(version).names))
+
+
+@timed('load')
+def load_trajectory_index():
+    return _trajectory_index(current_dataset()['version'])
+
+
+@st.cache_resource(max_entries=2)
+def _trajectory_index(version):
+    return _derived('trajectories', version)
+
+
+@st.cache_resource
+def load_enricher():
+    return Enricher()
+
+
+@timed('load')
+@st.cache_resource
+def load_geometry_asset(level, source=DEPARTMENTS_GEOJSON):
+    return publish_geometry(level, source)
+
+
+def _years_key(start_year, end_year):
+    return range_fingerprint(current_dataset(), start_year, end_year)
+
+
+def department_top_names(start_year, end_year, k=3):
+    """Per-department labels of the ``k`` most given names of each sex."""
+    return _department_top_names(_years_key(start_year, end_year), start_year, end_year, k)
+
+
+@st.cache_data(max_entries=64)
+def _department_top_names(years_key, start_year, end_year, k):
+    return top_names_labels(top_names_per_department(load_year_range_index().range_totals(start_year, end_year), k=k))
+
+
+def name_department_counts(name, start_year, end_year):
+    return _name_department_counts(_years_key(start_year, end_year), name, start_year, end_year)
+
+
+@st.cache_data(max_entries=256)
+def _name_department_counts(years_key, name, start_year, end_year):
+    return load_year_range_index().name_department_totals(name, start_year, end_year)
+
+
+def name_department_proportions(name, start_year, end_year, level):
+    return _name_department_proportions(_years_key(start_year, end_year), name, start_year, end_year, level)
+
+
+@st.cache_data(max_entries=256)
+def _name_department_proportions(years_key, name, start_year, end_year, level):
+    return name_proportions(load_year_range_index(), load_geometry_asset(level), name, start_year, end_year)
+
+
+def name_department_frames(name, level, source=DEPARTMENTS_GEOJSON):
+    """Births of ``name`` per department for every year at once, as the frames of an animated map."""
+    years = load_year_range_index().years
+    return _name_department_frames(_years_key(years[0], years[-1]), name, level, source)
+
+
+@st.cache_data(max_entries=256)
+def _name_department_frames(years_key, name, level, source):
+    return name_year_frames(load_year_range_index(), load_geometry_asset(level, source), name)
+
+
+def department_clusters(start_year, end_year, k, sex=None, method='kmeans'):
+    """Cluster of every department by naming profile over the range, with the typical names of its cluster."""
+    return _department_clusters(_years_key(start_year, end_year), start_year, end_year, k, sex, method)
+
+
+@st.cache_data(max_entries=64)
+def _department_clusters(years_key, start_year, end_year, k, sex, method):
+    return cluster_departments(load_year_range_index(), start_year, end_year, k, sex, method)
+
+
+def recent_popularity(start_year, end_year, min_threshold, max_threshold):
+    """``detect_recent_popularity`` over the cached trends."""
+    return _recent_popularity(_years_key(start_year, end_year), start_year, end_year, min_threshold, max_threshold)
+
+
+@st.cache_data(max_entries=64)
+def _recent_popularity(years_key, start_year, end_year, min_threshold, max_threshold):
+    return detect_recent_popularity(load_name_trends(), start_year, end_year, min_threshold, max_threshold)
+
+
+def similar_names(name, n=10, method='cosine'):
+    """Names whose yearly share of births followed the closest trajectory to ``name``'s."""
+    years = load_trajectory_index().years
+    return _similar_names(_years_key(years[0], years[-1]), name, n, method)
+
+
+@st.cache_data(max_entries=256)
+def _similar_names(years_key, name, n, method):
+    return load_trajectory_index().similar(name, n, method)
@@ -0,0 +1,153 @@
+"""Render name charts and maps in bulk, without a browser session.
+
+    python bin/export_charts.py --names MARIE JEAN --ranges 1900-2020 1990-2020 --formats json html
+    python bin/export_charts.py --top 1000 --ranges 2020 --formats png --workers 8
+
+For every name this writes the evolution chart and one department map per year range;
+for every year range, the trends of the names detected as suddenly popular. The charts
+come from the dataset version the apps serve: names are spread over a pool of processes
+that memory-map the indexes of that version, the same files as the apps and the API.
+PNG output needs the vl-convert-python package; JSON and HTML maps load the geometry
+from a TopoJSON file written once next to them, PNG maps carry it inline.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from namesviz import detect_recent_popularity
+from namesviz.charts import FRANCE_SCALE, get_name_evolution_chart, get_name_proportion_map, get_popular_names_chart, name_proportions
+from namesviz.geometry import level_for_scale
+from namesviz.instrument import stage
+from namesviz.maps import embed_geometry, publish_geometry
+from namesviz.versions import DatasetRegistry
+
+FORMATS = ('json', 'html', 'png')
+
+# Per-process state, filled by the pool initializer
+_worker = {}
+
+# Worker key: structure kind in the registry
+INDEXES = {'cube': 'cube', 'range_index': 'year_range_index', 'name_trends': 'name_trends'}
+
+
+def int_range(text):
+    """'1990-2020' or '2020' as an inclusive (start, end) pair."""
+    try:
+        start, _, end = text.partition('-')
+        start, end = int(start), int(end or start)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START-END or a single value, got {text!r}")
+    if start > end:
+        raise argparse.ArgumentTypeError(f"empty range {text!r}")
+    return start, end
+
+
+def output_path(output_dir, stem, fmt):
+    return os.path.join(output_dir, f"{stem.replace(os.sep, '_')}.{fmt}")
+
+
+def save_chart(chart, output_dir, stem, formats):
+    paths = [output_path(output_dir, stem, fmt) for fmt in formats]
+    for path in paths:
+        with stage('serialize'):
+            chart.save(path)
+    return paths
+
+
+def shared_indexes(registry, version):
+    """The indexes of dataset ``version``, memory-mapped from its structures, built there first if no app has yet."""
+    names = lru_cache(maxsize=1)(lambda: registry.load(version))
+    return {key: registry.structure(version, kind, names) for key, kind in INDEXES.items()}
+
+
+def init_worker(registry_root, version, output_dir, formats, ranges, thresholds, linked_geometry, embedded_level):
+    # JSON and HTML maps share the published geometry file; PNG needs it inline
+    map_assets = []
+    if linked_geometry is not None:
+        map_assets.append((linked_geometry, [fmt for fmt in formats if fmt != 'png']))
+    if 'png' in formats:
+        map_assets.append((embed_geometry(embedded_level), ['png']))
+    _worker.update(
+        output_dir=output_dir,
+        formats=formats,
+        ranges=ranges,
+        thresholds=thresholds,
+        map_assets=map_assets,
+        **shared_indexes(DatasetRegistry(registry_root), version),
+    )
+
+
+def export_name(name):
+    output_dir, formats = _worker['output_dir'], _worker['formats']
+    paths = save_chart(get_name_evolution_chart(_worker['cube'], name), output_dir, f"{name}.evolution", formats)
+    for start_year, end_year in _worker['ranges']:
+        for asset, asset_formats in _worker['map_assets']:
+            dept_values = name_proportions(_worker['range_index'], asset, name, start_year, end_year)
+            chart = get_name_proportion_map(asset, dept_values, name)
+            paths += save_chart(chart, output_dir, f"{name}.map-{start_year}-{end_year}", asset_formats)
+    return paths
+
+
+def export_popular_names(year_range):
+    start_year, end_year = year_range
+    min_threshold, max_threshold = _worker['thresholds']
+    popular_names, name_trends = detect_recent_popularity(_worker['name_trends'], start_year, end_year, min_threshold, max_threshold)
+    chart = get_popular_names_chart(popular_names, name_trends, start_year, end_year)
+    return save_chart(chart, _worker['output_dir'], f"popular-{start_year}-{end_year}", _worker['formats'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', nargs='*', default=[], help="names to export, as spelled in the data")
+    parser.add_argument('--names-file', help="file with one name per line")
+    parser.add_argument('--top', type=int, default=0, help="also export the N most given names of the first range")
+    parser.add_argument('--ranges', nargs='+', type=int_range, default=[(1900, 2020)], help="year ranges, START-END or YEAR")
+    parser.add_argument('--thresholds', type=int_range, default=(6000, 10000), help="popularity thresholds for the peak detection")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['json', 'html'])
+    parser.add_argument('--output-dir', default='./exports')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    requested = list(args.names)
+    if args.names_file:
+        with open(args.names_file, encoding='utf-8') as names_file:
+            requested += [line.strip() for line in names_file if line.strip()]
+    registry = DatasetRegistry()
+    dataset = registry.current() or registry.refresh()
+    # Pinned for the whole export; a refresh meanwhile keeps this version's files for a while
+    version = dataset['version']
+    indexes = shared_indexes(registry, version)
+    if args.top:
+        ranking = registry.structure(version, 'ranking')
+        requested += ranking.top(*args.ranges[0], n=args.top)['preusuel'].tolist()
+
+    known = set(indexes['cube'].names)
+    unknown = [name for name in requested if name not in known]
+    if unknown:
+        print(f"skipping unknown names: {', '.join(unknown)}", file=sys.stderr)
+    export_names = list(dict.fromkeys(name for name in requested if name in known))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    level = level_for_scale(FRANCE_SCALE)
+    linked_geometry = None
+    if set(args.formats) - {'png'}:
+        linked_geometry = publish_geometry(level, static_dir=args.output_dir, static_url='.')
+    formats = tuple(args.formats)
+
+    initargs = (registry.root, version, args.output_dir, formats, args.ranges, args.thresholds, linked_geometry, level)
+    written = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=initargs) as pool:
+        chunksize = max(1, len(export_names) // (4 * args.workers))
+        for paths in pool.map(export_name, export_names, chunksize=chunksize):
+            written += len(paths)
+        for paths in pool.map(export_popular_names, args.ranges):
+            written += len(paths)
+    print(f"{written} files for {len(export_names)} names and {len(args.ranges)} ranges of dataset version {version} "
+          f"in {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,50 +1,34 @@
-import altair as alt
-import pandas as pd
 import streamlit as st
+from cached import finish_rerun, load_name_cube, load_name_index, load_name_ranking, start_rerun, use_current_dataset
+from namesviz import name_labels
+from namesviz.charts import get_name_evolution_chart, get_name_rank_chart
+from namesviz.instrument import stage
 
-@st.cache_data
-def load_name_data():
-    names = pd.read_csv("./data/dpt2020.csv", sep=";")
-    names.drop(names[names.preusuel == '_PRENOMS_RARES'].index, inplace=True)
-    names.drop(names[names.dpt == 'XX'].index, inplace=True)
-    return names
-
-def get_name_evolution_chart(names, selected_name):
-    name_evolution = names[names['preusuel'] == selected_name].groupby(['annais', 'sexe'])['nombre'].sum().reset_index()
-    name_evolution['sexe'] = name_evolution['sexe'].map({1: 'Male', 2: 'Female'})
-    
-    color_scale = alt.Scale(
-        domain=['Male', 'Female'],
-        range=['#1f77b4', '#ff69b4']  # Blue for males, pink for females
-    )
-    
-    area_chart = alt.Chart(name_evolution).mark_area().encode(
-        x='annais:O',
-        y='nombre:Q',
-        color=alt.Color('sexe:N', scale=color_scale),
-        tooltip=['annais:O', 'nombre:Q', 'sexe:N']
-    ).properties(
-        width=800,
-        height=400,
-        title=f"Evolution of the name '{selected_name}' by gender over years"
-    )
-    return area_chart
-
-names = load_name_data()
+start_rerun('gender_name')
+use_current_dataset()
 
 st.title("Evolution des prénoms en France (1900-2020)")
 st.subheader("Filtres")
 
-name_counts = names.groupby('preusuel')['nombre'].sum().reset_index()
-name_counts = name_counts.sort_values(by='nombre', ascending=False)
-name_counts['rank'] = name_counts['nombre'].rank(method='min', ascending=False).astype(int)
+name_ranking = load_name_ranking()
+first_year, last_year = name_ranking.years[0], name_ranking.years[-1]
 
-name_list = name_counts.apply(lambda row: f"{row['preusuel']} ({row['nombre']}, #{row['rank']})", axis=1).tolist()
-
-selected_name_display = st.selectbox('Sélectionnez un PRÉNOM (Attributions, #Rang)', name_list)
-selected_name = selected_name_display.split(' ')[0]
+name_query = st.text_input('Rechercher un PRÉNOM (accents et fautes de frappe tolérés)', '')
+name_matches = name_labels(load_name_index().search(name_query, name_ranking.counts(first_year, last_year), name_ranking.ranks(first_year, last_year)))
+selected_name = st.selectbox('Sélectionnez un PRÉNOM (Attributions, #Rang)', list(name_matches), format_func=name_matches.get)
+if selected_name is None:
+    st.warning("Aucun prénom ne correspond à cette recherche.")
+    st.stop()
 
 st.subheader("Evolution du prénom dans le temps")
 
-name_evolution_chart = get_name_evolution_chart(names, selected_name)
-st.altair_chart(name_evolution_chart)
+name_evolution_chart = get_name_evolution_chart(load_name_cube(), selected_name)
+with stage('render'):
+    st.altair_chart(name_evolution_chart)
+
+st.subheader("Rang du prénom dans le temps")
+
+with stage('render'):
+    st.altair_chart(get_name_rank_chart(name_ranking, selected_name))
+
+finish_rerun()
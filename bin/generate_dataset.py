@@ -0,0 +1,47 @@
+"""Write a synthetic names file in the dpt2020.csv schema, for load tests without the INSEE file.
+
+    python bin/generate_dataset.py ./data/synthetic.csv --names 30000
+    python bin/generate_dataset.py ./data/synthetic-x100.csv.gz --names 3000000 --births-per-year 75000000
+
+Rows are generated and written one year and block of names at a time, so memory does not
+grow with the file. The file size follows from the vocabulary, the departments and the
+births per year; the number of rows written is printed at the end.
+"""
+
+import argparse
+import time
+
+from namesviz.synthetic import DEPARTMENT_CODES, generate_names, write_names_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', help="CSV path, gzip-compressed if it ends in .gz")
+    parser.add_argument('--names', type=int, default=30_000, help="size of the name vocabulary")
+    parser.add_argument('--first-year', type=int, default=1900)
+    parser.add_argument('--last-year', type=int, default=2020)
+    parser.add_argument('--births-per-year', type=int, default=750_000)
+    parser.add_argument('--departments', type=int, default=len(DEPARTMENT_CODES),
+                        help=f"the first {len(DEPARTMENT_CODES)} are real codes, more are synthetic")
+    parser.add_argument('--zipf-exponent', type=float, default=1.1)
+    parser.add_argument('--spike-rate', type=float, default=0.01, help="share of names given a sudden popularity spike")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    chunks = generate_names(
+        n_names=args.names,
+        first_year=args.first_year,
+        last_year=args.last_year,
+        births_per_year=args.births_per_year,
+        n_departments=args.departments,
+        zipf_exponent=args.zipf_exponent,
+        spike_rate=args.spike_rate,
+        seed=args.seed,
+    )
+    rows = write_names_csv(args.output, chunks)
+    print(f"{rows} rows written to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
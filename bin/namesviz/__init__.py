@@ -0,0 +1,33 @@
+"""Shared data access and analytics for the French names visualizations.
+
+Nothing in this package imports Streamlit; the apps reach it through the cached
+loaders of bin/cached.py. The names below are the stable entry points; geometry,
+maps, charts and enrichment are imported from their submodules since they pull in
+the mapping, plotting and network dependencies.
+"""
+
+from namesviz.cube import NameCube
+from namesviz.data import load_names
+from namesviz.ranking import NameRanking
+from namesviz.regional import RegionalProfile
+from namesviz.search import NameIndex, name_labels
+from namesviz.similarity import TrajectoryIndex
+from namesviz.topk import aggregate_range, top_names_labels, top_names_per_department
+from namesviz.trends import NameTrends, detect_recent_popularity
+from namesviz.yearrange import YearRangeIndex
+
+__all__ = [
+    'NameCube',
+    'NameIndex',
+    'NameRanking',
+    'NameTrends',
+    'RegionalProfile',
+    'TrajectoryIndex',
+    'YearRangeIndex',
+    'aggregate_range',
+    'detect_recent_popularity',
+    'load_names',
+    'name_labels',
+    'top_names_labels',
+    'top_names_per_department',
+]
@@ -0,0 +1,172 @@
+"""Altair charts shared by the Streamlit apps and the batch exporter."""
+
+import altair as alt
+import pandas as pd
+
+from namesviz.maps import choropleth, department_values
+
+FRANCE_SCALE = 1500
+FRANCE_CENTER = (2, 46)
+
+
+def get_name_evolution_chart(name_cube, selected_name, width=800, height=400):
+    name_evolution = name_cube.evolution(selected_name)
+    name_evolution['sexe'] = name_evolution['sexe'].map({1: 'Male', 2: 'Female'})
+
+    color_scale = alt.Scale(
+        domain=['Male', 'Female'],
+        range=['#1f77b4', '#ff69b4']  # Blue for males, pink for females
+    )
+
+    return alt.Chart(name_evolution).mark_area().encode(
+        x='annais:O',
+        y='nombre:Q',
+        color=alt.Color('sexe:N', scale=color_scale),
+        tooltip=['annais:O', 'nombre:Q', 'sexe:N']
+    ).properties(
+        width=width,
+        height=height,
+        title=f"Evolution of the name '{selected_name}' by gender over years"
+    )
+
+
+def get_name_rank_chart(name_ranking, selected_name):
+    rank_series = name_ranking.rank_series(selected_name)
+    return alt.Chart(rank_series).mark_line(point=True).encode(
+        x='annais:O',
+        y=alt.Y('rank:Q', scale=alt.Scale(reverse=True), title='Rang national'),
+        tooltip=['annais:O', 'nombre:Q', 'rank:Q']
+    ).properties(
+        width=800,
+        height=300,
+        title=f"Rang national du prénom '{selected_name}' par année"
+    )
+
+
+def department_proportions(range_index, selected_name, start_year, end_year):
+    """(dpt, nombre, total_count, proportion_name) of every department with births in the range."""
+    total_names_per_dept = range_index.department_totals(start_year, end_year)
+    name_counts_per_dept = range_index.name_department_totals(selected_name, start_year, end_year)
+    name_counts_per_dept = name_counts_per_dept.merge(total_names_per_dept, on='dpt', how='right')
+    name_counts_per_dept['nombre'] = name_counts_per_dept['nombre'].fillna(0).astype('int64')
+    name_counts_per_dept['proportion_name'] = (name_counts_per_dept['nombre']
+                                               / name_counts_per_dept['total_count'])
+    return name_counts_per_dept
+
+
+def name_proportions(range_index, asset, selected_name, start_year, end_year):
+    """Share of births given ``selected_name`` over the range in every department of ``asset``."""
+    name_counts_per_dept = department_proportions(range_index, selected_name, start_year, end_year)
+    return department_values(asset, name_counts_per_dept[['dpt', 'proportion_name']],
+                             fill={'proportion_name': 0})
+
+
+def name_year_frames(range_index, asset, selected_name):
+    """Births of ``selected_name`` per department of ``asset`` and year, for browser playback."""
+    year_columns = [str(year) for year in range_index.years]
+    frames = pd.DataFrame(range_index.name_department_years(selected_name).T,
+                          columns=year_columns)
+    frames.insert(0, 'dpt', range_index.departments.astype(str))
+    frames = department_values(asset, frames, fill=0)
+    return frames.astype(dict.fromkeys(year_columns, 'int64'))
+
+
+def get_name_animation_map(asset, frames, selected_name, scale=FRANCE_SCALE, center=FRANCE_CENTER,
+                           width=750, height=500):
+    """Map of the births of ``selected_name`` in the year picked on a slider, switched in the
+    browser.
+
+    ``frames`` comes from ``name_year_frames``: every year is shipped once with the chart
+    and the slider only changes which column colors the departments, on a color scale
+    shared by all years so they can be compared.
+    """
+    year_columns = [column for column in frames.columns if column != 'code']
+    year = alt.param(name='annee', value=int(year_columns[0]),
+                     bind=alt.binding_range(min=int(year_columns[0]), max=int(year_columns[-1]),
+                                            step=1, name='Année '))
+    max_count = max(int(frames[year_columns].to_numpy().max()), 1)
+    color_scale = alt.Scale(domain=[0, max_count/5, max_count/2, max_count],
+                            range=['#f7fbff', '#c6dbef', '#6baed6', '#08306b'])
+
+    return choropleth(asset, frames, year_columns).transform_calculate(
+        annais=year.name,
+        count_name=f"datum[toString({year.name})]"
+    ).encode(
+        color=alt.Color('count_name:Q', scale=color_scale,
+                        legend=alt.Legend(title=f"Attributions de {selected_name}")),
+        tooltip=[
+            alt.Tooltip('properties.nom:N', title='Nom du Département'),
+            alt.Tooltip('properties.code:N', title='Code du Département'),
+            alt.Tooltip('annais:O', title='Année'),
+            alt.Tooltip('count_name:Q', title=f"{selected_name}"),
+        ]
+    ).add_params(
+        year
+    ).project(
+        type='mercator',
+        scale=scale,
+        center=list(center)
+    ).properties(
+        width=width,
+        height=height
+    ).configure_view(stroke=None)
+
+
+def get_name_proportion_map(asset, dept_values, selected_name, scale=FRANCE_SCALE,
+                            center=FRANCE_CENTER, width=750, height=500):
+    max_proportion = dept_values['proportion_name'].max()
+    color_scale = alt.Scale(domain=[0, max_proportion/5, max_proportion/2, max_proportion],
+                            range=['#f7fbff', '#c6dbef', '#6baed6', '#08306b'])
+
+    points = pd.DataFrame({})
+    points_chart = alt.Chart(points).mark_point(color='red', size=100).encode(
+        x=alt.X('x:Q', axis=alt.Axis(title=None)),
+        y=alt.Y('y:Q', axis=alt.Axis(title=None)),
+        tooltip=['label:N'])
+
+    map_chart = choropleth(asset, dept_values, ['proportion_name']).encode(
+        color=alt.Color('proportion_name:Q', scale=color_scale,
+                        legend=alt.Legend(title=f"Proportion de {selected_name}")),
+        tooltip=[
+            alt.Tooltip('properties.nom:N', title='Nom du Département'),
+            alt.Tooltip('properties.code:N', title='Code du Département'),
+            alt.Tooltip('proportion_name:Q', title=f"Proportion de {selected_name}"),
+        ]
+    ).project(
+        type='mercator',
+        scale=scale,
+        center=list(center)
+    ).properties(
+        width=width,
+        height=height
+    ).interactive()
+    return alt.layer(map_chart, points_chart).configure_view(stroke=None)
+
+
+def get_popular_names_chart(popular_names, name_trends, start_year, end_year, width=800,
+                            height=500):
+    """Births per year of the names found by ``detect_recent_popularity``, peaks marked in red."""
+    trends = name_trends.rename_axis('annais').reset_index().melt('annais', var_name='preusuel',
+                                                                  value_name='nombre')
+    peaks = pd.DataFrame([
+        {'annais': name_trends.index[p], 'preusuel': name, 'nombre': value}
+        for name, peak_positions, values in popular_names
+        for p, value in zip(peak_positions, values)
+    ], columns=['annais', 'preusuel', 'nombre'])
+
+    lines = alt.Chart(trends).mark_line().encode(
+        x=alt.X('annais:O', title='Années'),
+        y=alt.Y('nombre:Q', title='Popularité'),
+        color=alt.Color('preusuel:N', title='Prénoms'),
+        tooltip=['preusuel:N', 'annais:O', 'nombre:Q']
+    )
+    peak_points = alt.Chart(peaks).mark_point(color='red', size=60, filled=True).encode(
+        x='annais:O',
+        y='nombre:Q',
+        tooltip=['preusuel:N', 'annais:O', 'nombre:Q']
+    )
+    return alt.layer(lines, peak_points).properties(
+        width=width,
+        height=height,
+        title=f"Tendances globales des prénoms populaires en France ({start_year}-{end_year})"
+    )
@@ -0,0 +1,79 @@
+"""Departments grouped by the names they give, clustered on their sparse naming profiles."""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.cluster import AgglomerativeClustering, KMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from namesviz.instrument import timed
+from namesviz.regional import RegionalProfile
+
+METHODS = ('kmeans', 'hierarchical')
+
+
+@timed('cluster')
+def cluster_departments(range_index, start_year, end_year, k=6, sex=None, method='kmeans', typical=3,
+                        min_births=100, components=20, seed=0):
+    """Cluster label of every department with births in the range, and the most typical names of its cluster.
+
+    Each department is described by the share of its births given each name with at
+    least ``min_births`` births in the range, scaled to unit length so that clusters
+    follow what is named rather than how many are born. ``kmeans`` runs on that sparse
+    departments x names matrix directly; ``hierarchical`` (Ward linkage) needs dense
+    rows and works on their first ``components`` singular directions, and falls back to
+    ``kmeans`` when there are too few departments or names for one. A cluster's typical
+    names are those given at least ``min_births`` times in it with the highest location
+    quotient, i.e. the most over-represented there.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    profile = RegionalProfile.from_index(range_index, start_year, end_year, sex=sex)
+    present = np.flatnonzero(profile.department_totals > 0)
+    if not len(present):
+        return pd.DataFrame({'dpt': pd.Series(dtype=str), 'cluster': pd.Series(dtype=np.int64),
+                             'typical_names': pd.Series(dtype=str)})
+    # Rare names only add noise, and columns that k-means has to go through
+    frequent = np.flatnonzero(profile.name_totals() >= min_births)
+    # A filter that leaves a single department or no frequent name leaves nothing to split
+    k = max(1, min(k, len(present))) if len(frequent) else 1
+
+    if k == 1:
+        labels = np.zeros(len(present), dtype=np.int64)
+    else:
+        shares = normalize(profile.proportions()[frequent].T.tocsr()[present])
+        n_components = min(components, len(present) - 1, len(frequent) - 1)
+        if method == 'kmeans' or n_components < 1:
+            labels = KMeans(n_clusters=k, n_init=4, random_state=seed).fit_predict(shares)
+        else:
+            reduced = TruncatedSVD(n_components=n_components, random_state=seed).fit_transform(shares)
+            labels = AgglomerativeClustering(n_clusters=k).fit_predict(reduced)
+    labels = _by_size(labels, k)
+
+    # Births of each name per cluster: (clusters x departments) @ (departments x names)
+    membership = sparse.csr_matrix((np.ones(len(present)), (labels, np.arange(len(present)))), shape=(k, len(present)))
+    cluster_counts = (membership @ profile.counts[frequent].T.tocsr()[present]).toarray()
+    cluster_totals = cluster_counts.sum(axis=1, keepdims=True)
+    national_shares = cluster_counts.sum(axis=0) / max(cluster_counts.sum(), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quotients = cluster_counts / cluster_totals / national_shares
+    quotients = np.where(cluster_counts >= min_births, quotients, -np.inf)
+    best = np.argsort(-quotients, axis=1, kind='stable')[:, :typical]
+    typical_names = [', '.join(str(profile.names[frequent[i]]) for i in row if np.isfinite(quotients[c, i]))
+                     for c, row in enumerate(best)]
+
+    return pd.DataFrame({
+        'dpt': profile.departments[present].astype(str),
+        'cluster': labels + 1,
+        'typical_names': [typical_names[label] for label in labels],
+    })
+
+
+def _by_size(labels, k):
+    """Relabel clusters from the largest to the smallest, so labels stay stable across reruns."""
+    sizes = np.bincount(labels, minlength=k)
+    order = np.argsort(-sizes, kind='stable')
+    relabel = np.empty(k, dtype=np.int64)
+    relabel[order] = np.arange(k)
+    return relabel[labels]
@@ -0,0 +1,67 @@
+"""National name x year x sex aggregates held as dense arrays."""
+
+import numpy as np
+import pandas as pd
+
+SEXES = (1, 2)
+
+
+class NameCube:
+    """Births per name, year and sex; the name id is the position in ``names``."""
+
+    def __init__(self, names, years, counts):
+        self.names = names
+        self.years = years
+        self.counts = counts
+
+    @classmethod
+    def from_names(cls, names):
+        labels, years = _axes(names)
+        return cls(labels, years, _cell_counts(names, labels, years))
+
+    def updated(self, names, changed_years):
+        """The cube of ``names``, recounting only ``changed_years`` and the years this cube lacks.
+
+        Every other year is copied from this cube, realigned on the vocabulary of ``names``;
+        a name absent from this cube was not given in the copied years, so its slice stays 0.
+        """
+        labels, years = _axes(names)
+        recount = np.isin(years, list(changed_years)) | ~np.isin(years, self.years)
+        counts = _cell_counts(names[names['annais'].isin(years[recount])], labels, years)
+        kept = years[~recount].astype(np.int64)
+        old_ids = self.names.get_indexer(labels)
+        known = np.flatnonzero(old_ids >= 0)
+        counts[np.ix_(known, kept - years[0])] = self.counts[np.ix_(old_ids[known], kept - self.years[0])]
+        return NameCube(labels, years, counts)
+
+    def name_id(self, name):
+        return self.names.get_loc(name)
+
+    def evolution(self, name):
+        """Non-zero (annais, sexe, nombre) rows for one name, ordered by year then sex."""
+        series = self.counts[self.name_id(name)]
+        year_idx, sex_idx = np.nonzero(series)
+        return pd.DataFrame({
+            'annais': self.years[year_idx],
+            'sexe': np.asarray(SEXES, dtype=np.int8)[sex_idx],
+            'nombre': series[year_idx, sex_idx],
+        })
+
+
+def _axes(names):
+    labels = pd.Index(names['preusuel'].cat.categories)
+    years = np.arange(names['annais'].min(), names['annais'].max() + 1, dtype=np.int16)
+    return labels, years
+
+
+def _cell_counts(names, labels, years):
+    """Dense (name, year, sex) sums of the rows of ``names``, whose name codes index ``labels``."""
+    name_ids = names['preusuel'].cat.codes.to_numpy().astype(np.int64)
+    year_ids = names['annais'].to_numpy().astype(np.int64) - years[0]
+    sex_ids = names['sexe'].to_numpy().astype(np.int64) - 1
+
+    shape = (len(labels), len(years), len(SEXES))
+    flat = np.ravel_multi_index((name_ids, year_ids, sex_ids), shape)
+    # bincount sums in float64, which is exact far beyond the national totals
+    counts = np.bincount(flat, weights=names['nombre'].to_numpy(), minlength=np.prod(shape))
+    return counts.astype(np.int32).reshape(shape)
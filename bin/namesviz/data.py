@@ -0,0 +1,185 @@
+"""Typed, memory-mapped access to the INSEE departmental names file."""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+NAMES_CSV = "./data/dpt2020.csv"
+CACHE_DIR = "./data/cache"
+
+RARE_NAMES = '_PRENOMS_RARES'
+UNKNOWN_DPT = 'XX'
+
+# Rows parsed at once when reading the CSV; memory grows with the number of distinct
+# (name, sex, department, year) cells, not with the size of the file
+CHUNK_ROWS = 1_000_000
+
+# Cell key layout, low bits first: year (12 bits), department id (24), sex (1), name id (26);
+# the department field holds commune-level codes too
+_YEAR_BITS, _DPT_BITS, _NAME_BITS = 12, 24, 26
+_DPT_SHIFT = _YEAR_BITS
+_SEX_SHIFT = _DPT_SHIFT + _DPT_BITS
+_NAME_SHIFT = _SEX_SHIFT + 1
+_YEAR_MASK = (1 << _YEAR_BITS) - 1
+_DPT_MASK = (1 << _DPT_BITS) - 1
+
+CSV_DTYPES = {'sexe': 'int8', 'preusuel': 'category', 'annais': 'string', 'dpt': 'category', 'nombre': 'int32'}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_names_chunks(csv_path=NAMES_CSV, chunksize=CHUNK_ROWS):
+    """Yield the CSV ``chunksize`` rows at a time, sentinel rows dropped and columns narrowed."""
+    for chunk in pd.read_csv(csv_path, sep=";", dtype=CSV_DTYPES, chunksize=chunksize):
+        annais = pd.to_numeric(chunk['annais'], errors='coerce')
+        keep = (
+            chunk['preusuel'].notna()
+            & (chunk['preusuel'] != RARE_NAMES)
+            & chunk['dpt'].notna()
+            & (chunk['dpt'] != UNKNOWN_DPT)
+            & annais.notna()
+        )
+        yield pd.DataFrame({
+            'sexe': chunk['sexe'][keep],
+            'preusuel': chunk['preusuel'][keep],
+            'annais': annais[keep].astype('int16'),
+            'dpt': chunk['dpt'][keep],
+            'nombre': chunk['nombre'][keep],
+        })
+
+
+class NamesAggregator:
+    """Births summed per (name, sex, department, year) cell, fed one chunk at a time.
+
+    Each cell is packed into one int64 key over a name and department vocabulary that
+    grows with the chunks; pending chunks are folded together whenever they exceed
+    ``merge_rows`` rows, so memory follows the number of distinct cells and never the
+    number of rows read.
+    """
+
+    def __init__(self, merge_rows=4 * CHUNK_ROWS):
+        self.merge_rows = merge_rows
+        self.names = pd.Index([], dtype=object)
+        self.departments = pd.Index([], dtype=object)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self._pending = []
+        self._pending_rows = 0
+
+    def _vocabulary_ids(self, vocabulary, column, bits):
+        # Only the categories of the rows kept, not those of every row the chunk was parsed from
+        column = column.cat.remove_unused_categories()
+        categories = column.cat.categories
+        ids = vocabulary.get_indexer(categories)
+        new = ids < 0
+        ids[new] = np.arange(len(vocabulary), len(vocabulary) + new.sum())
+        vocabulary = vocabulary.append(categories[new])
+        if len(vocabulary) > 1 << bits:
+            raise ValueError(f"More than {1 << bits} distinct values of {column.name!r} do not fit in a cell key")
+        return vocabulary, ids[column.cat.codes.to_numpy()]
+
+    def add(self, chunk):
+        # Rows without a name or a department have no cell to go to
+        chunk = chunk[(chunk['preusuel'].cat.codes >= 0) & (chunk['dpt'].cat.codes >= 0)]
+        sexes = chunk['sexe'].to_numpy().astype(np.int64)
+        years = chunk['annais'].to_numpy().astype(np.int64)
+        if not np.isin(sexes, (1, 2)).all():
+            raise ValueError("'sexe' must be 1 or 2")
+        if ((years < 0) | (years > _YEAR_MASK)).any():
+            raise ValueError(f"'annais' must be between 0 and {_YEAR_MASK}")
+        self.names, name_ids = self._vocabulary_ids(self.names, chunk['preusuel'], _NAME_BITS)
+        self.departments, dpt_ids = self._vocabulary_ids(self.departments, chunk['dpt'], _DPT_BITS)
+        keys = (
+            (name_ids.astype(np.int64) << _NAME_SHIFT)
+            | ((sexes - 1) << _SEX_SHIFT)
+            | (dpt_ids.astype(np.int64) << _DPT_SHIFT)
+            | years
+        )
+        self._pending.append(_sum_by_key(keys, chunk['nombre'].to_numpy()))
+        self._pending_rows += len(self._pending[-1][0])
+        if self._pending_rows > self.merge_rows:
+            self._merge()
+
+    def _merge(self):
+        keys, counts = _sum_by_key(
+            np.concatenate([self.keys] + [keys for keys, _ in self._pending]),
+            np.concatenate([self.counts] + [counts for _, counts in self._pending]),
+        )
+        self.keys, self.counts = keys, counts
+        self._pending, self._pending_rows = [], 0
+
+    def frame(self):
+        """The aggregated table, with the same columns and dtypes as ``read_names_csv``."""
+        self._merge()
+        name_ids = self.keys >> _NAME_SHIFT
+        dpt_ids = (self.keys >> _DPT_SHIFT) & _DPT_MASK
+        return pd.DataFrame({
+            'sexe': ((self.keys >> _SEX_SHIFT) & 1).astype(np.int8) + 1,
+            'preusuel': _sorted_categorical(name_ids, self.names),
+            'annais': (self.keys & _YEAR_MASK).astype(np.int16),
+            'dpt': _sorted_categorical(dpt_ids, self.departments),
+            'nombre': self.counts.astype(np.int32 if self.counts.max(initial=0) < 2**31 else np.int64),
+        })
+
+
+def _sum_by_key(keys, counts):
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    # bincount sums in float64, which is exact far beyond any birth count
+    return unique_keys, np.bincount(inverse, weights=counts, minlength=len(unique_keys)).astype(np.int64)
+
+
+def _sorted_categorical(ids, vocabulary):
+    """Categorical of ``vocabulary[ids]`` whose categories are only the values used, sorted."""
+    used = np.unique(ids)
+    labels = vocabulary[used]
+    order = np.argsort(labels.to_numpy(), kind='stable')
+    codes = np.empty(len(used), dtype=np.int64)
+    codes[order] = np.arange(len(used))
+    return pd.Categorical.from_codes(codes[np.searchsorted(used, ids)], categories=labels[order])
+
+
+def read_names_csv(csv_path=NAMES_CSV, chunksize=CHUNK_ROWS):
+    """Parse the CSV chunk by chunk into the typed table, one row per (name, sex, department, year)."""
+    aggregator = NamesAggregator()
+    for chunk in read_names_chunks(csv_path, chunksize):
+        aggregator.add(chunk)
+    return aggregator.frame()
+
+
+def cache_path_for(csv_path=NAMES_CSV, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{file_hash(csv_path)[:16]}.arrow")
+
+
+def build_names_cache(csv_path=NAMES_CSV, cache_path=None):
+    cache_path = cache_path or cache_path_for(csv_path)
+    names = read_names_csv(csv_path)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Write next to the target and rename so a concurrent reader never sees a partial file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    feather.write_feather(names, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def read_names_cache(cache_path):
+    # Uncompressed Arrow IPC is mapped rather than read, so numeric columns share the page cache
+    table = feather.read_table(cache_path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def load_names(csv_path=NAMES_CSV, cache_dir=CACHE_DIR):
+    """Load the typed names table, building the columnar cache on first use."""
+    cache_path = cache_path_for(csv_path, cache_dir)
+    if not os.path.exists(cache_path):
+        build_names_cache(csv_path, cache_path)
+    return read_names_cache(cache_path)
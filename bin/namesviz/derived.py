@@ -0,0 +1,74 @@
+"""The indexes derived from a version of the names table, built together when the version is published.
+
+Building them before the manifest names the version keeps the cold build off the first
+rerun that reads it. The cube and the ranking are derived from those of the parent
+version when it has them, recounting only the changed years; the other indexes are
+built whole. Readers of a version published without them build them the same way.
+"""
+
+import os
+
+from namesviz.cube import NameCube
+from namesviz.instrument import stage
+from namesviz.ranking import NameRanking
+from namesviz.shared import METADATA, map_structure, shared_structure
+from namesviz.similarity import TrajectoryIndex
+from namesviz.trends import NameTrends
+from namesviz.yearrange import YearRangeIndex
+
+
+def _cube(names, structure, parent=None, changed_years=()):
+    return NameCube.from_names(names()) if parent is None else parent.updated(names(), changed_years)
+
+
+def _year_range_index(names, structure, parent=None, changed_years=()):
+    return YearRangeIndex.from_names(names())
+
+
+def _name_trends(names, structure, parent=None, changed_years=()):
+    return NameTrends.from_names(names())
+
+
+def _ranking(names, structure, parent=None, changed_years=()):
+    cube = structure('cube')
+    return NameRanking.from_cube(cube) if parent is None else parent.updated(cube, changed_years)
+
+
+def _trajectories(names, structure, parent=None, changed_years=()):
+    return TrajectoryIndex.from_trends(structure('name_trends'))
+
+
+# Kind -> builder. A builder gets a callable returning the names table, a callable
+# returning another structure of the same version by kind and, when there is one, the
+# same structure of the parent version with the changed years
+DERIVED = {
+    'cube': _cube,
+    'year_range_index': _year_range_index,
+    'name_trends': _name_trends,
+    'ranking': _ranking,
+    'trajectories': _trajectories,
+}
+
+
+def derived_structure(directory, kind, names, parent_directory=None, changed_years=()):
+    """The ``kind`` structure saved under ``directory``, memory-mapped; built and saved first if it is missing.
+
+    ``names`` is called for the names table only when something has to be built. The
+    structure is updated from the one of ``parent_directory`` when that one is saved,
+    and so are the structures it is derived from.
+    """
+    def structure(other):
+        return derived_structure(directory, other, names, parent_directory, changed_years)
+
+    def build():
+        parent_path = parent_directory and os.path.join(parent_directory, kind)
+        parent = map_structure(parent_path) if parent_path and os.path.exists(os.path.join(parent_path, METADATA)) else None
+        with stage('load'):
+            return DERIVED[kind](names, structure, parent, changed_years)
+
+    return shared_structure(os.path.join(directory, kind), build)
+
+
+def build_structures(directory, names, parent_directory=None, changed_years=()):
+    """Save every structure of ``DERIVED`` missing under ``directory``, updating those of ``parent_directory``."""
+    return {kind: derived_structure(directory, kind, lambda: names, parent_directory, changed_years) for kind in DERIVED}
@@ -0,0 +1,63 @@
+"""Concurrent prefetch of the Wikipedia / Wikidata context of detected peaks."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from namesviz.wiki import get_events_for_date, get_wikidata_results
+
+# The Wikidata query service allows 5 parallel queries per client; more only earns 429s
+MAX_CONCURRENT_LOOKUPS = 5
+
+
+class Enricher:
+    """Runs lookups on bounded thread pools and memoizes their futures.
+
+    Prefetches go to a background pool; lookups the page is waiting for go to a
+    small foreground pool and take over a queued prefetch of the same key, so the
+    selected name never waits behind the rest of the batch. Both pools together run
+    at most ``MAX_CONCURRENT_LOOKUPS`` lookups. A lookup that failed with
+    ``LookupUnavailable`` keeps its future until it is asked for again, which submits
+    it anew rather than answering "no events" for the life of the process.
+    """
+
+    def __init__(self, max_workers=3, foreground_workers=2, client=None, max_entries=4096):
+        if max_workers + foreground_workers > MAX_CONCURRENT_LOOKUPS:
+            raise ValueError(f"At most {MAX_CONCURRENT_LOOKUPS} concurrent lookups are allowed")
+        self.client = client
+        self.max_entries = max_entries
+        self._background = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='enrichment')
+        self._foreground = ThreadPoolExecutor(max_workers=foreground_workers, thread_name_prefix='enrichment-urgent')
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, key, func, arg, urgent):
+        with self._lock:
+            future, queued_urgent = self._futures.get(key, (None, False))
+            failed = future is not None and future.done() and future.exception() is not None
+            promote = urgent and not queued_urgent and future is not None and future.cancel()
+            if future is None or failed or promote:
+                executor = self._foreground if urgent else self._background
+                future = executor.submit(func, arg, self.client)
+                self._futures[key] = (future, urgent)
+                self._prune()
+            return future
+
+    def _prune(self):
+        if len(self._futures) <= self.max_entries:
+            return
+        # Completed lookups are also in the HTTP cache, so forgetting their futures is cheap
+        done = [key for key, (future, _) in self._futures.items() if future.done()]
+        for key in done[:len(self._futures) - self.max_entries]:
+            del self._futures[key]
+
+    def events(self, year, urgent=False):
+        return self._submit(('events', int(year)), get_events_for_date, int(year), urgent)
+
+    def wikidata(self, name, urgent=False):
+        return self._submit(('wikidata', name), get_wikidata_results, name, urgent)
+
+    def prefetch(self, popular_names, peak_years):
+        """Queue the events of every peak year and the entities of every popular name."""
+        futures = [self.events(year) for year in sorted({int(year) for year in peak_years})]
+        futures += [self.wikidata(name) for name, _, _ in popular_names]
+        return futures
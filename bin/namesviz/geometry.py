@@ -0,0 +1,82 @@
+"""Department geometries, translated and simplified once and stored as GeoParquet."""
+
+import math
+import os
+
+import geopandas as gpd
+import shapely
+
+from namesviz.data import CACHE_DIR, file_hash
+
+DEPARTMENTS_GEOJSON = './data/departements-avec-outre-mer.geojson'
+GEOMETRY_CACHE_DIR = os.path.join(CACHE_DIR, 'geometry')
+# Part of the cache file names, bumped when the simplification changes so stale files are not reused
+GEOMETRY_VERSION = 2
+
+DOM_TOM_TRANSLATION = {
+    '971': (0, 0),  # Guadeloupe
+    '972': (-28, -30),  # Martinique
+    '973': (-26, -30),  # Guyane
+    '974': (-24, -30),  # La Réunion
+    '975': (-22, -30),  # Saint-Pierre-et-Miquelon
+    '976': (-20, -30),  # Mayotte
+    '977': (-18, -30),  # Saint-Barthélemy
+    '978': (-16, -30),  # Saint-Martin
+    '984': (-14, -30),  # Terres australes et antarctiques françaises
+    '986': (-12, -30),  # Wallis-et-Futuna
+    '987': (-10, -30),  # Polynésie française
+    '988': (-8, -30)    # Nouvelle-Calédonie
+}
+
+# Simplification tolerance in degrees; 'medium' is close to departements-version-simplifiee.geojson.
+# The departments are simplified as one coverage, so each border shared by two of them
+# is simplified once and stays identical on both sides, without gaps or overlaps
+LEVELS_OF_DETAIL = {'full': 0.0, 'medium': 0.005, 'low': 0.02}
+
+
+def translate_overseas(depts):
+    depts = depts.copy()
+    for code, (xoff, yoff) in DOM_TOM_TRANSLATION.items():
+        overseas = depts['code'] == code
+        if overseas.any():
+            depts.loc[overseas, 'geometry'] = depts.loc[overseas, 'geometry'].translate(xoff=xoff, yoff=yoff)
+    return depts
+
+
+def geometry_cache_path(level, source=DEPARTMENTS_GEOJSON, cache_dir=GEOMETRY_CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(cache_dir, f"{stem}-{file_hash(source)[:16]}-v{GEOMETRY_VERSION}-{level}.parquet")
+
+
+def build_geometry_cache(source=DEPARTMENTS_GEOJSON, cache_dir=GEOMETRY_CACHE_DIR):
+    """Write every level of detail for ``source`` and return their paths."""
+    depts = translate_overseas(gpd.read_file(source))
+    depts['code'] = depts['code'].astype(str)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    paths = {}
+    for level, tolerance in LEVELS_OF_DETAIL.items():
+        simplified = depts.copy()
+        if tolerance:
+            simplified['geometry'] = gpd.GeoSeries(shapely.coverage_simplify(simplified.geometry.values, tolerance),
+                                                   index=simplified.index, crs=simplified.crs)
+        path = geometry_cache_path(level, source, cache_dir)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        simplified.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        paths[level] = path
+    return paths
+
+
+def load_geometry(level='full', source=DEPARTMENTS_GEOJSON, cache_dir=GEOMETRY_CACHE_DIR):
+    path = geometry_cache_path(level, source, cache_dir)
+    if not os.path.exists(path):
+        build_geometry_cache(source, cache_dir)
+    return gpd.read_parquet(path)
+
+
+def level_for_scale(scale):
+    """Coarsest level whose tolerance stays under one pixel at a mercator ``scale``."""
+    pixel_degrees = 180 / (math.pi * scale)
+    fitting = [level for level, tolerance in LEVELS_OF_DETAIL.items() if tolerance <= pixel_degrees]
+    return max(fitting, key=LEVELS_OF_DETAIL.get)
@@ -0,0 +1,145 @@
+"""Pooled HTTP session with a TTL-bounded, size-bounded response cache."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from namesviz.data import CACHE_DIR
+from namesviz.instrument import stage
+
+HTTP_CACHE_PATH = os.path.join(CACHE_DIR, 'http.sqlite')
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+USER_AGENT = "FrenchNamesViz/1.0 (https://github.com/PierreBio/FrenchNamesViz)"
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """In-process backend with the same interface as ``SQLiteCache``, evicting least recently used entries."""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """On-disk backend shared by every session and process on the host.
+
+    Entries expire after ``ttl`` seconds; once the stored JSON exceeds ``max_bytes``
+    the least recently read entries are evicted.
+    """
+
+    def __init__(self, path=HTTP_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+            'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute('SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                self._connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None
+            self._connection.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(value)
+
+    def set(self, key, value):
+        payload = json.dumps(value, separators=(',', ':'))
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, payload, len(payload), now + self.ttl, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._connection.execute('DELETE FROM entries WHERE expires_at < ?', (now,))
+        (total,) = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._connection.execute('SELECT key, size FROM entries ORDER BY accessed_at'):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._connection.executemany('DELETE FROM entries WHERE key = ?', stale)
+
+
+class CachedClient:
+    """JSON GETs over one pooled session, answered from ``cache`` when possible.
+
+    Failed requests (errors, timeouts, non-200 or non-JSON answers) return ``None`` and are not cached.
+    """
+
+    def __init__(self, cache=None, timeout=(3.05, 10), pool_size=16, retries=2):
+        self.cache = cache if cache is not None else MemoryCache()
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_json(self, url, params=None):
+        key = f"{url}?{urlencode(sorted((params or {}).items()))}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            with stage('network'):
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            if response.status_code != 200:
+                logger.warning("GET %s answered %s", url, response.status_code)
+                return None
+            data = response.json()
+        except (requests.RequestException, ValueError) as error:
+            # ValueError: an HTML error page or a truncated body behind a 200
+            logger.warning("GET %s failed: %s", url, error)
+            return None
+        self.cache.set(key, data)
+        return data
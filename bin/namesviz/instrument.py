@@ -0,0 +1,239 @@
+"""Stage timers for app reruns and batch jobs, reported as structured logs and Prometheus text.
+
+Code that does the work wraps it in ``stage(name)``; the time is added to the profile of
+the run in progress on that thread, if any, and always to the process-wide histograms of
+``METRICS``. Nested stages each count their whole duration, so the geometry merge of a
+map includes the groupby it triggers.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+import pandas as pd
+
+STAGES = ('load', 'filter', 'groupby', 'top_k', 'peaks', 'similarity', 'cluster', 'geometry', 'serialize', 'render', 'network')
+
+# Upper bounds in seconds, from a cheap array lookup to a cold load
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    'namesviz_stage_seconds': "Time spent in each stage",
+    'namesviz_run_seconds': "Wall time of a whole rerun or batch job",
+}
+
+# Label of the stages timed outside of any run, e.g. in the background enrichment threads
+NO_APP = 'none'
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    """Process-wide histograms per metric name and label set."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, labels, seconds):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def stage_summary(self):
+        """Calls, total seconds and mean milliseconds per (app, stage) since the process started."""
+        with self._lock:
+            rows = [
+                {**dict(labels), 'calls': histogram.count, 'seconds': histogram.sum}
+                for (metric, labels), histogram in self._histograms.items() if metric == 'namesviz_stage_seconds'
+            ]
+        frame = pd.DataFrame(rows, columns=['app', 'stage', 'calls', 'seconds'])
+        return frame.assign(mean_ms=1000 * frame['seconds'] / frame['calls'].clip(lower=1))
+
+    def prometheus_text(self, **const_labels):
+        """The histograms in the Prometheus text exposition format, ``const_labels`` added to every series."""
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            lines = []
+            last_metric = None
+            for (metric, labels), histogram in histograms:
+                if metric != last_metric:
+                    lines += [f"# HELP {metric} {METRIC_HELP.get(metric, metric)}", f"# TYPE {metric} histogram"]
+                    last_metric = metric
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_labels(labels, **const_labels, le=repr(bound))} {cumulative}")
+                lines.append(f"{metric}_bucket{_labels(labels, **const_labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{metric}_sum{_labels(labels, **const_labels)} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{_labels(labels, **const_labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+METRICS = Metrics()
+
+
+class Profile:
+    """Stage timings of one run of ``app``, summed when a stage runs several times."""
+
+    def __init__(self, app):
+        self.app = app
+        self.started = self.last_stage_end = time.perf_counter()
+        self.total = None
+        self.interrupted = False
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.last_stage_end = time.perf_counter()
+
+    def summary(self):
+        return {
+            'app': self.app,
+            'total_seconds': round(self.total if self.total is not None else time.perf_counter() - self.started, 6),
+            'interrupted': self.interrupted,
+            'stages': {name: {'seconds': round(self.seconds[name], 6), 'calls': self.calls[name]} for name in self.seconds},
+        }
+
+    def frame(self):
+        """One row per stage in ``STAGES`` order, with calls, milliseconds and share of the run."""
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        order = sorted(self.seconds, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES))
+        return pd.DataFrame({
+            'stage': order,
+            'calls': [self.calls[name] for name in order],
+            'ms': [1000 * self.seconds[name] for name in order],
+            'share': [self.seconds[name] / total if total else 0.0 for name in order],
+        })
+
+
+_current = ContextVar('namesviz_profile', default=None)
+
+
+def current_profile():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage ``name`` of the current run."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        profile = _current.get()
+        if profile is not None:
+            profile.add(name, elapsed)
+        METRICS.observe('namesviz_stage_seconds', {'app': profile.app if profile else NO_APP, 'stage': name}, elapsed)
+
+
+def timed(name):
+    """Decorator running the whole function as stage ``name``."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_profile(app):
+    """Open the profile of a new run on this thread, replacing one left open by an interrupted run."""
+    profile = Profile(app)
+    _current.set(profile)
+    return profile
+
+
+def finish_profile(log=True, profile=None, interrupted=False):
+    """Close ``profile`` (the current one by default), record the run duration and log its summary as one JSON line.
+
+    The run of an ``interrupted`` profile stopped without closing it, at an exception or
+    a stop; it is closed later and counted up to the end of its last stage.
+    """
+    if profile is None:
+        profile = _current.get()
+        if profile is None:
+            return None
+    if _current.get() is profile:
+        _current.set(None)
+    if profile.total is not None:
+        return profile
+    profile.interrupted = interrupted
+    profile.total = (profile.last_stage_end if interrupted else time.perf_counter()) - profile.started
+    METRICS.observe('namesviz_run_seconds', {'app': profile.app}, profile.total)
+    if log:
+        logger.info(json.dumps({'event': 'run_profile', **profile.summary()}, sort_keys=True))
+    return profile
+
+
+@contextmanager
+def profiled(app, log=True):
+    profile = start_profile(app)
+    try:
+        yield profile
+    finally:
+        finish_profile(log)
+
+
+def log_profiles(stream=None):
+    """Send the run profiles to ``stream`` (stderr by default) at INFO, whatever the level of the root logger.
+
+    Streamlit leaves the root logger at WARNING, which would drop them. Idempotent.
+    """
+    if not any(getattr(handler, 'namesviz_profiles', False) for handler in logger.handlers):
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.namesviz_profiles = True
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    # The handler above prints them; an app that also logs at INFO would print them twice
+    logger.propagate = False
+
+
+def process_textfile(path, app):
+    """``path`` suffixed with ``app`` and the process id, so that processes never overwrite each other."""
+    root, extension = os.path.splitext(path)
+    return f"{root}-{app}-{os.getpid()}{extension}"
+
+
+def write_prometheus_textfile(path, metrics=METRICS, **const_labels):
+    """Write the metrics where a textfile collector scrapes them, replacing the file in one rename."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as target:
+        target.write(metrics.prometheus_text(**const_labels))
+    os.replace(tmp_path, path)
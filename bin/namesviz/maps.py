@@ -0,0 +1,100 @@
+"""Choropleths that ship department geometry once and only per-department values on updates."""
+
+import json
+import os
+from collections import namedtuple
+
+import altair as alt
+from shapely.geometry import mapping
+
+from namesviz.geometry import DEPARTMENTS_GEOJSON, geometry_cache_path, load_geometry
+from namesviz.instrument import timed
+
+# Streamlit serves the ``static`` folder next to the app scripts under app/static
+# when server.enableStaticServing is set (see .streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+STATIC_URL = 'app/static'
+TOPOJSON_OBJECT = 'departements'
+
+# ``topology`` is only set for embedded assets, whose charts carry the geometry inline
+GeometryAsset = namedtuple('GeometryAsset', ['url', 'codes', 'topology'], defaults=(None,))
+
+
+def to_topojson(depts, object_name=TOPOJSON_OBJECT, quantization=100_000):
+    """Quantized, delta-encoded TopoJSON with one arc per ring and code/nom properties."""
+    minx, miny, maxx, maxy = depts.total_bounds
+    kx = (maxx - minx) / (quantization - 1) or 1
+    ky = (maxy - miny) / (quantization - 1) or 1
+    arcs = []
+
+    def encode_ring(ring):
+        points = [(round((x - minx) / kx), round((y - miny) / ky)) for x, y, *_ in ring]
+        arc = [list(points[0])]
+        for previous, point in zip(points, points[1:]):
+            if point != previous:
+                arc.append([point[0] - previous[0], point[1] - previous[1]])
+        arcs.append(arc)
+        return len(arcs) - 1
+
+    def encode_polygon(polygon):
+        return [[encode_ring(ring)] for ring in polygon]
+
+    geometries = []
+    for code, nom, geometry in zip(depts['code'], depts['nom'], depts.geometry):
+        shape = mapping(geometry)
+        if shape['type'] == 'Polygon':
+            polygon_arcs = encode_polygon(shape['coordinates'])
+        else:
+            polygon_arcs = [encode_polygon(polygon) for polygon in shape['coordinates']]
+        geometries.append({'type': shape['type'], 'arcs': polygon_arcs, 'properties': {'code': str(code), 'nom': nom}})
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [kx, ky], 'translate': [minx, miny]},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs,
+    }
+
+
+def publish_geometry(level, source=DEPARTMENTS_GEOJSON, static_dir=STATIC_DIR, static_url=STATIC_URL):
+    """Write the TopoJSON for a level of detail once and return its URL and department codes.
+
+    The file name carries the source hash, so browsers can keep it cached for good.
+    """
+    depts = load_geometry(level, source)
+    filename = os.path.basename(geometry_cache_path(level, source)).replace('.parquet', '.topo.json')
+    path = os.path.join(static_dir, filename)
+    if not os.path.exists(path):
+        os.makedirs(static_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as target:
+            json.dump(to_topojson(depts), target, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    return GeometryAsset(f"{static_url}/{filename}", depts['code'].astype(str).tolist())
+
+
+def embed_geometry(level, source=DEPARTMENTS_GEOJSON):
+    """Asset whose TopoJSON is inlined in the chart spec, for renderers that cannot fetch URLs."""
+    depts = load_geometry(level, source)
+    return GeometryAsset(None, depts['code'].astype(str).tolist(), to_topojson(depts))
+
+
+@timed('geometry')
+def department_values(asset, values, key='dpt', fill=None):
+    """Reindex ``values`` on every department of ``asset`` so that no shape drops out of the map."""
+    table = values.assign(code=values[key].astype(str)).drop(columns=key).set_index('code').reindex(asset.codes)
+    if fill is not None:
+        table = table.fillna(fill)
+    return table.rename_axis('code').reset_index()
+
+
+def choropleth(asset, values, fields):
+    """Geoshape chart of ``asset`` joined client-side with ``values`` on the department code."""
+    if asset.topology is None:
+        data = alt.topo_feature(asset.url, TOPOJSON_OBJECT)
+    else:
+        data = alt.InlineData(values=asset.topology, format=alt.TopoDataFormat(type='topojson', feature=TOPOJSON_OBJECT))
+    return alt.Chart(data).mark_geoshape().transform_lookup(
+        lookup='properties.code',
+        from_=alt.LookupData(data=values, key='code', fields=fields),
+    )
@@ -0,0 +1,65 @@
+"""Peak detection over every column of a years x names matrix at once."""
+
+import numpy as np
+
+
+def find_peaks_2d(values, height=None):
+    """Column-wise equivalent of ``scipy.signal.find_peaks(column, height=height)``.
+
+    Returns ``(columns, rows)`` of every peak, sorted by column then row. As in
+    scipy, a flat peak is reported at the middle of its plateau (rounded down) and
+    the first and last rows are never peaks.
+    """
+    values = np.asarray(values)
+    n_rows = values.shape[0]
+    if n_rows < 3 or values.shape[1] == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    slope = np.sign(np.diff(values, axis=0))
+    # For each step, the index of the first non-flat step at or after it (n_rows - 1 when none is left)
+    sentinel = n_rows - 1
+    steps = np.where(slope != 0, np.arange(n_rows - 1)[:, None], sentinel)
+    next_change = np.minimum.accumulate(steps[::-1], axis=0)[::-1]
+
+    # A rise into row r + 1 whose plateau is left by a fall is a peak
+    plateau_end = next_change[1:]
+    falls = np.take_along_axis(slope, np.minimum(plateau_end, n_rows - 2), axis=0) < 0
+    is_peak = (slope[:-1] > 0) & (plateau_end < sentinel) & falls
+
+    columns, rises = np.nonzero(is_peak.T)
+    rows = (rises + 1 + plateau_end[rises, columns]) // 2
+    if height is not None:
+        high_enough = values[rows, columns] >= height
+        columns, rows = columns[high_enough], rows[high_enough]
+    return columns, rows
+
+
+def peak_columns(values, height):
+    """``(column, peaks, peak_values)`` for every column of ``values`` that has peaks of at least ``height``."""
+    columns, rows = find_peaks_2d(values, height=height)
+    boundaries = np.flatnonzero(np.diff(columns)) + 1
+    for peak_columns, peaks in zip(np.split(columns, boundaries), np.split(rows, boundaries)):
+        if len(peaks):
+            column = peak_columns[0]
+            yield column, peaks, values[peaks, column]
+
+
+def threshold_candidates(maxima, min_threshold, max_threshold=None):
+    candidates = maxima >= min_threshold
+    if max_threshold is not None:
+        candidates &= maxima <= max_threshold
+    return np.flatnonzero(candidates)
+
+
+def find_popular_names(name_trends, min_threshold, max_threshold=None):
+    """``(name, peaks, values)`` for every name whose maximum lies within the thresholds
+    and that peaks at ``min_threshold`` or more, in column order."""
+    values = name_trends.to_numpy()
+    if values.size == 0:
+        return []
+    candidates = threshold_candidates(values.max(axis=0), min_threshold, max_threshold)
+    return [
+        (name_trends.columns[candidates[column]], peaks, peak_values)
+        for column, peaks, peak_values in peak_columns(values[:, candidates], min_threshold)
+    ]
@@ -0,0 +1,141 @@
+"""National counts and ranks per name, per year and per year range."""
+
+import numpy as np
+import pandas as pd
+
+from namesviz.instrument import timed
+
+# Axis of the sex dimension of the ranks: both sexes combined, then the SEXES codes
+SEX_AXES = {None: 0, 1: 1, 2: 2}
+# Axes of the prefix sums to add up: only each sex is stored
+PREFIX_AXES = {None: [0, 1], 1: [0], 2: [1]}
+
+
+def competition_ranks(counts):
+    """Rank of every entry of each row, 1 + the number of larger entries in that row; 0 where the count is 0.
+
+    ``counts`` is 1-D or (rows, entries); all rows are ranked with one global sort
+    by offsetting each row's keys past the previous row's maximum.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    table = np.atleast_2d(counts)
+    rows, width = table.shape
+    offsets = np.arange(rows, dtype=np.int64)[:, None] * (int(table.max(initial=0)) + 1)
+    keys = (table + offsets).ravel()
+    above = np.searchsorted(np.sort(keys), keys, side='right').reshape(rows, width)
+    ranks = 1 + (np.arange(1, rows + 1, dtype=np.int64)[:, None] * width - above)
+    ranks[table == 0] = 0
+    return ranks.reshape(counts.shape)
+
+
+class NameRanking:
+    """Year-by-year prefix sums and precomputed per-year ranks, for both sexes and each sex.
+
+    ``prefix[s, y]`` holds the births of every name before year index ``y`` for sex ``s + 1``,
+    in int32 when the largest total fits, so a range is one subtraction per sex and both
+    sexes combined are their sum; ``year_ranks[s, y]`` is the national rank of every name
+    in that year for sex axis ``s`` of ``SEX_AXES``, stored in the smallest unsigned type
+    that fits the vocabulary.
+    """
+
+    def __init__(self, names, years, prefix, year_ranks):
+        self.names = names
+        self.years = years
+        self.prefix = prefix
+        self.year_ranks = year_ranks
+
+    @classmethod
+    def from_cube(cls, cube):
+        counts = _axis_counts(cube)
+        rank_type = np.min_scalar_type(len(cube.names))
+        year_ranks = np.stack([competition_ranks(axis_counts).astype(rank_type) for axis_counts in counts])
+        return cls(cube.names, cube.years, _prefix_sums(counts[1:]), year_ranks)
+
+    def updated(self, cube, changed_years):
+        """The ranking of ``cube``, re-ranking only ``changed_years`` and the years this ranking lacks.
+
+        The ranks of a year depend on that year's counts alone, so the others are copied,
+        realigned on the vocabulary of ``cube``. Prefix sums are one cumulative sum and are
+        recomputed whole.
+        """
+        counts = _axis_counts(cube)
+        rerank = np.isin(cube.years, list(changed_years)) | ~np.isin(cube.years, self.years)
+        year_ranks = np.zeros(counts.shape, dtype=np.min_scalar_type(len(cube.names)))
+        for axis, axis_counts in enumerate(counts):
+            year_ranks[axis, rerank] = competition_ranks(axis_counts[rerank])
+
+        kept = cube.years[~rerank].astype(np.int64)
+        old_ids = self.names.get_indexer(cube.names)
+        known = np.flatnonzero(old_ids >= 0)
+        axes = np.arange(len(SEX_AXES))
+        year_ranks[np.ix_(axes, kept - cube.years[0], known)] = \
+            self.year_ranks[np.ix_(axes, kept - self.years[0], old_ids[known])]
+        return NameRanking(cube.names, cube.years, _prefix_sums(counts[1:]), year_ranks)
+
+    def _year_bounds(self, start_year, end_year):
+        first = int(self.years[0])
+        return max(int(start_year) - first, 0), min(int(end_year) - first, len(self.years) - 1)
+
+    def counts(self, start_year, end_year, sex=None):
+        """Births over the range for every name id."""
+        start, end = self._year_bounds(start_year, end_year)
+        if start > end:
+            return np.zeros(len(self.names), dtype=np.int64)
+        axes = PREFIX_AXES[sex]
+        return (self.prefix[axes, end + 1].astype(np.int64) - self.prefix[axes, start]).sum(axis=0)
+
+    def ranks(self, start_year, end_year, sex=None):
+        """National rank over the range for every name id, 0 for names not given."""
+        start, end = self._year_bounds(start_year, end_year)
+        if start == end:
+            return self.year_ranks[SEX_AXES[sex], start]
+        return competition_ranks(self.counts(start_year, end_year, sex))
+
+    def rank(self, name, year, sex=None):
+        """(rank, count) of one name in one year."""
+        name_id = self.names.get_loc(name)
+        year_id = int(year) - int(self.years[0])
+        if not 0 <= year_id < len(self.years):
+            return 0, 0
+        axes = PREFIX_AXES[sex]
+        count = (self.prefix[axes, year_id + 1, name_id].astype(np.int64) - self.prefix[axes, year_id, name_id]).sum()
+        return int(self.year_ranks[SEX_AXES[sex], year_id, name_id]), int(count)
+
+    @timed('top_k')
+    def top(self, start_year, end_year, n=10, sex=None):
+        """The ``n`` most given names over the range, with counts and ranks."""
+        counts = self.counts(start_year, end_year, sex)
+        n = min(n, np.count_nonzero(counts))
+        if n == 0:
+            return pd.DataFrame({'preusuel': pd.Series(dtype=object), 'nombre': pd.Series(dtype=np.int64),
+                                 'rank': pd.Series(dtype=np.int64)})
+        best = np.argpartition(-counts, n - 1)[:n]
+        best = best[np.lexsort((best, -counts[best]))]
+        ranks = 1 + np.searchsorted(-np.sort(counts)[::-1], -counts[best], side='left')
+        return pd.DataFrame({'preusuel': self.names[best], 'nombre': counts[best], 'rank': ranks})
+
+    def rank_series(self, name, sex=None):
+        """(annais, nombre, rank) rows for every year in which the name was given."""
+        name_id = self.names.get_loc(name)
+        counts = np.diff(self.prefix[PREFIX_AXES[sex], :, name_id].astype(np.int64), axis=1).sum(axis=0)
+        present = np.flatnonzero(counts)
+        return pd.DataFrame({
+            'annais': self.years[present],
+            'nombre': counts[present],
+            'rank': self.year_ranks[SEX_AXES[sex], present, name_id].astype(np.int64),
+        })
+
+
+def _axis_counts(cube):
+    """Births as (sex axis, year, name): both sexes combined, then each sex."""
+    by_sex = cube.counts.transpose(2, 1, 0).astype(np.int64)
+    return np.concatenate([by_sex.sum(axis=0, keepdims=True), by_sex])
+
+
+def _prefix_sums(counts):
+    """Cumulative sums over the year axis, starting with zeros, in int32 unless a total needs more."""
+    totals = counts.sum(axis=1)
+    dtype = np.int32 if totals.max(initial=0) <= np.iinfo(np.int32).max else np.int64
+    prefix = np.zeros((counts.shape[0], counts.shape[1] + 1, counts.shape[2]), dtype=dtype)
+    np.cumsum(counts, axis=1, out=prefix[:, 1:])
+    return prefix
@@ -0,0 +1,94 @@
+"""Department shares, location quotients and top departments for many names at once."""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from namesviz.instrument import timed
+from namesviz.topk import ranks_within_groups
+
+METRICS = ('proportion', 'location_quotient')
+
+
+class RegionalProfile:
+    """Births of a list of names per department over one year range, as a sparse names x departments matrix.
+
+    ``proportion`` is the share of a department's births given the name, as in the maps;
+    ``location_quotient`` is the share of the name's births born in the department over
+    the department's share of all births, so 1 means the name is as common there as
+    nationally and 2 means twice as common.
+    """
+
+    def __init__(self, names, departments, counts, department_totals):
+        self.names = names
+        self.departments = departments
+        self.counts = counts
+        self.department_totals = department_totals
+
+    @classmethod
+    def from_index(cls, range_index, start_year, end_year, names=None, sex=None):
+        """Profile of ``names`` (every name by default), both sexes combined or ``sex`` only."""
+        labels = range_index.names if names is None else pd.Index(names)
+        name_ids = range_index.names.get_indexer(labels)
+        if (name_ids < 0).any():
+            raise KeyError(f"Unknown names: {', '.join(map(str, labels[name_ids < 0][:10]))}")
+        counts = range_index.name_department_matrix(name_ids, start_year, end_year, sex)
+        totals = range_index.department_totals(start_year, end_year, sex)
+        department_totals = np.zeros(len(range_index.departments), dtype=np.int64)
+        department_totals[totals['dpt'].cat.codes.to_numpy()] = totals['total_count'].to_numpy()
+        return cls(labels, range_index.departments, counts, department_totals)
+
+    def name_totals(self):
+        return np.asarray(self.counts.sum(axis=1)).ravel()
+
+    def proportions(self):
+        """Sparse matrix of the share of each department's births given each name."""
+        return self.counts.multiply(_inverse(self.department_totals)[None, :]).tocsr()
+
+    def location_quotients(self):
+        """Sparse matrix of the location quotient of each name in each department."""
+        department_shares = self.department_totals / max(self.department_totals.sum(), 1)
+        scale = sparse.diags(_inverse(self.name_totals()))
+        return (scale @ self.counts).multiply(_inverse(department_shares)[None, :]).tocsr()
+
+    @timed('groupby')
+    def frame(self):
+        """Long table of the non-zero (name, department) cells with their births and both metrics."""
+        cells = self.counts.tocoo()
+        rows, columns = cells.row, cells.col
+        department_shares = self.department_totals / max(self.department_totals.sum(), 1)
+        nombre = cells.data.astype(np.int64)
+        return pd.DataFrame({
+            'preusuel': pd.Categorical.from_codes(rows, categories=self.names),
+            'dpt': pd.Categorical.from_codes(columns, categories=self.departments),
+            'nombre': nombre,
+            'proportion': nombre / self.department_totals[columns],
+            'location_quotient': nombre / self.name_totals()[rows] / department_shares[columns],
+        })
+
+    @timed('top_k')
+    def top_departments(self, n=3, by='location_quotient', min_births=1):
+        """The ``n`` departments of each name with the highest ``by``, among cells with at least ``min_births``.
+
+        Ties keep the department order; ``rank`` starts at 1 within each name.
+        """
+        if by not in METRICS:
+            raise ValueError(f"by must be one of {', '.join(METRICS)}")
+        cells = self.frame()
+        cells = cells[cells['nombre'] >= min_births]
+        name_ids = cells['preusuel'].cat.codes.to_numpy()
+        order = np.lexsort((-cells[by].to_numpy(), name_ids))
+        name_ids = name_ids[order]
+        new_name = np.ones(len(order), dtype=bool)
+        new_name[1:] = name_ids[1:] != name_ids[:-1]
+        rank = ranks_within_groups(new_name)
+        keep = rank < n
+        top = cells.iloc[order[keep]].reset_index(drop=True)
+        top['rank'] = (rank[keep] + 1).astype(np.int16)
+        return top
+
+
+def _inverse(values):
+    """1 / values, with 0 where values is 0."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.divide(1.0, values, out=np.zeros_like(values), where=values != 0)
@@ -0,0 +1,99 @@
+"""Accent-insensitive prefix and trigram search over the name vocabulary."""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from namesviz.ranking import competition_ranks
+
+SEPARATORS = re.compile(r"[-'\s]+")
+
+
+def normalize(text):
+    """Upper-case, accent-free form in which hyphens, apostrophes and spaces are equivalent."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return SEPARATORS.sub(' ', stripped).strip().upper()
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Sorted normalized keys for prefix lookups plus a trigram inverted index for typos.
+
+    Name ids are positions in ``names``, the same ids as the cube and the range index,
+    so the counts of any period can be passed to ``search`` as a plain array.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        keys = np.array([normalize(name) for name in names])
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+        postings = {}
+        self.trigram_counts = np.empty(len(names), dtype=np.int32)
+        for name_id, key in enumerate(keys):
+            grams = trigrams(key)
+            self.trigram_counts[name_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(name_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def prefix_matches(self, query):
+        key = normalize(query)
+        lo = np.searchsorted(self.sorted_keys, key, side='left')
+        hi = np.searchsorted(self.sorted_keys, key + '\uffff', side='left')
+        return self.order[lo:hi]
+
+    def fuzzy_matches(self, query, min_similarity=0.3):
+        """Name ids whose trigram Jaccard similarity with ``query`` reaches ``min_similarity``, best first."""
+        grams = trigrams(normalize(query))
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(grams) + self.trigram_counts[candidates] - shared[candidates])
+        keep = similarity >= min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+        return candidates[np.argsort(-similarity, kind='stable')]
+
+    def search(self, query, counts, ranks=None, limit=50, fuzzy=True):
+        """Top ``limit`` matches among the names with a non-zero count, with their count and rank.
+
+        Prefix matches come first, by decreasing count; when they are fewer than
+        ``limit``, trigram matches fill the rest. An empty query returns the
+        most given names. ``ranks`` defaults to the competition ranks of ``counts``;
+        pass the precomputed ones from ``NameRanking`` to skip the sort.
+        """
+        present = counts > 0
+        if query.strip():
+            prefix = self.prefix_matches(query)
+            prefix = prefix[present[prefix]]
+            matches = prefix[np.lexsort((prefix, -counts[prefix]))][:limit]
+            if fuzzy and len(matches) < limit:
+                fuzzy_ids = self.fuzzy_matches(query)
+                fuzzy_ids = fuzzy_ids[present[fuzzy_ids] & ~np.isin(fuzzy_ids, matches)]
+                matches = np.concatenate([matches, fuzzy_ids[:limit - len(matches)]])
+        else:
+            candidates = np.flatnonzero(present)
+            matches = candidates[np.lexsort((candidates, -counts[candidates]))][:limit]
+
+        if ranks is None:
+            ranks = competition_ranks(counts)
+        return pd.DataFrame({
+            'preusuel': self.names[matches],
+            'nombre': counts[matches],
+            'rank': np.asarray(ranks[matches], dtype=np.int64),
+        })
+
+
+def name_labels(matches):
+    """Select box labels, as 'NAME (count, #rank)'."""
+    return {row.preusuel: f"{row.preusuel} ({row.nombre}, #{row.rank})" for row in matches.itertuples(index=False)}
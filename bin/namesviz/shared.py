@@ -0,0 +1,84 @@
+"""Derived structures saved as .npy files and memory-mapped read-only, so every process shares their pages.
+
+A structure is saved attribute by attribute: NumPy arrays and the parts of SciPy sparse
+matrices go to their own .npy files, everything else (labels, small scalars) is pickled
+together in one metadata file. Mapping it back reads no array data: the pages are
+loaded on first access and shared through the page cache by every Streamlit server
+and batch worker on the host. The mapped arrays are read-only, so analytics code that
+tried to write into them would raise instead of corrupting the shared copy.
+"""
+
+import os
+import pickle
+import shutil
+
+import numpy as np
+from scipy import sparse
+
+METADATA = 'structure.pickle'
+SPARSE_PARTS = ('data', 'indices', 'indptr')
+
+
+def structures_dir(snapshot_path):
+    """Folder of the structures derived from the Arrow snapshot at ``snapshot_path``."""
+    return f"{os.path.splitext(snapshot_path)[0]}.structures"
+
+
+def save_structure(structure, directory):
+    """Write every attribute of ``structure``, then move the folder into place in one rename."""
+    tmp_dir = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    metadata = {'class': type(structure), 'arrays': [], 'sparse': {}, 'objects': {}}
+    for attribute, value in vars(structure).items():
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(tmp_dir, f"{attribute}.npy"), value)
+            metadata['arrays'].append(attribute)
+        elif sparse.issparse(value):
+            value = value.tocsc()
+            for part in SPARSE_PARTS:
+                np.save(os.path.join(tmp_dir, f"{attribute}.{part}.npy"), getattr(value, part))
+            metadata['sparse'][attribute] = value.shape
+        else:
+            metadata['objects'][attribute] = value
+    with open(os.path.join(tmp_dir, METADATA), 'wb') as target:
+        pickle.dump(metadata, target, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Another process saved the same structure first; both copies are identical
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def map_structure(directory):
+    """The structure saved in ``directory``, its arrays memory-mapped read-only."""
+    with open(os.path.join(directory, METADATA), 'rb') as source:
+        metadata = pickle.load(source)
+    structure = metadata['class'].__new__(metadata['class'])
+    attributes = dict(metadata['objects'])
+    for attribute in metadata['arrays']:
+        attributes[attribute] = np.load(os.path.join(directory, f"{attribute}.npy"), mmap_mode='r')
+    for attribute, shape in metadata['sparse'].items():
+        parts = [np.load(os.path.join(directory, f"{attribute}.{part}.npy"), mmap_mode='r') for part in SPARSE_PARTS]
+        attributes[attribute] = sparse.csc_matrix(tuple(parts), shape=shape, copy=False)
+    structure.__dict__.update(attributes)
+    return structure
+
+
+def shared_structure(directory, build):
+    """Map the structure saved in ``directory``, calling ``build`` and saving its result first if there is none."""
+    if not os.path.exists(os.path.join(directory, METADATA)):
+        save_structure(build(), directory)
+    return map_structure(directory)
+
+
+def freeze(structure):
+    """Make the arrays of a structure kept in memory read-only, as if it had been mapped."""
+    for value in vars(structure).values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        elif isinstance(value, dict):
+            for item in value.values():
+                if isinstance(item, np.ndarray):
+                    item.flags.writeable = False
+    return structure
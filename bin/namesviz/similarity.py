@@ -0,0 +1,114 @@
+"""Names whose yearly share of births followed a similar trajectory, by cosine or banded DTW."""
+
+import numpy as np
+import pandas as pd
+
+from namesviz.instrument import timed
+
+METHODS = ('cosine', 'dtw')
+
+
+class TrajectoryIndex:
+    """Yearly shares of births of every name given at least ``min_births`` times, as a dense names x years array.
+
+    ``unit`` holds each series scaled to unit length, so one matrix-vector product gives
+    the cosine similarity of a name with all others. ``basis`` projects them on their
+    first principal directions; rescaled to unit length, these approximate the cosine
+    well enough to shortlist candidates before ranking them exactly.
+    """
+
+    def __init__(self, names, years, shares, unit, basis):
+        self.names = names
+        self.years = years
+        self.shares = shares
+        self.unit = unit
+        self.basis = basis
+        reduced = unit @ basis
+        self.reduced = reduced / np.maximum(np.linalg.norm(reduced, axis=1, keepdims=True), 1e-12)
+
+    @classmethod
+    def from_trends(cls, name_trends, min_births=100, components=16):
+        matrix = name_trends.matrix
+        births = np.asarray(matrix.sum(axis=1), dtype=np.float64).ravel()
+        kept = np.flatnonzero(np.asarray(matrix.sum(axis=0)).ravel() >= min_births)
+        shares = (matrix[:, kept].toarray().T / np.where(births > 0, births, 1)).astype(np.float32)
+        norms = np.linalg.norm(shares, axis=1, keepdims=True)
+        unit = shares / np.where(norms > 0, norms, 1)
+        # Right singular vectors of the unit series: the directions that keep the most of their variance
+        basis = np.linalg.svd(unit, full_matrices=False)[2][:components].T.astype(np.float32)
+        return cls(name_trends.names[kept], name_trends.years, shares, unit, basis)
+
+    def name_id(self, name):
+        return self.names.get_loc(name)
+
+    @timed('similarity')
+    def similar(self, name, n=10, method='cosine', approximate=False, candidates=500, band=5):
+        """The ``n`` names closest to ``name``, excluding itself, best first.
+
+        ``cosine`` ranks every name by the cosine similarity of the shares; ``dtw`` re-ranks
+        the ``candidates`` best by cosine with a dynamic time warping distance that lets
+        the trajectories shift by up to ``band`` years. ``approximate`` shortlists the
+        candidates of either method in the reduced space first.
+        """
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}")
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        query = self.name_id(name)
+        pool = np.arange(len(self.names))
+        if approximate:
+            scores = self.reduced @ self.reduced[query]
+            pool = _best(scores, max(candidates, n + 1))
+        cosine = self.unit[pool] @ self.unit[query]
+        if method == 'cosine':
+            best = _best(cosine, n + 1)
+            best = best[pool[best] != query][:n]
+            return pd.DataFrame({'preusuel': self.names[pool[best]], 'similarity': cosine[best],
+                                 'rank': np.arange(1, len(best) + 1)})
+
+        shortlist = pool[_best(cosine, max(candidates, n + 1))]
+        shortlist = shortlist[shortlist != query]
+        distances = dtw_distances(_peak_scaled(self.shares[query]), _peak_scaled(self.shares[shortlist]), band)
+        best = np.argsort(distances, kind='stable')[:n]
+        return pd.DataFrame({'preusuel': self.names[shortlist[best]], 'distance': distances[best],
+                             'rank': np.arange(1, len(best) + 1)})
+
+    def frame(self, names):
+        """Year-indexed shares of births of ``names``, in percent."""
+        ids = self.names.get_indexer(names)
+        return pd.DataFrame(100 * self.shares[ids].T, index=pd.Index(self.years, name='annais'), columns=list(names))
+
+
+def _best(scores, n):
+    """Positions of the ``n`` highest scores, highest first."""
+    n = max(0, min(n, len(scores)))
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    best = np.argpartition(-scores, n - 1)[:n]
+    return best[np.argsort(-scores[best], kind='stable')]
+
+
+def _peak_scaled(series):
+    """Series divided by their maximum, so DTW compares shapes rather than popularity."""
+    peaks = series.max(axis=-1, keepdims=True)
+    return series / np.where(peaks > 0, peaks, 1)
+
+
+def dtw_distances(query, series, band=5):
+    """Dynamic time warping distance between ``query`` and every row of ``series``, within a Sakoe-Chiba band.
+
+    The recurrence runs over the (year, year) cells of the band once, each step updating
+    all rows together, so the cost is band x years vector operations whatever the number
+    of rows.
+    """
+    rows, length = series.shape
+    previous = np.full((rows, length + 1), np.inf)
+    previous[:, 0] = 0
+    current = np.empty_like(previous)
+    for i in range(1, length + 1):
+        current.fill(np.inf)
+        for j in range(max(1, i - band), min(length, i + band) + 1):
+            cost = np.abs(series[:, j - 1] - query[i - 1])
+            current[:, j] = cost + np.minimum(np.minimum(previous[:, j], previous[:, j - 1]), current[:, j - 1])
+        previous, current = current, previous
+    return previous[:, length]
@@ -0,0 +1,145 @@
+"""Synthetic names files in the dpt2020.csv schema, generated chunk by chunk at any size."""
+
+import gzip
+
+import numpy as np
+import pandas as pd
+
+from namesviz.data import RARE_NAMES, UNKNOWN_DPT
+
+CSV_COLUMNS = ['sexe', 'preusuel', 'annais', 'dpt', 'nombre']
+UNKNOWN_YEAR = 'XXXX'
+
+# INSEE publishes a (name, year, department) count only from this many births on;
+# the rest is summed into the _PRENOMS_RARES row of its sex, year and department
+MIN_PUBLISHED = 3
+
+DEPARTMENT_CODES = (
+    [f"{code:02d}" for code in range(1, 20)] + ['2A', '2B'] + [f"{code:02d}" for code in range(21, 96)]
+    + ['971', '972', '973', '974', '976']
+)
+
+SYLLABLES = [
+    'AL', 'AN', 'AU', 'BEL', 'BRI', 'CE', 'CHEL', 'CLA', 'CÉ', 'DE', 'E', 'EL', 'EM', 'ER', 'FLO', 'GA',
+    'GO', 'HU', 'IS', 'IX', 'JEAN', 'JU', 'LE', 'LI', 'LIEN', 'LINE', 'LOU', 'LÉ', 'MA', 'MAR', 'MI', 'NA',
+    'NE', 'NIS', 'NU', 'O', 'ON', 'PAUL', 'PHIE', 'PI', 'RA', 'RE', 'REN', 'RI', 'ROSE', 'SA', 'SO', 'TIN',
+    'TOM', 'TOR', 'VIC', 'YA', 'ZO', 'É', 'ÈLE',
+]
+
+
+def synthetic_names(count, seed=0):
+    """``count`` distinct upper-case names built from syllables, some hyphenated."""
+    rng = np.random.default_rng(seed)
+    syllables = np.array(SYLLABLES)
+    names = set()
+    ordered = []
+    while len(ordered) < count:
+        batch = count - len(ordered)
+        lengths = rng.integers(2, 5, batch)
+        picks = rng.integers(0, len(syllables), (batch, 4))
+        hyphens = rng.random(batch) < 0.05
+        for length, pick, hyphen in zip(lengths, picks, hyphens):
+            parts = syllables[pick[:length]]
+            name = f"{''.join(parts[:2])}-{''.join(parts[2:])}" if hyphen and length > 2 else ''.join(parts)
+            if name not in names:
+                names.add(name)
+                ordered.append(name)
+    return ordered
+
+
+def department_codes(count):
+    """The real department codes, followed by synthetic ones past the real list."""
+    return DEPARTMENT_CODES[:count] + [f"S{index:03d}" for index in range(count - len(DEPARTMENT_CODES))]
+
+
+def generate_names(n_names=30_000, first_year=1900, last_year=2020, births_per_year=750_000,
+                   n_departments=len(DEPARTMENT_CODES), zipf_exponent=1.1, spike_rate=0.01,
+                   unknown_rate=0.02, block_cells=4_000_000, seed=0):
+    """Yield DataFrames in the CSV schema: one per year and block of names, then the unknown-year rows.
+
+    Name popularity is Zipfian, with each name following a bell-shaped trend over the years
+    and, for ``spike_rate`` of them, a sudden spike decaying over the next years. Every
+    department has its own size and every name a mild regional preference. Births are drawn
+    from Poisson distributions, so no chunk holds more than ``block_cells`` (name, department)
+    cells whatever the size of the file.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array(synthetic_names(n_names, seed))
+    departments = np.array(department_codes(n_departments))
+    years = np.arange(first_year, last_year + 1)
+
+    base = 1.0 / np.arange(1, n_names + 1) ** zipf_exponent
+    rng.shuffle(base)
+    center = rng.uniform(first_year - 20, last_year + 20, n_names)
+    width = rng.uniform(5, 40, n_names)
+    # Most names are given to one sex, a few to both
+    male_share = np.select(
+        [rng.random(n_names) < 0.04, rng.random(n_names) < 0.5],
+        [rng.random(n_names), np.full(n_names, 0.99)],
+        np.full(n_names, 0.01),
+    )
+    spike_year = np.where(rng.random(n_names) < spike_rate, rng.integers(first_year, last_year + 1, n_names), -100)
+    spike_height = rng.uniform(5, 50, n_names)
+    dpt_share = rng.lognormal(0, 1, n_departments)
+    dpt_share /= dpt_share.sum()
+
+    block = max(1, block_cells // n_departments)
+    unknown = np.zeros((n_names, 2))
+    for year in years:
+        since_spike = year - spike_year
+        weights = base * (np.exp(-0.5 * ((year - center) / width) ** 2) + 0.02)
+        weights *= 1 + np.where((since_spike >= 0) & (since_spike < 4), spike_height * 0.5 ** since_spike, 0)
+        by_sex = np.stack([weights * male_share, weights * (1 - male_share)], axis=1)
+        by_sex *= births_per_year / by_sex.sum(axis=0) * np.array([0.51, 0.49])
+        unknown += by_sex * unknown_rate
+
+        rare = np.zeros((2, n_departments), dtype=np.int64)
+        for start in range(0, n_names, block):
+            stop = min(start + block, n_names)
+            # Seeded per block so each name keeps the same regional preference every year
+            affinity = np.random.default_rng([seed, start]).lognormal(0, 0.3, (stop - start, n_departments))
+            for sex in (0, 1):
+                expected = by_sex[start:stop, sex, None] * dpt_share * affinity
+                counts = rng.poisson(expected * (1 - unknown_rate))
+                published = counts >= MIN_PUBLISHED
+                rare[sex] += np.where(published, 0, counts).sum(axis=0)
+                name_idx, dpt_idx = np.nonzero(published)
+                yield pd.DataFrame({
+                    'sexe': sex + 1,
+                    'preusuel': names[start + name_idx],
+                    'annais': str(year),
+                    'dpt': departments[dpt_idx],
+                    'nombre': counts[name_idx, dpt_idx],
+                }, columns=CSV_COLUMNS)
+
+        sex_idx, dpt_idx = np.nonzero(rare)
+        yield pd.DataFrame({
+            'sexe': sex_idx + 1,
+            'preusuel': RARE_NAMES,
+            'annais': str(year),
+            'dpt': departments[dpt_idx],
+            'nombre': rare[sex_idx, dpt_idx],
+        }, columns=CSV_COLUMNS)
+
+    # Births whose year or department is unknown are only published per name and sex
+    unknown = rng.poisson(unknown)
+    name_idx, sex_idx = np.nonzero(unknown >= MIN_PUBLISHED)
+    yield pd.DataFrame({
+        'sexe': sex_idx + 1,
+        'preusuel': names[name_idx],
+        'annais': UNKNOWN_YEAR,
+        'dpt': UNKNOWN_DPT,
+        'nombre': unknown[name_idx, sex_idx],
+    }, columns=CSV_COLUMNS)
+
+
+def write_names_csv(path, chunks):
+    """Stream ``chunks`` to a ';'-separated file, gzip-compressed when ``path`` ends in .gz; returns the row count."""
+    opener = gzip.open if path.endswith('.gz') else open
+    rows = 0
+    with opener(path, 'wt', encoding='utf-8', newline='') as target:
+        target.write(';'.join(CSV_COLUMNS) + '\n')
+        for chunk in chunks:
+            chunk.to_csv(target, sep=';', header=False, index=False)
+            rows += len(chunk)
+    return rows
@@ -0,0 +1,60 @@
+"""Vectorized top-k / bottom-k names per department."""
+
+import numpy as np
+import pandas as pd
+
+from namesviz.instrument import stage, timed
+
+SEX_LABEL_COLUMNS = {1: 'top_masculins', 2: 'top_feminins'}
+
+
+def aggregate_range(names, start_year, end_year):
+    """Total births per (sexe, dpt, preusuel) over [start_year, end_year]."""
+    with stage('filter'):
+        in_range = names[(names['annais'] >= start_year) & (names['annais'] <= end_year)]
+    with stage('groupby'):
+        return in_range.groupby(['sexe', 'dpt', 'preusuel'], observed=True, sort=False)['nombre'].sum().reset_index()
+
+
+@timed('top_k')
+def top_names_per_department(totals, k=3, largest=True):
+    """Keep the k largest (or smallest) names of every (sexe, dpt) group.
+
+    ``totals`` must hold one row per (sexe, dpt, preusuel), as returned by
+    ``aggregate_range``. Ties keep their input order, like ``nlargest``.
+    """
+    if totals.empty:
+        return totals.assign(rank=pd.Series(dtype='int16'))
+
+    sexe = totals['sexe'].to_numpy()
+    dpt = pd.factorize(totals['dpt'])[0]
+    nombre = totals['nombre'].to_numpy().astype(np.int64)
+
+    # lexsort is stable and sorts by the last key first: sex, then department, then count
+    order = np.lexsort((-nombre if largest else nombre, dpt, sexe))
+    sexe, dpt = sexe[order], dpt[order]
+
+    new_group = np.empty(len(order), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = (sexe[1:] != sexe[:-1]) | (dpt[1:] != dpt[:-1])
+    rank = ranks_within_groups(new_group)
+
+    keep = rank < k
+    top = totals.iloc[order[keep]].reset_index(drop=True)
+    top['rank'] = (rank[keep] + 1).astype(np.int16)
+    return top
+
+
+def ranks_within_groups(new_group):
+    """0-based position of every row within its group, for sorted rows where ``new_group`` marks each group's first."""
+    positions = np.arange(len(new_group))
+    return positions - np.maximum.accumulate(np.where(new_group, positions, 0))
+
+
+def top_names_labels(top):
+    """One row per department with each sex's ranked names joined by commas."""
+    labels = top.groupby(['dpt', 'sexe'], observed=True)['preusuel'].agg(', '.join).unstack('sexe')
+    labels = labels.reindex(columns=list(SEX_LABEL_COLUMNS)).rename(columns=SEX_LABEL_COLUMNS)
+    labels = labels.rename_axis(columns=None).reset_index()
+    labels['dpt'] = labels['dpt'].astype(str)
+    return labels
@@ -0,0 +1,73 @@
+"""Sparse years x names birth counts, built once and sliced by year range."""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from namesviz.instrument import timed
+from namesviz.peaks import peak_columns, threshold_candidates
+
+
+class NameTrends:
+    """Births per year and name, both sexes combined, as an int32 CSC matrix (years x names).
+
+    Most names are absent most years, so this holds a fraction of the dense
+    ``unstack().fillna(0)`` float64 frame, and column-compressed storage keeps
+    per-name reads cheap.
+    """
+
+    def __init__(self, names, years, matrix):
+        self.names = names
+        self.years = years
+        self.matrix = matrix
+
+    @classmethod
+    def from_names(cls, names):
+        labels = pd.Index(names['preusuel'].cat.categories)
+        years = np.arange(names['annais'].min(), names['annais'].max() + 1, dtype=np.int16)
+        year_ids = names['annais'].to_numpy().astype(np.int64) - years[0]
+        name_ids = names['preusuel'].cat.codes.to_numpy().astype(np.int64)
+        # Duplicate (year, name) entries, one per department and sex, are summed by the conversion
+        matrix = sparse.coo_matrix(
+            (names['nombre'].to_numpy().astype(np.int32), (year_ids, name_ids)),
+            shape=(len(years), len(labels)),
+        ).tocsc()
+        return cls(labels, years, matrix)
+
+    def _rows(self, start_year, end_year):
+        first = int(self.years[0])
+        start = max(int(start_year) - first, 0)
+        end = min(int(end_year) - first, len(self.years) - 1)
+        return slice(start, max(start, end + 1))
+
+    def window(self, start_year, end_year):
+        rows = self._rows(start_year, end_year)
+        return self.years[rows], self.matrix[rows]
+
+    @timed('peaks')
+    def popular_names(self, start_year, end_year, min_threshold, max_threshold=None):
+        """Same result as ``peaks.find_popular_names`` on the dense frame of the year range."""
+        years, window = self.window(start_year, end_year)
+        if window.shape[0] == 0:
+            return []
+        maxima = window.max(axis=0).toarray().ravel()
+        candidates = threshold_candidates(maxima, min_threshold, max_threshold)
+        # Only the few candidate columns are ever densified
+        values = window[:, candidates].toarray()
+        return [
+            (self.names[candidates[column]], peaks, peak_values)
+            for column, peaks, peak_values in peak_columns(values, min_threshold)
+        ]
+
+    @timed('filter')
+    def frame(self, names, start_year, end_year):
+        """Dense year-indexed frame holding only the requested names."""
+        years, window = self.window(start_year, end_year)
+        columns = self.names.get_indexer(names)
+        return pd.DataFrame(window[:, columns].toarray(), index=pd.Index(years, name='annais'), columns=list(names))
+
+
+def detect_recent_popularity(name_trends, start_year, end_year, min_threshold=50, max_threshold=10000):
+    """Names peaking within the thresholds over the range, and the year-indexed frame of their births."""
+    popular_names = name_trends.popular_names(start_year, end_year, min_threshold, max_threshold)
+    return popular_names, name_trends.frame([name for name, _, _ in popular_names], start_year, end_year)
@@ -0,0 +1,178 @@
+"""Versioned snapshots of the names table, refreshed year by year and switched atomically.
+
+Each refresh of the CSV writes a new Arrow snapshot next to the previous ones and then
+replaces ``manifest.json`` in one rename; readers only ever follow the manifest, so they
+see either the old version or the new one. Every version records a fingerprint per
+year and the years that differ from its parent, which lets the derived structures and
+memoized results be updated or kept rather than rebuilt. The derived structures are
+saved next to the snapshot before the manifest names it, so no reader builds them.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from namesviz.data import CACHE_DIR, NAMES_CSV, file_hash, read_names_cache, read_names_csv
+from namesviz.derived import build_structures, derived_structure
+from namesviz.shared import structures_dir
+
+VERSIONS_DIR = os.path.join(CACHE_DIR, 'versions')
+MANIFEST = 'manifest.json'
+
+# Snapshots kept on disk, so sessions still on the previous version can finish their run
+KEEP_VERSIONS = 3
+
+
+def year_fingerprints(names):
+    """Order-independent hash of the rows of each year, as {year: hex digest}."""
+    row_hashes = pd.util.hash_pandas_object(names[['sexe', 'preusuel', 'annais', 'dpt', 'nombre']], index=False)
+    years = names['annais'].to_numpy()
+    order = np.argsort(years, kind='stable')
+    unique_years, starts = np.unique(years[order], return_index=True)
+    # uint64 sums wrap around, which keeps them independent of the row order
+    sums = np.add.reduceat(row_hashes.to_numpy()[order], starts) if len(order) else []
+    return {int(year): f"{int(total):016x}" for year, total in zip(unique_years, sums)}
+
+
+def changed_years(previous, current):
+    """Years added, removed or whose rows differ between two fingerprint maps."""
+    return sorted(year for year in set(previous) | set(current) if previous.get(year) != current.get(year))
+
+
+def range_fingerprint(dataset, start_year, end_year):
+    """Digest of the fingerprints of the years in the range; unchanged across versions that leave them alone."""
+    digest = hashlib.sha1()
+    for year in range(int(start_year), int(end_year) + 1):
+        digest.update(f"{year}:{dataset['fingerprints'].get(year, '')};".encode())
+    return digest.hexdigest()
+
+
+class DatasetRegistry:
+    """The published versions of the names table under ``root``, described by its manifest."""
+
+    def __init__(self, root=VERSIONS_DIR, keep=KEEP_VERSIONS):
+        self.root = root
+        self.keep = keep
+        self._manifest = None
+        self._manifest_stamp = None
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, MANIFEST)
+
+    def manifest(self):
+        """The manifest, re-read only when the file was replaced; ``None`` before the first refresh."""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp != self._manifest_stamp:
+            with open(self.manifest_path, encoding='utf-8') as source:
+                manifest = json.load(source)
+            for dataset in manifest['versions']:
+                dataset['fingerprints'] = {int(year): value for year, value in dataset['fingerprints'].items()}
+            self._manifest, self._manifest_stamp = manifest, stamp
+        return self._manifest
+
+    def current(self):
+        """The published dataset: version, parent, snapshot file, fingerprints and changed years."""
+        manifest = self.manifest()
+        return manifest and self.dataset(manifest['current'])
+
+    def dataset(self, version):
+        for dataset in self.manifest()['versions']:
+            if dataset['version'] == version:
+                return dataset
+        raise KeyError(f"Dataset version {version} is no longer kept in {self.root}")
+
+    def snapshot_path(self, version):
+        return os.path.join(self.root, self.dataset(version)['file'])
+
+    def load(self, version):
+        """The names table of ``version``, memory-mapped from its snapshot."""
+        return read_names_cache(self.snapshot_path(version))
+
+    def structure(self, version, kind, names=None):
+        """The ``kind`` structure of ``DERIVED`` for ``version``, memory-mapped.
+
+        A version published without it gets it built by its first reader, updated from
+        the parent version's when that one is still kept; ``names`` returns the names
+        table to build from, the mapped snapshot by default.
+        """
+        dataset = self.dataset(version)
+        parent = self._kept(dataset['parent'])
+        parent_dir = parent and structures_dir(os.path.join(self.root, parent['file']))
+        return derived_structure(structures_dir(self.snapshot_path(version)), kind,
+                                 names or (lambda: self.load(version)), parent_dir, dataset['changed_years'])
+
+    def _kept(self, version):
+        return next((dataset for dataset in self.manifest()['versions'] if dataset['version'] == version), None)
+
+    def refresh(self, csv_path=NAMES_CSV, prebuild=True):
+        """Publish the CSV as a new version if its rows differ from the current one; returns the current dataset.
+
+        An unchanged file is not even parsed; a re-exported file with the same rows only
+        updates the recorded source hash. With ``prebuild``, the derived structures of the
+        new version are saved before it is published, updated from those of the current one.
+        """
+        source_hash = file_hash(csv_path)
+        manifest = self.manifest() or {'current': None, 'versions': []}
+        current = manifest['current'] is not None and self.dataset(manifest['current'])
+        if current and current['source_hash'] == source_hash:
+            return current
+
+        names = read_names_csv(csv_path)
+        fingerprints = year_fingerprints(names)
+        if current and fingerprints == current['fingerprints']:
+            current['source_hash'] = source_hash
+            self._write_manifest(manifest)
+            return current
+
+        version = max((dataset['version'] for dataset in manifest['versions']), default=0) + 1
+        dataset = {
+            'version': version,
+            'parent': current['version'] if current else None,
+            'file': f"names-v{version}-{source_hash[:12]}.arrow",
+            'source_hash': source_hash,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'changed_years': changed_years(current['fingerprints'] if current else {}, fingerprints),
+            'fingerprints': fingerprints,
+        }
+        os.makedirs(self.root, exist_ok=True)
+        snapshot = os.path.join(self.root, dataset['file'])
+        tmp_path = f"{snapshot}.{os.getpid()}.tmp"
+        feather.write_feather(names, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, snapshot)
+        if prebuild:
+            parent_dir = current and structures_dir(os.path.join(self.root, current['file']))
+            build_structures(structures_dir(snapshot), names, parent_dir, dataset['changed_years'])
+
+        manifest['versions'] = manifest['versions'][-(self.keep - 1):] + [dataset] if self.keep > 1 else [dataset]
+        manifest['current'] = version
+        self._write_manifest(manifest)
+        self._remove_unlisted(manifest)
+        return dataset
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as target:
+            json.dump(manifest, target, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _remove_unlisted(self, manifest):
+        """Delete the snapshots dropped from the manifest and the structures derived from them."""
+        listed = {dataset['file'] for dataset in manifest['versions']}
+        listed |= {structures_dir(file) for file in listed}
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if entry.endswith('.arrow') and entry not in listed:
+                os.remove(path)
+            elif entry.endswith('.structures') and entry not in listed:
+                shutil.rmtree(path, ignore_errors=True)
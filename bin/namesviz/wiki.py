@@ -0,0 +1,57 @@
+"""Wikipedia and Wikidata lookups used to put name peaks in context."""
+
+import os
+from functools import lru_cache
+
+from namesviz.httpcache import CachedClient, SQLiteCache
+
+# Overridable so that a local stub server can stand in for the real APIs
+WIKIDATA_SPARQL_URL = os.environ.get('NAMESVIZ_WIKIDATA_URL', 'https://query.wikidata.org/sparql')
+WIKIPEDIA_API_URL = os.environ.get('NAMESVIZ_WIKIPEDIA_URL', 'https://fr.wikipedia.org/w/api.php')
+
+
+class LookupUnavailable(Exception):
+    """The service did not answer (error, timeout, rate limit); unlike an empty result, worth retrying later."""
+
+
+@lru_cache(maxsize=None)
+def default_client():
+    return CachedClient(SQLiteCache())
+
+
+def get_wikidata_results(name, client=None):
+    query = f"""
+    SELECT DISTINCT ?item ?itemLabel ?description WHERE {{
+      ?item ?label "{name}"@fr.
+      OPTIONAL {{ ?item schema:description ?description. FILTER(LANG(?description) = "fr" || LANG(?description) = "en") }}
+      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "fr,en". }}
+    }} LIMIT 90
+    """
+    data = (client or default_client()).get_json(WIKIDATA_SPARQL_URL, {'query': query, 'format': 'json'})
+    if data is None:
+        raise LookupUnavailable(f"Wikidata did not answer for {name!r}")
+    results = data.get("results", {}).get("bindings", [])
+    return [f"{result['itemLabel']['value']} - {result['description']['value']}" if 'description' in result else f"{result['itemLabel']['value']} - No description available" for result in results]
+
+
+def get_events_for_date(date, client=None):
+    params = {
+        'action': 'query',
+        'list': 'search',
+        'srsearch': str(date),
+        'format': 'json',
+        'prop': 'extracts',
+        'exintro': '',
+        'explaintext': '',
+    }
+    data = (client or default_client()).get_json(WIKIPEDIA_API_URL, params)
+    if data is None:
+        raise LookupUnavailable(f"Wikipedia did not answer for {date}")
+    events = data.get("query", {}).get("search", [])
+    detailed_events = []
+    for event in events:
+        title = event.get('title', 'No title')
+        snippet = event.get('snippet', 'No description available').replace('<span class="searchmatch">', '').replace('</span>', '')
+        if "football" not in title.lower() and "football" not in snippet.lower():
+            detailed_events.append(f"{title} - {snippet}")
+    return detailed_events
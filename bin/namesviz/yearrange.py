@@ -0,0 +1,169 @@
+"""Cumulative sums over years so any year range is aggregated without rescanning rows."""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from namesviz.cube import SEXES
+from namesviz.instrument import timed
+
+
+class YearRangeIndex:
+    """Prefix sums per (name, sex, department) group and per department.
+
+    Rows are sorted by group then year and carry a running total, so the sum of a
+    group over [start, end] is the difference of the running total at two binary-search
+    positions; its cost does not depend on how many years the range spans.
+    """
+
+    def __init__(self, names, departments, years, group_name, group_sex, group_dpt,
+                 keys, cumulative, dpt_prefix):
+        self.names = names
+        self.departments = departments
+        self.years = years
+        self.group_name = group_name
+        self.group_sex = group_sex
+        self.group_dpt = group_dpt
+        self.keys = keys
+        self.cumulative = cumulative
+        self.dpt_prefix = dpt_prefix
+        self.name_offsets = np.searchsorted(group_name, np.arange(len(names) + 1))
+
+    @classmethod
+    def from_names(cls, names):
+        name_labels = pd.Index(names['preusuel'].cat.categories)
+        dpt_labels = pd.Index(names['dpt'].cat.categories)
+        years = np.arange(names['annais'].min(), names['annais'].max() + 1, dtype=np.int16)
+        n_years, n_dpts = len(years), len(dpt_labels)
+
+        name_ids = names['preusuel'].cat.codes.to_numpy().astype(np.int64)
+        dpt_ids = names['dpt'].cat.codes.to_numpy().astype(np.int64)
+        sex_ids = names['sexe'].to_numpy().astype(np.int64) - 1
+        year_ids = names['annais'].to_numpy().astype(np.int64) - years[0]
+        nombre = names['nombre'].to_numpy().astype(np.int64)
+
+        # Name-major group ids keep every name's groups contiguous
+        group_key = (name_ids * len(SEXES) + sex_ids) * n_dpts + dpt_ids
+        unique_keys, group_ids = np.unique(group_key, return_inverse=True)
+        row_keys = group_ids * n_years + year_ids
+        order = np.argsort(row_keys, kind='stable')
+        cumulative = np.concatenate([[0], np.cumsum(nombre[order])])
+
+        dpt_prefix = _prefix_over_years(dpt_ids, year_ids, nombre, n_dpts, n_years)
+
+        return cls(
+            name_labels, dpt_labels, years,
+            group_name=(unique_keys // (n_dpts * len(SEXES))).astype(np.int32),
+            group_sex=(unique_keys // n_dpts % len(SEXES) + 1).astype(np.int8),
+            group_dpt=(unique_keys % n_dpts).astype(np.int16 if n_dpts <= np.iinfo(np.int16).max else np.int32),
+            keys=row_keys[order],
+            cumulative=cumulative,
+            dpt_prefix=dpt_prefix,
+        )
+
+    def _year_bounds(self, start_year, end_year):
+        first = int(self.years[0])
+        return max(int(start_year) - first, 0), min(int(end_year) - first, len(self.years) - 1)
+
+    def _group_totals(self, groups, start_year, end_year):
+        start, end = self._year_bounds(start_year, end_year)
+        if start > end:
+            return np.zeros(len(groups), dtype=np.int64)
+        base = groups.astype(np.int64) * len(self.years)
+        lo = np.searchsorted(self.keys, base + start, side='left')
+        hi = np.searchsorted(self.keys, base + end, side='right')
+        return self.cumulative[hi] - self.cumulative[lo]
+
+    def _prefix_difference(self, prefix, start_year, end_year):
+        start, end = self._year_bounds(start_year, end_year)
+        if start > end:
+            return np.zeros(len(prefix), dtype=np.int64)
+        return prefix[:, end + 1] - prefix[:, start]
+
+    @timed('groupby')
+    def range_totals(self, start_year, end_year):
+        """Births per (sexe, dpt, preusuel) over the range, like a filtered groupby."""
+        groups = np.arange(len(self.group_name))
+        totals = self._group_totals(groups, start_year, end_year)
+        present = np.flatnonzero(totals)
+        return pd.DataFrame({
+            'sexe': self.group_sex[present],
+            'dpt': pd.Categorical.from_codes(self.group_dpt[present], categories=self.departments),
+            'preusuel': pd.Categorical.from_codes(self.group_name[present], categories=self.names),
+            'nombre': totals[present],
+        })
+
+    @timed('groupby')
+    def department_totals(self, start_year, end_year, sex=None):
+        if sex is None:
+            totals = self._prefix_difference(self.dpt_prefix, start_year, end_year)
+        else:
+            groups = np.flatnonzero(self.group_sex == sex)
+            totals = np.bincount(self.group_dpt[groups], weights=self._group_totals(groups, start_year, end_year),
+                                 minlength=len(self.departments)).astype(np.int64)
+        present = np.flatnonzero(totals)
+        return pd.DataFrame({
+            'dpt': pd.Categorical.from_codes(present, categories=self.departments),
+            'total_count': totals[present],
+        })
+
+    @timed('groupby')
+    def name_department_totals(self, name, start_year, end_year):
+        """Births of one name per department over the range, both sexes combined."""
+        name_id = self.names.get_loc(name)
+        groups = np.arange(self.name_offsets[name_id], self.name_offsets[name_id + 1])
+        totals = np.bincount(self.group_dpt[groups], weights=self._group_totals(groups, start_year, end_year),
+                             minlength=len(self.departments)).astype(np.int64)
+        present = np.flatnonzero(totals)
+        return pd.DataFrame({
+            'dpt': pd.Categorical.from_codes(present, categories=self.departments),
+            'nombre': totals[present],
+        })
+
+    @timed('groupby')
+    def name_department_matrix(self, name_ids, start_year, end_year, sex=None):
+        """Births per (name, department) over the range, as a sparse ``len(name_ids)`` x departments matrix.
+
+        The groups of all the names are gathered into one array, so the whole matrix costs
+        two binary searches per group whatever the number of names.
+        """
+        name_ids = np.asarray(name_ids, dtype=np.int64)
+        starts = self.name_offsets[name_ids]
+        lengths = self.name_offsets[name_ids + 1] - starts
+        rows = np.repeat(np.arange(len(name_ids)), lengths)
+        # Concatenation of the ranges starts[i]:starts[i] + lengths[i]
+        groups = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        if sex is not None:
+            keep = self.group_sex[groups] == sex
+            rows, groups = rows[keep], groups[keep]
+        totals = self._group_totals(groups, start_year, end_year)
+        # Both sexes of a (name, department) fall in the same cell and are summed by the conversion
+        matrix = sparse.csr_matrix((totals, (rows, self.group_dpt[groups].astype(np.int64))),
+                                   shape=(len(name_ids), len(self.departments)))
+        matrix.eliminate_zeros()
+        return matrix
+
+    @timed('groupby')
+    def name_department_years(self, name):
+        """Births of one name per (year, department), both sexes combined, as a years x departments array.
+
+        Every (group, year) cell is read from the running totals in one batch of binary
+        searches, so all the years cost about as much as a single range query.
+        """
+        name_id = self.names.get_loc(name)
+        groups = np.arange(self.name_offsets[name_id], self.name_offsets[name_id + 1])
+        cells = groups[:, None] * len(self.years) + np.arange(len(self.years))
+        counts = (self.cumulative[np.searchsorted(self.keys, cells, side='right')]
+                  - self.cumulative[np.searchsorted(self.keys, cells, side='left')])
+        # Sum the groups (sexes) of each department: (departments x groups) @ (groups x years)
+        membership = sparse.csr_matrix((np.ones(len(groups), dtype=np.int64),
+                                        (self.group_dpt[groups].astype(np.int64), np.arange(len(groups)))),
+                                       shape=(len(self.departments), len(groups)))
+        return np.asarray(membership @ counts).T
+
+
+def _prefix_over_years(ids, year_ids, nombre, n_ids, n_years):
+    counts = np.bincount(ids * n_years + year_ids, weights=nombre, minlength=n_ids * n_years)
+    prefix = np.zeros((n_ids, n_years + 1), dtype=np.int64)
+    np.cumsum(counts.astype(np.int64).reshape(n_ids, n_years), axis=1, out=prefix[:, 1:])
+    return prefix
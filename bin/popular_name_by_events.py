@@ -1,37 +1,17 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import streamlit as st
-from scipy.signal import find_peaks
+from cached import finish_rerun, load_name_trends, recent_popularity, start_rerun, use_current_dataset
+from namesviz.instrument import stage
 
-@st.cache_data
-def load_name_data():
-    names = pd.read_csv("./data/dpt2020.csv", sep=";")
-    names['annais'] = pd.to_numeric(names['annais'], errors='coerce')
-    names = names.dropna(subset=['annais'])
-    names['annais'] = names['annais'].astype(int)
-    return names
-
-def detect_recent_popularity(names, threshold=1000):
-    recent_names = names[names['annais'] >= 2000]
-    name_trends = recent_names.groupby(['annais', 'preusuel'])['nombre'].sum().unstack().fillna(0)
-
-    popular_names = []
-    for name in name_trends.columns:
-        popularity = name_trends[name]
-        peaks, _ = find_peaks(popularity, height=threshold)
-        if len(peaks) > 0:
-            popular_names.append((name, peaks, popularity.iloc[peaks].values))
-
-    return popular_names, name_trends
-
-names = load_name_data()
+start_rerun('popular_name_by_events')
+use_current_dataset()
 
 st.title("Analyse des Prénoms Récemment Populaires en France (2000-2020)")
 st.subheader("Prénoms qui sont devenus soudainement populaires")
 
 threshold = st.slider('Sélectionnez le seuil de popularité pour détecter les pics', 100, 5000, 1000)
 
-popular_names, name_trends = detect_recent_popularity(names, threshold)
+popular_names, name_trends = recent_popularity(2000, int(load_name_trends().years[-1]), threshold, None)
 
 st.write(f"Prénoms détectés comme récemment populaires (seuil = {threshold}):")
 for name, peaks, values in popular_names:
@@ -51,7 +31,8 @@ plt.ylabel("Popularité")
 plt.legend(title="Prénoms")
 plt.grid(True)
 
-st.pyplot(plt)
+with stage('render'):
+    st.pyplot(plt)
 
 st.subheader("Corrélations avec des événements culturels ou médiatiques")
 st.write("Sélectionnez un prénom pour voir les événements culturels ou médiatiques associés.")
@@ -85,4 +66,6 @@ else:
 # Liens vers des ressources externes
 st.write("### Ressources externes")
 st.write(f"[Recherche sur {selected_popular_name} sur Wikipédia](https://fr.wikipedia.org/wiki/{selected_popular_name})")
-st.write(f"[Articles de presse sur {selected_popular_name}](https://www.google.com/search?q={selected_popular_name}+actualité)")
\ No newline at end of file
+st.write(f"[Articles de presse sur {selected_popular_name}](https://www.google.com/search?q={selected_popular_name}+actualité)")
+
+finish_rerun()
@@ -1,72 +1,17 @@
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-from scipy.signal import find_peaks
-import requests
 import logging
-from datetime import datetime
+from concurrent.futures import as_completed
+from cached import (finish_rerun, load_enricher, load_trajectory_index, recent_popularity, similar_names, start_rerun,
+                    use_current_dataset)
+from namesviz.instrument import stage
+from namesviz.wiki import LookupUnavailable
 
 logging.basicConfig(level=logging.INFO)
 
-@st.cache_data
-def load_name_data():
-    names = pd.read_csv("./data/dpt2020.csv", sep=";")
-    return names
-
-def detect_recent_popularity(names, start_year, end_year, min_threshold=50, max_threshold=10000):
-    names['annais'] = pd.to_numeric(names['annais'], errors='coerce')  # Convertir en numériques, remplacer les erreurs par NaN
-    recent_names = names[(names['annais'] >= start_year) & (names['annais'] <= end_year)]
-    name_trends = recent_names.groupby(['annais', 'preusuel'])['nombre'].sum().unstack().fillna(0)
-
-    popular_names = []
-    for name in name_trends.columns:
-        popularity = name_trends[name]
-        if min_threshold <= popularity.max() <= max_threshold:  # Vérifier si le prénom atteint le seuil
-            peaks, _ = find_peaks(popularity, height=min_threshold)
-            if len(peaks) > 0:
-                popular_names.append((name, peaks, popularity.iloc[peaks].values))
-
-    return popular_names, name_trends
-
-def get_wikidata_results(name):
-    query = f"""
-    SELECT DISTINCT ?item ?itemLabel ?description WHERE {{
-      ?item ?label "{name}"@fr.
-      OPTIONAL {{ ?item schema:description ?description. FILTER(LANG(?description) = "fr" || LANG(?description) = "en") }}
-      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "fr,en". }}
-    }} LIMIT 90
-    """
-
-    url = "https://query.wikidata.org/sparql"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(url, params={'query': query, 'format': 'json'}, headers=headers)
-
-    if response.status_code == 200:
-        data = response.json()
-        results = data.get("results", {}).get("bindings", [])
-        return [f"{result['itemLabel']['value']} - {result['description']['value']}" if 'description' in result else f"{result['itemLabel']['value']} - No description available" for result in results]
-    else:
-        return []
-
-def get_events_for_date(date):
-    query = f"https://fr.wikipedia.org/w/api.php?action=query&list=search&srsearch={date}&format=json&prop=extracts&exintro&explaintext"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(query, headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        events = data.get("query", {}).get("search", [])
-        detailed_events = []
-        for event in events:
-            title = event.get('title', 'No title')
-            snippet = event.get('snippet', 'No description available').replace('<span class="searchmatch">', '').replace('</span>', '')
-            if "football" not in title.lower() and "football" not in snippet.lower():
-                detailed_events.append(f"{title} - {snippet}")
-        return detailed_events
-    else:
-        return []
-
-names = load_name_data()
+start_rerun('popular_name_by_events_improved')
+use_current_dataset()
 
 st.title("Analyse des Prénoms Populaires en France")
 st.subheader("Prénoms qui sont devenus soudainement populaires")
@@ -87,7 +32,11 @@ min_threshold, max_threshold = st.select_slider(
 
 logging.info(f"Années sélectionnées: {start_year}-{end_year}, seuils: {min_threshold}-{max_threshold}")
 
-popular_names, name_trends = detect_recent_popularity(names, start_year, end_year, min_threshold, max_threshold)
+popular_names, name_trends = recent_popularity(start_year, end_year, min_threshold, max_threshold)
+
+# Fetch the context of every peak in the background so that switching names or peaks does not wait on the network
+enricher = load_enricher()
+prefetched = enricher.prefetch(popular_names, [name_trends.index[p] for _, peaks, _ in popular_names for p in peaks])
 
 st.write(f"**Nombre de prénoms détectés comme récemment populaires entre {start_year} et {end_year}. En voici la liste: {len(popular_names)}**")
 
@@ -113,7 +62,8 @@ fig_global.update_layout(
     hovermode="x unified"
 )
 
-st.plotly_chart(fig_global)
+with stage('render'):
+    st.plotly_chart(fig_global)
 
 # Deuxième graphique pour les tendances spécifiques
 st.subheader("Graphique des tendances spécifiques d'un prénom populaire")
@@ -121,6 +71,7 @@ st.subheader("Graphique des tendances spécifiques d'un prénom populaire")
 selected_name = st.selectbox("Sélectionnez un prénom populaire", [name for name, _, _ in popular_names])
 
 fig_specific = go.Figure()
+valid_peaks = []
 
 for name, peaks, _ in popular_names:
     if name == selected_name:
@@ -149,19 +100,55 @@ fig_specific.update_layout(
     hovermode="x unified"
 )
 
-st.plotly_chart(fig_specific)
+with stage('render'):
+    st.plotly_chart(fig_specific)
+
+# Prénoms dont la part des naissances a suivi une courbe proche sur toutes les années
+st.subheader("Prénoms aux trajectoires similaires")
+
+trajectories = load_trajectory_index()
+if selected_name is None or selected_name not in trajectories.names:
+    st.write("Ce prénom est trop rare pour comparer sa trajectoire à celle des autres prénoms.")
+else:
+    col_method, col_count = st.columns(2)
+    with col_method:
+        method = st.radio("Mesure de similarité", ['cosine', 'dtw'], horizontal=True,
+                          format_func={'cosine': "Cosinus (même forme)", 'dtw': "DTW (décalage de quelques années toléré)"}.get)
+    with col_count:
+        n_similar = st.slider("Nombre de prénoms similaires", 3, 20, 5)
+    similar = similar_names(selected_name, n_similar, method)
+    st.dataframe(similar, hide_index=True)
+
+    shares = trajectories.frame([selected_name] + similar['preusuel'].tolist())
+    fig_similar = px.line(shares, labels={'annais': 'Années', 'value': 'Part des naissances (%)', 'variable': 'Prénoms'},
+                          title=f"Trajectoires proches de celle du prénom {selected_name}")
+    with stage('render'):
+        st.plotly_chart(fig_similar)
 
 st.subheader("Corrélations avec des événements culturels ou médiatiques")
 
-if valid_peaks:
-    selected_peak = st.selectbox("Sélectionnez un pic pour voir les événements associés", [name_trends.index[p] for p in valid_peaks])
-    events = get_events_for_date(selected_peak)
-    if events:
-        st.write(f"### Événements associés à l'année {selected_peak}")
-        for event in events:
-            st.write(f"- {event}")
-    else:
-        st.write(f"Aucun événement trouvé pour l'année {selected_peak}")
+st.caption(f"Contexte préchargé : {sum(future.done() for future in prefetched)}/{len(prefetched)} requêtes terminées")
+
+# One placeholder per peak, filled in as soon as its lookup completes
+peak_placeholders = {enricher.events(name_trends.index[p], urgent=True): (name_trends.index[p], st.empty()) for p in valid_peaks}
+with stage('network'):
+    for future in as_completed(peak_placeholders):
+        peak_year, placeholder = peak_placeholders[future]
+        with placeholder.container():
+            # One failed lookup, whatever the reason, only leaves its own peak without events
+            error = future.exception()
+            if error is not None:
+                if not isinstance(error, LookupUnavailable):
+                    logging.error(f"Événements de l'année {peak_year} illisibles", exc_info=error)
+                st.write(f"Wikipédia n'a pas répondu pour l'année {peak_year}, réessayez dans un instant.")
+                continue
+            events = future.result()
+            if events:
+                st.write(f"### Événements associés à l'année {peak_year}")
+                for event in events:
+                    st.write(f"- {event}")
+            else:
+                st.write(f"Aucun événement trouvé pour l'année {peak_year}")
 
 # Affichage des événements culturels ou médiatiques associés
 st.write(f"### Événements culturels ou médiatiques associés à {selected_name}")
@@ -176,9 +163,20 @@ st.write(f"***[Articles de presse sur {selected_name}](https://www.google.com/se
 st.subheader(f"15 premiers Résultats sur Wikidata pour {selected_name}")
 
 # Afficher les résultats de Wikidata pour le prénom sélectionné
-wikidata_results = get_wikidata_results(selected_name)
-if wikidata_results:
+with stage('network'):
+    try:
+        wikidata_results = enricher.wikidata(selected_name, urgent=True).result() if selected_name else []
+    except LookupUnavailable:
+        wikidata_results = None
+    except Exception:
+        logging.exception(f"Résultats Wikidata illisibles pour {selected_name}")
+        wikidata_results = None
+if wikidata_results is None:
+    st.write(f"Wikidata n'a pas répondu pour {selected_name}, réessayez dans un instant.")
+elif wikidata_results:
     for result in wikidata_results[:15]:
         st.markdown(f"<div class='wikidata-result'>{result}</div>", unsafe_allow_html=True)
 else:
-    st.write(f"Aucun résultat trouvé sur Wikidata pour {selected_name}.")
\ No newline at end of file
+    st.write(f"Aucun résultat trouvé sur Wikidata pour {selected_name}.")
+
+finish_rerun()
@@ -1,36 +1,16 @@
 import altair as alt
-import geopandas as gpd
 import pandas as pd
 import streamlit as st
-import json
-
-@st.cache_data
-def load_geo_data():
-    return gpd.read_file('./data/departements-version-simplifiee.geojson')
-
-@st.cache_data
-def load_name_data():
-    names = pd.read_csv("./data/dpt2020.csv", sep=";")
-    names.drop(names[names.preusuel == '_PRENOMS_RARES'].index, inplace=True)
-    names.drop(names[names.dpt == 'XX'].index, inplace=True)
-    return names
-
-def get_top_bottom_names(filtered_names, top=True):
-    result = {}
-    for sex in [1, 2]:
-        filtered_sex = filtered_names[filtered_names['sexe'] == sex]
-        if top:
-            agg_func = filtered_sex.groupby('dpt').apply(lambda x: x.nlargest(3, 'nombre')).reset_index(drop=True)
-        else:
-            agg_func = filtered_sex.groupby('dpt').apply(lambda x: x.nsmallest(3, 'nombre')).reset_index(drop=True)
-        result[sex] = agg_func
-    return result
-
-depts = load_geo_data()
-names = load_name_data()
-
-year_list = names['annais'].unique().tolist()
-year_list.sort()
+from cached import department_top_names, finish_rerun, load_geometry_asset, load_name_index, load_name_ranking, load_year_range_index, name_department_counts, name_department_frames, start_rerun, use_current_dataset
+from namesviz import name_labels
+from namesviz.charts import get_name_animation_map
+from namesviz.instrument import stage
+from namesviz.maps import choropleth, department_values
+
+start_rerun('popular_name_by_region')
+use_current_dataset()
+
+year_list = load_year_range_index().years.tolist()
 
 st.title("Carte Interactive des prénoms en France (1900-2020)")
 st.subheader("Filtres")
@@ -38,52 +18,55 @@ st.subheader("Filtres")
 col1, col2 = st.columns(2)
 
 with col1:
-    selected_year = st.selectbox('Sélectionnez une année', year_list)
-
-filtered_names_for_top = names[names['annais'] == selected_year]
-names_dict_for_top = get_top_bottom_names(filtered_names_for_top, True)
-for sex, sex_names in names_dict_for_top.items():
-    sex_names['dpt'] = sex_names['dpt'].astype(str)
-    if sex == 1:
-        depts = depts.merge(sex_names.groupby('dpt')['preusuel'].apply(lambda x: ', '.join(x)).reset_index(),
-                            left_on='code', right_on='dpt', how='left').rename(columns={'preusuel': 'top_masculins'})
+    animated = st.toggle(f"Animation année par année ({year_list[0]}-{year_list[-1]})")
+    if animated:
+        start_year, end_year = year_list[0], year_list[-1]
     else:
-        depts = depts.merge(sex_names.groupby('dpt')['preusuel'].apply(lambda x: ', '.join(x)).reset_index(),
-                            left_on='code', right_on='dpt', how='left').rename(columns={'preusuel': 'top_feminins'})
+        selected_year = st.selectbox('Sélectionnez une année', year_list)
+        start_year = end_year = selected_year
 
-namesin_year = names[names['annais'] == selected_year]
-name_counts = namesin_year.groupby('preusuel')['nombre'].sum().reset_index()
-name_counts = name_counts.sort_values(by='nombre', ascending=False)
-name_counts['rank'] = name_counts['nombre'].rank(method='min', ascending=False).astype(int)
-
-name_list = name_counts.apply(lambda row: f"{row['preusuel']} ({row['nombre']}, #{row['rank']})", axis=1).tolist()
+name_ranking = load_name_ranking()
 
 with col2:
-    selected_name_display = st.selectbox('Sélectionnez un PRÉNOM (Attributions, #Rang)', name_list)
-selected_name = selected_name_display.split(' ')[0]
+    name_query = st.text_input('Rechercher un PRÉNOM (accents et fautes de frappe tolérés)', '')
+    name_matches = name_labels(load_name_index().search(name_query, name_ranking.counts(start_year, end_year), name_ranking.ranks(start_year, end_year)))
+    selected_name = st.selectbox('Sélectionnez un PRÉNOM (Attributions, #Rang)', list(name_matches), format_func=name_matches.get)
+if selected_name is None:
+    st.warning("Aucun prénom ne correspond à cette recherche.")
+    st.stop()
+
+geometry = load_geometry_asset('full', source='./data/departements-version-simplifiee.geojson')
 
-filtered_names = namesin_year[namesin_year['preusuel'] == selected_name]
-name_counts__per_dept = filtered_names.groupby('dpt')['nombre'].sum().reset_index()
+# Toutes les années sont calculées en une fois et envoyées avec la carte : le curseur
+# change d'année dans le navigateur, sans relancer le script
+if animated:
+    frames = name_department_frames(selected_name, 'full', source='./data/departements-version-simplifiee.geojson')
+    animation_chart = get_name_animation_map(geometry, frames, selected_name, width=800, height=600)
+    with stage('render'):
+        st.altair_chart(animation_chart)
+    finish_rerun()
+    st.stop()
+
+dept_values = department_top_names(start_year, end_year)
+
+name_counts__per_dept = name_department_counts(selected_name, start_year, end_year)
 
-depts['code'] = depts['code'].astype(str)
 name_counts__per_dept['dpt'] = name_counts__per_dept['dpt'].astype(str)
-depts = depts.merge(name_counts__per_dept, left_on='code', right_on='dpt', how='left').rename(columns={'nombre': 'count_name'})
-depts['count_name'] = depts['count_name'].fillna(0)
+dept_values = dept_values.merge(name_counts__per_dept, on='dpt', how='outer').rename(columns={'nombre': 'count_name'})
 
-geojson_data = json.loads(depts.to_json())
-geojson_features = alt.Data(values=geojson_data['features'])
+dept_values = department_values(geometry, dept_values, fill={'count_name': 0})
 
 color_scale = alt.Scale(domain=[0, 100, 500, 1000, 2000, 5000],
                         range=['#f7fbff', '#deebf7', '#c6dbef', '#9ecae1', '#6baed6', '#2171b5'])
 
-map_chart = alt.Chart(geojson_features).mark_geoshape().encode(
-    color=alt.Color('properties.count_name:Q', scale=color_scale, legend=alt.Legend(title=f"Attributions de {selected_name}")),
+map_chart = choropleth(geometry, dept_values, ['count_name', 'top_masculins', 'top_feminins']).encode(
+    color=alt.Color('count_name:Q', scale=color_scale, legend=alt.Legend(title=f"Attributions de {selected_name}")),
     tooltip=[
         alt.Tooltip('properties.nom:N', title='Nom du Département'),
         alt.Tooltip('properties.code:N', title='Code du Département'),
-        alt.Tooltip('properties.count_name:Q', title=f"{selected_name}"),
-        alt.Tooltip('properties.top_masculins:N', title='Top 3 Masculins'),
-        alt.Tooltip('properties.top_feminins:N', title='Top 3 Féminins')
+        alt.Tooltip('count_name:Q', title=f"{selected_name}"),
+        alt.Tooltip('top_masculins:N', title='Top 3 Masculins'),
+        alt.Tooltip('top_feminins:N', title='Top 3 Féminins')
     ]
 ).project(
     type='mercator'
@@ -101,4 +84,7 @@ points_chart = alt.Chart(points).mark_point(color='red', size=100).encode(
 
 combined_chart = alt.layer(map_chart, points_chart).configure_view(stroke=None)
 
-st.altair_chart(combined_chart)
\ No newline at end of file
+with stage('render'):
+    st.altair_chart(combined_chart)
+
+finish_rerun()
@@ -1,59 +1,19 @@
 import altair as alt
-import geopandas as gpd
 import pandas as pd
 import streamlit as st
-import json
-from shapely.affinity import translate
-
-@st.cache_data
-def load_geo_data():
-    depts = gpd.read_file('./data/departements-avec-outre-mer.geojson')
-
-    dom_tom_translation = {
-        '971': (0, 0),  # Guadeloupe
-        '972': (-28, -30),  # Martinique
-        '973': (-26, -30),  # Guyane
-        '974': (-24, -30),  # La Réunion
-        '975': (-22, -30),  # Saint-Pierre-et-Miquelon
-        '976': (-20, -30),  # Mayotte
-        '977': (-18, -30),  # Saint-Barthélemy
-        '978': (-16, -30),  # Saint-Martin
-        '984': (-14, -30),  # Terres australes et antarctiques françaises
-        '986': (-12, -30),  # Wallis-et-Futuna
-        '987': (-10, -30),  # Polynésie française
-        '988': (-8, -30)    # Nouvelle-Calédonie
-    }
-
-    for code, translation in dom_tom_translation.items():
-        depts.loc[depts['code'] == code, 'geometry'] = depts.loc[depts['code'] == code, 'geometry'].apply(
-            lambda geom: translate(geom, xoff=translation[0], yoff=translation[1])
-        )
-
-    return depts
-
-@st.cache_data
-def load_name_data():
-    names = pd.read_csv("./data/dpt2020.csv", sep=";")
-    names.drop(names[names.preusuel == '_PRENOMS_RARES'].index, inplace=True)
-    names.drop(names[names.dpt == 'XX'].index, inplace=True)
-    return names
-
-def get_top_bottom_names(filtered_names, top=True):
-    result = {}
-    for sex in [1, 2]:
-        filtered_sex = filtered_names[filtered_names['sexe'] == sex]
-        if top:
-            agg_func = filtered_sex.groupby('dpt').apply(lambda x: x.nlargest(3, 'nombre')).reset_index(drop=True)
-        else:
-            agg_func = filtered_sex.groupby('dpt').apply(lambda x: x.nsmallest(3, 'nombre')).reset_index(drop=True)
-        result[sex] = agg_func
-    return result
-
-depts = load_geo_data()
-names = load_name_data()
-
-year_list = names['annais'].unique().tolist()
-year_list.sort()
+from cached import department_clusters, department_top_names, finish_rerun, load_geometry_asset, load_name_index, load_name_ranking, load_year_range_index, name_department_counts, start_rerun, use_current_dataset
+from namesviz import name_labels
+from namesviz.geometry import level_for_scale
+from namesviz.instrument import stage
+from namesviz.maps import choropleth, department_values
+
+FRANCE_SCALE = 2500
+GUADELOUPE_SCALE = 8000
+
+start_rerun('popular_name_by_region_improved')
+use_current_dataset()
+
+year_list = load_year_range_index().years.tolist()
 
 st.title("Carte Interactive des prénoms en France (1900-2020)")
 st.subheader("Filtres")
@@ -65,43 +25,33 @@ with col1:
 
 if len(selected_years) == 2:
     start_year, end_year = min(selected_years), max(selected_years)
-    filtered_names_for_top = names[(names['annais'] >= start_year) & (names['annais'] <= end_year)]
 else:
-    filtered_names_for_top = names[names['annais'] == selected_years[0]]
-
-names_dict_for_top = get_top_bottom_names(filtered_names_for_top, True)
-for sex, sex_names in names_dict_for_top.items():
-    sex_names['dpt'] = sex_names['dpt'].astype(str)
-    if sex == 1:
-        depts = depts.merge(sex_names.groupby('dpt')['preusuel'].apply(lambda x: ', '.join(x)).reset_index(),
-                            left_on='code', right_on='dpt', how='left').rename(columns={'preusuel': 'top_masculins'})
-    else:
-        depts = depts.merge(sex_names.groupby('dpt')['preusuel'].apply(lambda x: ', '.join(x)).reset_index(),
-                            left_on='code', right_on='dpt', how='left').rename(columns={'preusuel': 'top_feminins'})
+    start_year = end_year = selected_years[0]
 
-namesin_years = filtered_names_for_top
-name_counts = namesin_years.groupby('preusuel')['nombre'].sum().reset_index()
-name_counts = name_counts.sort_values(by='nombre', ascending=False)
-name_counts['rank'] = name_counts['nombre'].rank(method='min', ascending=False).astype(int)
+dept_values = department_top_names(start_year, end_year)
 
-name_list = name_counts.apply(lambda row: f"{row['preusuel']} ({row['nombre']}, #{row['rank']})", axis=1).tolist()
+name_ranking = load_name_ranking()
 
 with col2:
-    selected_name_display = st.selectbox('Sélectionnez un PRÉNOM (Attributions, #Rang)', name_list)
-selected_name = selected_name_display.split(' ')[0]
+    name_query = st.text_input('Rechercher un PRÉNOM (accents et fautes de frappe tolérés)', '')
+    name_matches = name_labels(load_name_index().search(name_query, name_ranking.counts(start_year, end_year), name_ranking.ranks(start_year, end_year)))
+    selected_name = st.selectbox('Sélectionnez un PRÉNOM (Attributions, #Rang)', list(name_matches), format_func=name_matches.get)
+if selected_name is None:
+    st.warning("Aucun prénom ne correspond à cette recherche.")
+    st.stop()
 
-filtered_names = namesin_years[namesin_years['preusuel'] == selected_name]
-name_counts__per_dept = filtered_names.groupby('dpt')['nombre'].sum().reset_index()
+name_counts__per_dept = name_department_counts(selected_name, start_year, end_year)
 
-depts['code'] = depts['code'].astype(str)
 name_counts__per_dept['dpt'] = name_counts__per_dept['dpt'].astype(str)
-depts = depts.merge(name_counts__per_dept, left_on='code', right_on='dpt', how='left').rename(columns={'nombre': 'count_name'})
-depts['count_name'] = depts['count_name'].fillna(0)
+dept_values = dept_values.merge(name_counts__per_dept, on='dpt', how='outer').rename(columns={'nombre': 'count_name'})
 
-geojson_data = json.loads(depts.to_json())
-geojson_features = alt.Data(values=geojson_data['features'])
+# Each map gets the coarsest geometry that still looks exact at its own scale
+geometry_france = load_geometry_asset(level_for_scale(FRANCE_SCALE))
+geometry_guadeloupe = load_geometry_asset(level_for_scale(GUADELOUPE_SCALE))
+dept_values = department_values(geometry_france, dept_values, fill={'count_name': 0})
+value_fields = ['count_name', 'top_masculins', 'top_feminins']
 
-max_count = depts['count_name'].max()
+max_count = dept_values['count_name'].max()
 color_scale = alt.Scale(domain=[0, max_count/5, max_count/2, max_count],
                         range=['#f7fbff', '#c6dbef', '#6baed6', '#08306b'])
 
@@ -111,18 +61,18 @@ points_chart = alt.Chart(points).mark_point(color='red', size=100).encode(
     y='y:Q',
     tooltip=['label:N'])
 
-map_chart_france = alt.Chart(geojson_features).mark_geoshape().encode(
-    color=alt.Color('properties.count_name:Q', scale=color_scale, legend=alt.Legend(title=f"Attributions de {selected_name}")),
+map_chart_france = choropleth(geometry_france, dept_values, value_fields).encode(
+    color=alt.Color('count_name:Q', scale=color_scale, legend=alt.Legend(title=f"Attributions de {selected_name}")),
     tooltip=[
         alt.Tooltip('properties.nom:N', title='Nom du Département'),
         alt.Tooltip('properties.code:N', title='Code du Département'),
-        alt.Tooltip('properties.count_name:Q', title=f"{selected_name}"),
-        alt.Tooltip('properties.top_masculins:N', title='Top 3 Masculins'),
-        alt.Tooltip('properties.top_feminins:N', title='Top 3 Féminins')
+        alt.Tooltip('count_name:Q', title=f"{selected_name}"),
+        alt.Tooltip('top_masculins:N', title='Top 3 Masculins'),
+        alt.Tooltip('top_feminins:N', title='Top 3 Féminins')
     ]
 ).project(
     type='mercator',
-    scale=2500,
+    scale=FRANCE_SCALE,
     center=[2, 46]
 ).properties(
     width=1000,
@@ -130,18 +80,18 @@ map_chart_france = alt.Chart(geojson_features).mark_geoshape().encode(
 ).interactive()
 combined_chart_france = alt.layer(map_chart_france, points_chart).configure_view(stroke=None)
 
-map_chart_guadeloupe = alt.Chart(geojson_features).mark_geoshape().encode(
-    color=alt.Color('properties.count_name:Q', scale=color_scale, legend=alt.Legend(title=f"Attributions de {selected_name}")),
+map_chart_guadeloupe = choropleth(geometry_guadeloupe, dept_values, value_fields).encode(
+    color=alt.Color('count_name:Q', scale=color_scale, legend=alt.Legend(title=f"Attributions de {selected_name}")),
     tooltip=[
         alt.Tooltip('properties.nom:N', title='Nom du Département'),
         alt.Tooltip('properties.code:N', title='Code du Département'),
-        alt.Tooltip('properties.count_name:Q', title=f"{selected_name}"),
-        alt.Tooltip('properties.top_masculins:N', title='Top 3 Masculins'),
-        alt.Tooltip('properties.top_feminins:N', title='Top 3 Féminins')
+        alt.Tooltip('count_name:Q', title=f"{selected_name}"),
+        alt.Tooltip('top_masculins:N', title='Top 3 Masculins'),
+        alt.Tooltip('top_feminins:N', title='Top 3 Féminins')
     ]
 ).project(
     type='mercator',
-    scale=8000,
+    scale=GUADELOUPE_SCALE,
     center=[-61, 16]
 ).properties(
     width=1000,
@@ -149,5 +99,44 @@ map_chart_guadeloupe = alt.Chart(geojson_features).mark_geoshape().encode(
 ).interactive()
 combined_chart_guadeloupe = alt.layer(map_chart_guadeloupe, points_chart).configure_view(stroke=None)
 
-st.altair_chart(combined_chart_france)
-st.altair_chart(combined_chart_guadeloupe)
\ No newline at end of file
+with stage('render'):
+    st.altair_chart(combined_chart_france)
+with stage('render'):
+    st.altair_chart(combined_chart_guadeloupe)
+
+# Départements regroupés selon les prénoms qu'ils donnent sur la même période
+st.subheader(f"Départements aux habitudes de prénoms similaires ({start_year}-{end_year})")
+
+col_k, col_sex, col_method = st.columns(3)
+with col_k:
+    n_clusters = st.slider('Nombre de groupes', 2, 12, 6)
+with col_sex:
+    cluster_sex = st.radio('Prénoms pris en compte', [None, 1, 2], horizontal=True,
+                           format_func={None: 'Tous', 1: 'Masculins', 2: 'Féminins'}.get)
+with col_method:
+    cluster_method = st.radio('Méthode', ['kmeans', 'hierarchical'], horizontal=True,
+                              format_func={'kmeans': 'K-means', 'hierarchical': 'Hiérarchique'}.get)
+
+clusters = department_values(geometry_france, department_clusters(start_year, end_year, n_clusters, cluster_sex,
+                                                                  cluster_method))
+map_chart_clusters = choropleth(geometry_france, clusters, ['cluster', 'typical_names']).encode(
+    color=alt.Color('cluster:N', scale=alt.Scale(scheme='tableau20'), legend=alt.Legend(title='Groupe')),
+    tooltip=[
+        alt.Tooltip('properties.nom:N', title='Nom du Département'),
+        alt.Tooltip('properties.code:N', title='Code du Département'),
+        alt.Tooltip('cluster:N', title='Groupe'),
+        alt.Tooltip('typical_names:N', title='Prénoms typiques du groupe')
+    ]
+).project(
+    type='mercator',
+    scale=FRANCE_SCALE,
+    center=[2, 46]
+).properties(
+    width=1000,
+    height=1000
+).configure_view(stroke=None)
+
+with stage('render'):
+    st.altair_chart(map_chart_clusters)
+
+finish_rerun()
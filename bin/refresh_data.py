@@ -0,0 +1,39 @@
+"""Publish a new version of the names table when the INSEE file has changed.
+
+    python bin/refresh_data.py
+    python bin/refresh_data.py ./data/dpt2021.csv
+
+The indexes of the new version are built before it is published, the cube and ranking
+updated from the previous version for the changed years only. Running apps keep
+serving the previous version until the manifest is replaced, then switch at their next
+interaction and only map the new indexes.
+"""
+
+import argparse
+import time
+
+from namesviz.data import NAMES_CSV
+from namesviz.versions import VERSIONS_DIR, DatasetRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv', nargs='?', default=NAMES_CSV)
+    parser.add_argument('--versions-dir', default=VERSIONS_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    registry = DatasetRegistry(args.versions_dir)
+    previous = registry.current()
+    dataset = registry.refresh(args.csv)
+    elapsed = time.perf_counter() - start
+    if previous and dataset['version'] == previous['version']:
+        print(f"Version {dataset['version']} is up to date ({elapsed:.1f}s)")
+        return
+    years = dataset['changed_years']
+    changed = f"{len(years)} years changed ({years[0]}-{years[-1]})" if years else "no year changed"
+    print(f"Version {dataset['version']} published from {args.csv}: {changed} ({elapsed:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
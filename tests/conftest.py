@@ -0,0 +1,98 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The apps import the package as bin/namesviz, with bin/ first on the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bin'))
+
+
+def random_rows(seed, years=range(1990, 2011)):
+    """20,000 random rows of the names CSV: 300 names, 95 departments, years as text as in the file."""
+    rng = np.random.default_rng(seed)
+    n_rows = 20_000
+    return pd.DataFrame({
+        'sexe': rng.integers(1, 3, n_rows),
+        'preusuel': [f"N{i}" for i in rng.integers(0, 300, n_rows)],
+        'annais': rng.choice(list(years), n_rows).astype(str),
+        'dpt': [f"{i:02d}" for i in rng.integers(1, 96, n_rows)],
+        'nombre': rng.integers(3, 200, n_rows),
+    })
+
+
+def write_csv(path, rows):
+    rows.to_csv(path, sep=';', index=False)
+    return str(path)
+
+
+def names_table(rows):
+    """``rows`` typed like the loaded names table: integer years, categorical names and departments."""
+    return rows.assign(annais=rows['annais'].astype(int), preusuel=rows['preusuel'].astype('category'),
+                       dpt=rows['dpt'].astype('category'))
+
+
+class StubServer:
+    """Local HTTP server answering every GET with ``respond(path, query)``.
+
+    ``respond`` returns ``(status, body)``, ``body`` being encoded as JSON unless it is
+    already bytes. The server records the requests it received and the highest number
+    of them in flight at once.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append((url.path, query))
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    status, body = stub.respond(url.path, query)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def serve(respond):
+        servers.append(StubServer(respond))
+        return servers[-1]
+
+    yield serve
+    for server in servers:
+        server.close()
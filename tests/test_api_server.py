@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+import tornado.netutil
+from tornado.httpserver import HTTPServer
+
+from api_server import (MAX_SEARCH_RESULTS, MAX_SIMILAR_NAMES, MAX_TOP_DEPARTMENTS, MAX_TOP_NAMES, CurrentDataset,
+                        make_app)
+from conftest import random_rows, write_csv
+from namesviz.versions import DatasetRegistry
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    """Base URL of the API serving a small registry, and its ``CurrentDataset``."""
+    tmp_path = tmp_path_factory.mktemp('api')
+    registry = DatasetRegistry(str(tmp_path / 'versions'))
+    registry.refresh(write_csv(tmp_path / 'names.csv', random_rows(0)))
+    current = CurrentDataset(registry)
+    current.get()
+    sockets = tornado.netutil.bind_sockets(0, '127.0.0.1')
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        HTTPServer(make_app(current)).add_sockets(sockets)
+        loop.call_soon(started.set)
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    started.wait()
+    yield f"http://127.0.0.1:{sockets[0].getsockname()[1]}", current
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_regional_requires_names_or_a_top(api):
+    url, _ = api
+    assert requests.get(f"{url}/regional").status_code == 400
+    assert requests.get(f"{url}/regional", params={'n': MAX_TOP_DEPARTMENTS + 1}).status_code == 400
+
+    top = requests.get(f"{url}/regional", params={'n': 2}).json()
+    assert {row[top['columns'].index('rank')] for row in top['data']} == {1, 2}
+    cells = requests.get(f"{url}/regional", params={'name': ['N1', 'N2']}).json()
+    assert {row[cells['columns'].index('preusuel')] for row in cells['data']} == {'N1', 'N2'}
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/names/N1/similar', {'n': -3}),
+    ('/names/N1/similar', {'n': 0}),
+    ('/names/N1/similar', {'n': MAX_SIMILAR_NAMES + 1}),
+    ('/top', {'k': 0}),
+    ('/top', {'k': MAX_TOP_NAMES + 1}),
+    ('/search', {'q': 'n1', 'limit': -1}),
+    ('/search', {'q': 'n1', 'limit': MAX_SEARCH_RESULTS + 1}),
+    ('/regional', {'n': 0}),
+    ('/regional', {'name': 'N1', 'min_births': 0}),
+])
+def test_out_of_range_sizes_are_rejected(api, path, params):
+    url, _ = api
+    response = requests.get(f"{url}{path}", params=params)
+    assert response.status_code == 400
+    assert 'must be' in response.json()['error']
+
+
+def test_sizes_bound_the_results(api):
+    url, _ = api
+    similar = requests.get(f"{url}/names/N1/similar", params={'n': 3}).json()
+    assert len(similar['data']) == 3
+    search = requests.get(f"{url}/search", params={'q': 'n1', 'limit': 2}).json()
+    assert len(search['data']) == 2
+
+
+def test_a_slow_query_does_not_block_other_requests(api, monkeypatch):
+    url, current = api
+    release = threading.Event()
+
+    def slow_peaks(*args):
+        release.wait(5)
+        return current.get()._peaks(*args)
+
+    monkeypatch.setattr(current.get(), 'peaks', slow_peaks)
+    with ThreadPoolExecutor(1) as pool:
+        peaks = pool.submit(requests.get, f"{url}/peaks", params={'min': 10})
+        time.sleep(0.1)
+        started = time.perf_counter()
+        evolution = requests.get(f"{url}/names/N1/evolution")
+        elapsed = time.perf_counter() - started
+        assert not peaks.done()
+        release.set()
+        assert peaks.result().status_code == 200
+
+    assert evolution.status_code == 200
+    assert elapsed < 1
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import names_table
+from namesviz.clustering import METHODS, cluster_departments
+from namesviz.yearrange import YearRangeIndex
+
+BLOCKS = {'A': range(1, 11), 'B': range(11, 21), 'C': range(21, 31)}
+
+
+def regional_rows(seed=0):
+    """Three blocks of ten departments, each giving its own five names and a few births of a shared one."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for block, departments in BLOCKS.items():
+        for dpt in departments:
+            for year in ('2000', '2001'):
+                for j in range(5):
+                    rows.append((1 + j % 2, f"{block}{j}", year, f"{dpt:02d}", int(rng.integers(50, 150))))
+                rows.append((1, 'SHARED', year, f"{dpt:02d}", int(rng.integers(5, 10))))
+    return pd.DataFrame(rows, columns=['sexe', 'preusuel', 'annais', 'dpt', 'nombre'])
+
+
+@pytest.fixture(scope='module')
+def range_index():
+    return YearRangeIndex.from_names(names_table(regional_rows()))
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_clusters_follow_the_regional_blocks(range_index, method):
+    clusters = cluster_departments(range_index, 2000, 2001, k=3, method=method, min_births=10)
+
+    labels = dict(zip(clusters['dpt'], clusters['cluster']))
+    block_labels = {block: {labels[f"{dpt:02d}"] for dpt in departments} for block, departments in BLOCKS.items()}
+    assert all(len(found) == 1 for found in block_labels.values())
+    assert len(set.union(*block_labels.values())) == 3
+    for block, (label,) in block_labels.items():
+        typical = clusters.loc[clusters['cluster'] == label, 'typical_names'].iloc[0]
+        assert all(name.startswith(block) for name in typical.split(', '))
+
+
+def test_a_single_department_is_one_cluster():
+    rows = regional_rows()
+    index = YearRangeIndex.from_names(names_table(rows[rows['dpt'] == '01']))
+    for method in METHODS:
+        clusters = cluster_departments(index, 2000, 2001, k=3, method=method, min_births=10)
+        assert clusters['cluster'].tolist() == [1]
+
+
+def test_hierarchical_with_one_frequent_name_falls_back_to_kmeans():
+    rows = regional_rows()
+    index = YearRangeIndex.from_names(names_table(rows[rows['preusuel'].isin(['A0', 'SHARED'])]))
+    # Only A0 is given 1,000 times: no singular direction to reduce the departments on
+    clusters = cluster_departments(index, 2000, 2001, k=2, method='hierarchical', min_births=1000)
+    labels = dict(zip(clusters['dpt'], clusters['cluster']))
+    assert len({labels[f"{dpt:02d}"] for dpt in BLOCKS['A']}) == 1
+    assert {labels[f"{dpt:02d}"] for dpt in BLOCKS['A']} != {labels[f"{dpt:02d}"] for dpt in BLOCKS['B']}
+
+
+def test_no_frequent_name_is_one_cluster(range_index):
+    clusters = cluster_departments(range_index, 2000, 2001, k=3, min_births=10**9)
+    assert set(clusters['cluster']) == {1}
+    assert len(clusters) == 30
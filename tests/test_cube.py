@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from conftest import names_table, random_rows
+from namesviz import NameCube
+
+
+@pytest.fixture(scope='module')
+def names():
+    return names_table(random_rows(0))
+
+
+@pytest.fixture(scope='module')
+def cube(names):
+    return NameCube.from_names(names)
+
+
+def test_counts_match_a_groupby(names, cube):
+    expected = names.groupby(['preusuel', 'annais', 'sexe'], observed=False)['nombre'].sum()
+    expected = expected.unstack('sexe').reindex(columns=[1, 2], fill_value=0).to_numpy().reshape(cube.counts.shape)
+    np.testing.assert_array_equal(cube.counts, expected)
+
+
+@pytest.mark.parametrize('name', ['N0', 'N1', 'N150', 'N299'])
+def test_evolution_matches_a_groupby(names, cube, name):
+    rows = names[names['preusuel'] == name]
+    expected = rows.groupby(['annais', 'sexe'])['nombre'].sum().reset_index()
+
+    evolution = cube.evolution(name)
+
+    assert evolution['annais'].tolist() == expected['annais'].tolist()
+    assert evolution['sexe'].tolist() == expected['sexe'].tolist()
+    assert evolution['nombre'].tolist() == expected['nombre'].tolist()
+
+
+def test_years_span_the_table_without_gaps(names, cube):
+    assert cube.years.tolist() == list(range(names['annais'].min(), names['annais'].max() + 1))
+    assert cube.names.tolist() == names['preusuel'].cat.categories.tolist()
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from namesviz.data import NamesAggregator, read_names_csv
+from namesviz.yearrange import YearRangeIndex
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows, columns=['sexe', 'preusuel', 'annais', 'dpt', 'nombre']).to_csv(path, sep=';', index=False)
+
+
+def expected_cells(rows):
+    frame = pd.DataFrame(rows, columns=['sexe', 'preusuel', 'annais', 'dpt', 'nombre']).astype({'sexe': int, 'annais': int})
+    return frame.groupby(['sexe', 'preusuel', 'annais', 'dpt'])['nombre'].sum()
+
+
+def cells(names):
+    frame = names.astype({'sexe': int, 'preusuel': str, 'dpt': str, 'annais': int})
+    return frame.groupby(['sexe', 'preusuel', 'annais', 'dpt'])['nombre'].sum()
+
+
+def test_more_departments_than_the_old_15_bit_field(tmp_path):
+    rng = np.random.default_rng(0)
+    n_rows = 120_000
+    rows = pd.DataFrame({
+        'sexe': rng.integers(1, 3, n_rows),
+        'preusuel': [f"N{i}" for i in rng.integers(0, 50, n_rows)],
+        'annais': rng.integers(1900, 2021, n_rows).astype(str),
+        'dpt': [f"{i:05d}" for i in rng.integers(0, 34_000, n_rows)],
+        'nombre': rng.integers(1, 20, n_rows),
+    })
+    write_csv(tmp_path / 'communes.csv', rows)
+
+    names = read_names_csv(tmp_path / 'communes.csv', chunksize=25_000)
+
+    pd.testing.assert_series_equal(cells(names), expected_cells(rows), check_dtype=False)
+    index = YearRangeIndex.from_names(names)
+    assert index.group_dpt.dtype == np.int32
+    totals = index.department_totals(1900, 2020).astype({'dpt': str}).set_index('dpt')['total_count']
+    expected = rows.groupby('dpt')['nombre'].sum()
+    pd.testing.assert_series_equal(totals.sort_index(), expected.sort_index(), check_names=False, check_dtype=False)
+
+
+def test_rows_without_department_are_dropped(tmp_path):
+    rows = [(1, 'MARIE', '2000', '75', 10), (2, 'MARIE', '2000', None, 4), (1, 'JEAN', '2001', 'XX', 3),
+            (2, 'JEAN', '2001', '13', 5)]
+    write_csv(tmp_path / 'names.csv', rows)
+
+    names = read_names_csv(tmp_path / 'names.csv')
+
+    assert cells(names).to_dict() == {(1, 'MARIE', 2000, '75'): 10, (2, 'JEAN', 2001, '13'): 5}
+
+
+def test_vocabulary_ignores_categories_of_filtered_rows():
+    chunk = pd.DataFrame({
+        'sexe': np.array([1], dtype=np.int8),
+        'preusuel': pd.Categorical(['MARIE'], categories=['JEAN', 'MARIE']),
+        'annais': np.array([2000], dtype=np.int16),
+        'dpt': pd.Categorical(['75'], categories=['13', '75']),
+        'nombre': np.array([3], dtype=np.int32),
+    })
+    aggregator = NamesAggregator()
+    aggregator.add(chunk)
+    assert list(aggregator.names) == ['MARIE']
+    assert list(aggregator.departments) == ['75']
+
+
+def test_invalid_sex_raises():
+    chunk = pd.DataFrame({
+        'sexe': np.array([3], dtype=np.int8),
+        'preusuel': pd.Categorical(['MARIE']),
+        'annais': np.array([2000], dtype=np.int16),
+        'dpt': pd.Categorical(['75']),
+        'nombre': np.array([3], dtype=np.int32),
+    })
+    with pytest.raises(ValueError):
+        NamesAggregator().add(chunk)
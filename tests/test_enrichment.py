@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from namesviz import wiki
+from namesviz.enrichment import MAX_CONCURRENT_LOOKUPS, Enricher
+from namesviz.httpcache import CachedClient, MemoryCache
+from namesviz.wiki import LookupUnavailable
+
+SEARCH_ANSWER = {'query': {'search': [{'title': 'Jeux olympiques', 'snippet': '<span class="searchmatch">2000</span>'}]}}
+SPARQL_ANSWER = {'results': {'bindings': [{'itemLabel': {'value': 'Marie Curie'}, 'description': {'value': 'physicienne'}}]}}
+
+
+@pytest.fixture
+def endpoints(stub_server, monkeypatch):
+    """A fake Wikipedia API and SPARQL endpoint, answering from ``answers`` or with the canned results."""
+    answers = []
+    delay = {'seconds': 0}
+
+    def respond(path, query):
+        time.sleep(delay['seconds'])
+        if answers:
+            return answers.pop(0)
+        return 200, SPARQL_ANSWER if path == '/sparql' else SEARCH_ANSWER
+
+    server = stub_server(respond)
+    monkeypatch.setattr(wiki, 'WIKIPEDIA_API_URL', f"{server.url}/w/api.php")
+    monkeypatch.setattr(wiki, 'WIKIDATA_SPARQL_URL', f"{server.url}/sparql")
+    server.answers, server.delay = answers, delay
+    return server
+
+
+@pytest.fixture
+def enricher():
+    enricher = Enricher(client=CachedClient(MemoryCache(), retries=0))
+    yield enricher
+    enricher._background.shutdown(wait=True)
+    enricher._foreground.shutdown(wait=True)
+
+
+def test_lookups_parse_the_answers(endpoints, enricher):
+    assert enricher.events(2000).result(timeout=5) == ['Jeux olympiques - 2000']
+    assert enricher.wikidata('MARIE', urgent=True).result(timeout=5) == ['Marie Curie - physicienne']
+
+
+def test_answers_are_memoized(endpoints, enricher):
+    assert enricher.events(2000).result(timeout=5) == enricher.events(2000).result(timeout=5)
+    assert len(endpoints.requests) == 1
+
+
+@pytest.mark.parametrize('failure', [(429, {'error': 'too many requests'}), (503, b''), (200, b'<html></html>')])
+def test_failures_are_not_memoized(endpoints, enricher, failure):
+    endpoints.answers.append(failure)
+
+    with pytest.raises(LookupUnavailable):
+        enricher.events(2000).result(timeout=5)
+    assert enricher.events(2000, urgent=True).result(timeout=5) == ['Jeux olympiques - 2000']
+    assert len(endpoints.requests) == 2
+
+
+def test_timeouts_are_not_memoized(endpoints):
+    enricher = Enricher(client=CachedClient(MemoryCache(), timeout=0.2, retries=0))
+    endpoints.delay['seconds'] = 0.5
+    with pytest.raises(LookupUnavailable):
+        enricher.wikidata('MARIE').result(timeout=5)
+
+    endpoints.delay['seconds'] = 0
+    assert enricher.wikidata('MARIE').result(timeout=5) == ['Marie Curie - physicienne']
+
+
+def test_prefetch_stays_within_the_concurrency_limit(endpoints, enricher):
+    endpoints.delay['seconds'] = 0.05
+    popular_names = [(f"NAME{i}", [], []) for i in range(15)]
+
+    futures = enricher.prefetch(popular_names, range(1990, 2010))
+    urgent = [enricher.events(year, urgent=True) for year in range(2010, 2015)]
+    for future in futures + urgent:
+        future.result(timeout=10)
+
+    assert len(endpoints.requests) == 40
+    assert endpoints.max_in_flight <= MAX_CONCURRENT_LOOKUPS
+
+
+def test_pools_larger_than_the_limit_are_refused():
+    with pytest.raises(ValueError):
+        Enricher(max_workers=4, foreground_workers=4)
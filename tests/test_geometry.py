@@ -0,0 +1,28 @@
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Polygon
+
+from namesviz.geometry import LEVELS_OF_DETAIL, build_geometry_cache
+
+
+def jagged_departments(path):
+    """Two departments sharing a border with a small zigzag, one edge every 0.001 degree."""
+    ys = np.linspace(0, 1, 1001)
+    border = [(0.5 + 0.003 * (i % 2), y) for i, y in enumerate(ys)]
+    west = Polygon([(0, 0)] + border + [(0, 1)])
+    east = Polygon([(1, 0), (1, 1)] + border[::-1])
+    gpd.GeoDataFrame({'code': ['01', '02'], 'nom': ['Ouest', 'Est']}, geometry=[west, east],
+                     crs='EPSG:4326').to_file(path, driver='GeoJSON')
+    return str(path)
+
+
+def test_simplified_levels_keep_shared_borders(tmp_path):
+    paths = build_geometry_cache(jagged_departments(tmp_path / 'depts.geojson'), str(tmp_path / 'cache'))
+
+    for level in LEVELS_OF_DETAIL:
+        west, east = gpd.read_parquet(paths[level]).geometry
+        assert west.is_valid and east.is_valid
+        assert west.intersection(east).area == 0, level
+        assert abs(west.union(east).area - 1) < 1e-12, level
+        if LEVELS_OF_DETAIL[level]:
+            assert len(west.exterior.coords) < 100, level
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from namesviz.httpcache import CachedClient, MemoryCache, SQLiteCache
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCache()
+    return SQLiteCache(str(tmp_path / 'http.sqlite'))
+
+
+def test_answers_are_cached(stub_server, cache):
+    server = stub_server(lambda path, query: (200, {'q': query['q']}))
+    client = CachedClient(cache)
+
+    assert client.get_json(server.url, {'q': 'marie'}) == {'q': 'marie'}
+    assert client.get_json(server.url, {'q': 'marie'}) == {'q': 'marie'}
+    assert client.get_json(server.url, {'q': 'jean'}) == {'q': 'jean'}
+    assert len(server.requests) == 2
+
+
+@pytest.mark.parametrize('status, body', [(429, {'error': 'too many requests'}), (500, b'oops'),
+                                          (200, b'<html>Service unavailable</html>'), (200, b'{"truncated": ')])
+def test_failures_return_none_and_are_not_cached(stub_server, cache, status, body):
+    answers = [(status, body), (200, {'ok': True})]
+    server = stub_server(lambda path, query: answers.pop(0))
+    client = CachedClient(cache)
+
+    assert client.get_json(server.url) is None
+    assert client.get_json(server.url) == {'ok': True}
+    assert len(server.requests) == 2
+
+
+def test_unreachable_server_returns_none():
+    client = CachedClient(MemoryCache(), timeout=0.5, retries=0)
+    assert client.get_json('http://127.0.0.1:9/unreachable') is None
+
+
+def test_expired_entries_are_fetched_again(stub_server, tmp_path):
+    server = stub_server(lambda path, query: (200, {'ok': True}))
+    for cache in (MemoryCache(ttl=0.05), SQLiteCache(str(tmp_path / 'http.sqlite'), ttl=0.05)):
+        client = CachedClient(cache)
+        client.get_json(server.url, {'backend': type(cache).__name__})
+        time.sleep(0.1)
+        client.get_json(server.url, {'backend': type(cache).__name__})
+    assert len(server.requests) == 4
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+
+def test_sqlite_cache_evicts_beyond_max_bytes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'http.sqlite'), max_bytes=30)
+    cache.set('a', 'x' * 10)
+    cache.set('b', 'y' * 10)
+    cache.get('a')
+    cache.set('c', 'z' * 10)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'x' * 10 and cache.get('c') == 'z' * 10
@@ -0,0 +1,54 @@
+import io
+import json
+import logging
+import time
+
+from namesviz import instrument
+from namesviz.instrument import (Metrics, finish_profile, log_profiles, process_textfile, stage, start_profile,
+                                 write_prometheus_textfile)
+
+
+def test_profiles_are_logged_with_the_root_logger_at_warning(monkeypatch):
+    monkeypatch.setattr(logging.getLogger(), 'level', logging.WARNING)
+    stream = io.StringIO()
+    monkeypatch.setattr(instrument.logger, 'handlers', [])
+    log_profiles(stream)
+    log_profiles(stream)
+
+    start_profile('test_app')
+    with stage('groupby'):
+        pass
+    finish_profile()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    summary = json.loads(lines[0])
+    assert summary['app'] == 'test_app' and summary['interrupted'] is False
+    assert summary['stages']['groupby']['calls'] == 1
+
+
+def test_interrupted_profile_counts_up_to_its_last_stage():
+    profile = start_profile('test_app')
+    with stage('load'):
+        time.sleep(0.01)
+    time.sleep(0.05)
+    # The next run starts on another thread and closes the profile it finds in the session
+    instrument._current.set(None)
+    start_profile('test_app')
+
+    finish_profile(profile=profile, interrupted=True, log=False)
+    assert profile.interrupted
+    assert 0.01 <= profile.total < 0.05
+    assert finish_profile(profile=profile, interrupted=True, log=False) is profile
+    assert instrument.current_profile() is not None
+    finish_profile(log=False)
+
+
+def test_each_process_writes_its_own_textfile(tmp_path):
+    metrics = Metrics()
+    metrics.observe('namesviz_run_seconds', {'app': 'gender_name'}, 0.2)
+    path = process_textfile(str(tmp_path / 'namesviz.prom'), 'gender_name')
+    write_prometheus_textfile(path, metrics, pid=1234)
+
+    assert path.endswith('.prom') and path != str(tmp_path / 'namesviz.prom')
+    assert 'namesviz_run_seconds_count{app="gender_name",pid="1234"} 1' in open(path).read()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import find_peaks
+
+from namesviz.peaks import find_peaks_2d, find_popular_names
+
+
+def scipy_peaks_2d(values, height=None):
+    """Reference: ``scipy.signal.find_peaks`` run on every column, in the same (columns, rows) layout."""
+    columns, rows = [], []
+    for column in range(values.shape[1]):
+        peaks, _ = find_peaks(values[:, column], height=height)
+        columns.extend([column] * len(peaks))
+        rows.extend(peaks)
+    return np.array(columns, dtype=np.intp), np.array(rows, dtype=np.intp)
+
+
+def assert_same_as_scipy(values, height=None):
+    columns, rows = find_peaks_2d(values, height=height)
+    expected_columns, expected_rows = scipy_peaks_2d(values, height=height)
+    np.testing.assert_array_equal(columns, expected_columns)
+    np.testing.assert_array_equal(rows, expected_rows)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('height', [None, 0, 2, 5])
+def test_random_small_integers_with_plateaus(seed, height):
+    # Few distinct values give many plateaus, including at the first and last rows
+    values = np.random.default_rng(seed).integers(0, 4, size=(60, 200)) * 2
+    assert_same_as_scipy(values, height)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_floats_with_nan(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 5, size=(40, 100)).astype(float)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    values[:, :5] = np.nan
+    assert_same_as_scipy(values)
+    assert_same_as_scipy(values, height=2)
+
+
+@pytest.mark.parametrize('column, expected_rows', [
+    ([0, 1, 0], [1]),
+    ([5, 1, 5], []),                     # edge samples are never peaks
+    ([0, 3, 3, 0], [1]),                 # even plateau: middle rounded down
+    ([0, 3, 3, 3, 0], [2]),
+    ([0, 3, 3, 3], []),                  # plateau running into the last row
+    ([3, 3, 0, 1, 1, 0], [3]),           # plateau starting on the first row, then a later one
+    ([0, 0, 0, 0], []),
+    ([0, 2, 1, 2, 1], [1, 3]),
+])
+def test_hand_picked_columns(column, expected_rows):
+    values = np.array(column)[:, None]
+    assert_same_as_scipy(values)
+    np.testing.assert_array_equal(find_peaks_2d(values)[1], expected_rows)
+
+
+@pytest.mark.parametrize('shape', [(0, 3), (1, 3), (2, 3), (5, 0)])
+def test_degenerate_shapes(shape):
+    values = np.ones(shape)
+    columns, rows = find_peaks_2d(values)
+    assert len(columns) == len(rows) == 0
+
+
+def test_all_zero_and_all_nan_columns():
+    values = np.zeros((30, 4))
+    values[:, 1] = np.nan
+    values[10, 2] = 7
+    assert_same_as_scipy(values)
+    assert_same_as_scipy(values, height=8)
+
+
+def test_popular_names_match_the_per_name_scipy_loop():
+    rng = np.random.default_rng(0)
+    trends = pd.DataFrame(rng.integers(0, 12_000, size=(31, 300)), index=range(1990, 2021),
+                          columns=[f"NAME{i}" for i in range(300)])
+    min_threshold, max_threshold = 6000, 10_000
+
+    expected = []
+    for name in trends.columns:
+        popularity = trends[name].to_numpy()
+        if min_threshold <= popularity.max() <= max_threshold:
+            peaks, _ = find_peaks(popularity, height=min_threshold)
+            if len(peaks):
+                expected.append((name, peaks, popularity[peaks]))
+
+    actual = find_popular_names(trends, min_threshold, max_threshold)
+    assert [name for name, _, _ in actual] == [name for name, _, _ in expected]
+    for (_, peaks, values), (_, expected_peaks, expected_values) in zip(actual, expected):
+        np.testing.assert_array_equal(peaks, expected_peaks)
+        np.testing.assert_array_equal(values, expected_values)
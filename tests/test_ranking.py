@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from namesviz import NameCube, NameRanking
+
+
+@pytest.fixture(scope='module')
+def names():
+    rng = np.random.default_rng(0)
+    n_rows = 30_000
+    return pd.DataFrame({
+        'sexe': rng.integers(1, 3, n_rows).astype(np.int8),
+        'preusuel': pd.Categorical([f"N{i:03d}" for i in rng.integers(0, 400, n_rows)]),
+        'annais': rng.integers(1950, 2001, n_rows).astype(np.int16),
+        'dpt': pd.Categorical([f"{i:02d}" for i in rng.integers(1, 96, n_rows)]),
+        'nombre': rng.integers(1, 50, n_rows).astype(np.int32),
+    })
+
+
+@pytest.fixture(scope='module')
+def ranking(names):
+    return NameRanking.from_cube(NameCube.from_names(names))
+
+
+def expected_counts(names, start_year, end_year, sex):
+    rows = names[names['annais'].between(start_year, end_year)]
+    if sex is not None:
+        rows = rows[rows['sexe'] == sex]
+    return rows.groupby('preusuel', observed=False)['nombre'].sum().to_numpy()
+
+
+def test_prefix_sums_are_compact(ranking):
+    assert ranking.prefix.dtype == np.int32
+    assert ranking.prefix.shape == (2, len(ranking.years) + 1, len(ranking.names))
+
+
+@pytest.mark.parametrize('sex', [None, 1, 2])
+@pytest.mark.parametrize('start_year, end_year', [(1950, 2000), (1980, 1980), (1990, 1999), (2010, 2020)])
+def test_counts_and_ranks_match_a_groupby(names, ranking, sex, start_year, end_year):
+    counts = expected_counts(names, start_year, end_year, sex)
+    np.testing.assert_array_equal(ranking.counts(start_year, end_year, sex), counts)
+    expected_ranks = np.where(counts > 0, 1 + (counts[None, :] > counts[:, None]).sum(axis=1), 0)
+    np.testing.assert_array_equal(ranking.ranks(start_year, end_year, sex), expected_ranks)
+
+
+@pytest.mark.parametrize('sex', [None, 1, 2])
+def test_rank_series_and_rank_agree_with_counts(ranking, sex):
+    name = ranking.names[3]
+    series = ranking.rank_series(name, sex)
+    for year, count, rank in series.itertuples(index=False):
+        assert ranking.rank(name, year, sex) == (rank, count)
+        assert ranking.counts(year, year, sex)[3] == count
+
+
+def test_updated_ranking_equals_a_rebuild(names, ranking):
+    changed = names.assign(nombre=np.where(names['annais'] == 1975, names['nombre'] * 2, names['nombre']))
+    cube = NameCube.from_names(changed)
+    updated, rebuilt = ranking.updated(cube, [1975]), NameRanking.from_cube(cube)
+    np.testing.assert_array_equal(updated.prefix, rebuilt.prefix)
+    np.testing.assert_array_equal(updated.year_ranks, rebuilt.year_ranks)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from namesviz import NameIndex
+from namesviz.ranking import competition_ranks
+from namesviz.search import name_labels, normalize
+
+NAMES = {
+    'MARIE': 900,
+    'MARIE-CLAIRE': 300,
+    'MARIANNE': 300,
+    'MARYSE': 120,
+    'JÉRÔME': 500,
+    'ANNE': 700,
+    'ANNE-MARIE': 200,
+    "N'DIAYE": 10,
+    'ZOÉ': 0,
+}
+
+
+@pytest.fixture(scope='module')
+def index():
+    return NameIndex(pd.Index(list(NAMES)))
+
+
+@pytest.fixture(scope='module')
+def counts():
+    return np.array(list(NAMES.values()), dtype=np.int64)
+
+
+def test_normalize_drops_accents_case_and_separators():
+    assert normalize(" jérôme ") == 'JEROME'
+    assert normalize("Marie Claire") == normalize('MARIE-CLAIRE') == 'MARIE CLAIRE'
+    assert normalize("n diaye") == normalize("N'DIAYE")
+
+
+def test_prefix_matches_come_by_decreasing_count(index, counts):
+    matches = index.search('mari', counts, fuzzy=False)
+    # Ties on the count keep the vocabulary order
+    assert matches['preusuel'].tolist() == ['MARIE', 'MARIE-CLAIRE', 'MARIANNE']
+
+
+def test_accents_and_separators_are_ignored(index, counts):
+    assert index.search('jerome', counts, fuzzy=False)['preusuel'].tolist() == ['JÉRÔME']
+    assert index.search('Jérô', counts, fuzzy=False)['preusuel'].tolist() == ['JÉRÔME']
+    assert index.search('marie claire', counts, fuzzy=False)['preusuel'].tolist() == ['MARIE-CLAIRE']
+    assert index.search('n dia', counts, fuzzy=False)['preusuel'].tolist() == ["N'DIAYE"]
+
+
+def test_typos_are_matched_by_trigrams(index, counts):
+    matches = index.search('MARYE', counts)['preusuel'].tolist()
+    assert index.prefix_matches('MARYE').size == 0
+    assert 'MARIE' in matches and 'MARYSE' in matches
+    assert 'JÉRÔME' not in matches
+
+
+def test_prefix_matches_come_before_trigram_matches(index, counts):
+    matches = index.search('MARIE', counts)['preusuel'].tolist()
+    assert matches[:2] == ['MARIE', 'MARIE-CLAIRE']
+    assert 'ANNE-MARIE' in matches[2:]
+
+
+def test_names_not_given_are_left_out(index, counts):
+    assert index.search('zoe', counts).empty
+    assert 'ZOÉ' not in index.search('', counts, limit=len(NAMES))['preusuel'].tolist()
+
+
+def test_count_and_rank_columns(index, counts):
+    matches = index.search('', counts, limit=4)
+    assert matches['preusuel'].tolist() == ['MARIE', 'ANNE', 'JÉRÔME', 'MARIE-CLAIRE']
+    assert matches['nombre'].tolist() == [900, 700, 500, 300]
+    # Competition ranks: MARIE-CLAIRE and MARIANNE share rank 4
+    assert matches['rank'].tolist() == [1, 2, 3, 4]
+    ranks = competition_ranks(counts)
+    assert ranks[list(NAMES).index('MARIANNE')] == 4
+    given = index.search('mar', counts, ranks=ranks)
+    assert given.equals(index.search('mar', counts))
+    assert name_labels(matches)['MARIE'] == 'MARIE (900, #1)'
+
+
+def test_limit_caps_prefix_and_trigram_matches(index, counts):
+    assert len(index.search('MARYE', counts, limit=2)) == 2
+    assert len(index.search('MA', counts, limit=1)) == 1
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from namesviz.shared import METADATA, freeze, map_structure, save_structure, shared_structure
+
+
+class Structure:
+    def __init__(self):
+        self.labels = pd.Index(['ANNE', 'JEAN', 'MARIE'])
+        self.years = np.arange(1990, 2000, dtype=np.int16)
+        self.counts = np.arange(30, dtype=np.int32).reshape(3, 10)
+        self.matrix = sparse.random(3, 10, density=0.3, format='csr', random_state=0, dtype=np.float64)
+        self.name = 'test'
+        self.lookup = {'ANNE': 0, 'JEAN': 1}
+
+
+@pytest.fixture
+def mapped(tmp_path):
+    save_structure(Structure(), str(tmp_path / 'structure'))
+    return map_structure(str(tmp_path / 'structure'))
+
+
+def test_every_attribute_round_trips(mapped):
+    original = Structure()
+    assert type(mapped) is Structure
+    assert mapped.labels.equals(original.labels)
+    assert mapped.name == original.name and mapped.lookup == original.lookup
+    for attribute in ('years', 'counts'):
+        assert isinstance(getattr(mapped, attribute), np.memmap)
+        assert getattr(mapped, attribute).dtype == getattr(original, attribute).dtype
+        np.testing.assert_array_equal(getattr(mapped, attribute), getattr(original, attribute))
+    assert sparse.issparse(mapped.matrix) and mapped.matrix.shape == original.matrix.shape
+    np.testing.assert_array_equal(mapped.matrix.toarray(), original.matrix.toarray())
+
+
+def test_mapped_arrays_are_read_only(mapped):
+    with pytest.raises(ValueError):
+        mapped.counts[0, 0] = 1
+    with pytest.raises(ValueError):
+        mapped.matrix.data[0] = 1
+    with pytest.raises(ValueError):
+        mapped.years += 1
+
+
+def test_frozen_arrays_are_read_only():
+    structure = freeze(Structure())
+    with pytest.raises(ValueError):
+        structure.counts[0, 0] = 1
+
+
+def test_shared_structure_builds_once(tmp_path):
+    directory = str(tmp_path / 'structure')
+    built = []
+
+    def build():
+        built.append(1)
+        return Structure()
+
+    shared_structure(directory, build)
+    shared_structure(directory, build)
+    assert built == [1]
+    assert os.path.exists(os.path.join(directory, METADATA))
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from conftest import names_table, random_rows
+from namesviz import NameTrends, TrajectoryIndex
+from namesviz.similarity import _best, dtw_distances
+
+
+def brute_force_dtw(query, series, band):
+    length = len(query)
+    cost = np.full((length + 1, length + 1), np.inf)
+    cost[0, 0] = 0
+    for i in range(1, length + 1):
+        for j in range(1, length + 1):
+            if abs(i - j) <= band:
+                cost[i, j] = abs(series[j - 1] - query[i - 1]) + min(cost[i - 1, j], cost[i - 1, j - 1], cost[i, j - 1])
+    return cost[length, length]
+
+
+@pytest.fixture(scope='module')
+def trajectories():
+    return TrajectoryIndex.from_trends(NameTrends.from_names(names_table(random_rows(0))), min_births=0)
+
+
+def test_cosine_ranks_every_name_by_similarity(trajectories):
+    similar = trajectories.similar('N1', n=10)
+
+    query = trajectories.unit[trajectories.name_id('N1')]
+    scores = trajectories.unit @ query
+    order = [i for i in np.argsort(-scores, kind='stable') if trajectories.names[i] != 'N1'][:10]
+    assert similar['preusuel'].tolist() == trajectories.names[order].tolist()
+    np.testing.assert_allclose(similar['similarity'], scores[order], rtol=1e-6)
+    assert similar['rank'].tolist() == list(range(1, 11))
+
+
+@pytest.mark.parametrize('band', [0, 2, 5, 30])
+def test_banded_dtw_matches_a_brute_force_dtw(band):
+    rng = np.random.default_rng(band)
+    query, series = rng.random(21), rng.random((6, 21))
+    expected = [brute_force_dtw(query, row, band) for row in series]
+    np.testing.assert_allclose(dtw_distances(query, series, band), expected)
+
+
+def test_dtw_reranks_the_cosine_shortlist(trajectories):
+    similar = trajectories.similar('N1', n=5, method='dtw', candidates=len(trajectories.names))
+    assert 'N1' not in similar['preusuel'].tolist()
+    assert similar['distance'].is_monotonic_increasing
+
+
+def test_approximate_search_with_a_full_basis_is_exact(trajectories):
+    # With as many components as years, the reduced series keep every cosine
+    full = TrajectoryIndex.from_trends(NameTrends.from_names(names_table(random_rows(0))), min_births=0,
+                                       components=len(trajectories.years))
+    exact = full.similar('N1', n=10)
+    approximate = full.similar('N1', n=10, approximate=True, candidates=11)
+    assert approximate['preusuel'].tolist() == exact['preusuel'].tolist()
+
+
+def test_approximate_candidates_come_from_the_reduced_space(trajectories):
+    similar = trajectories.similar('N1', n=5, approximate=True, candidates=20)
+    reduced = trajectories.reduced @ trajectories.reduced[trajectories.name_id('N1')]
+    shortlist = set(trajectories.names[np.argsort(-reduced, kind='stable')[:20]])
+    assert len(similar) == 5
+    assert set(similar['preusuel']) <= shortlist
+
+
+@pytest.mark.parametrize('n', [0, -3])
+def test_non_positive_sizes_are_rejected(trajectories, n):
+    with pytest.raises(ValueError):
+        trajectories.similar('N1', n=n)
+    assert len(_best(np.arange(5.0), n)) == 0
@@ -0,0 +1,37 @@
+import numpy as np
+
+from conftest import names_table, random_rows
+from namesviz.regional import RegionalProfile
+from namesviz.topk import ranks_within_groups, top_names_per_department
+from namesviz.yearrange import YearRangeIndex
+
+
+def test_ranks_restart_at_every_group():
+    new_group = np.array([True, False, False, True, True, False], dtype=bool)
+    assert ranks_within_groups(new_group).tolist() == [0, 1, 2, 0, 0, 1]
+    assert ranks_within_groups(np.empty(0, dtype=bool)).tolist() == []
+
+
+def test_top_names_per_department_matches_a_groupby():
+    rows = random_rows(0)
+    totals = rows.groupby(['sexe', 'dpt', 'preusuel'], sort=False)['nombre'].sum().reset_index()
+
+    top = top_names_per_department(totals, k=3)
+
+    expected = totals.sort_values('nombre', ascending=False, kind='stable').groupby(['sexe', 'dpt']).head(3)
+    key = ['sexe', 'dpt', 'preusuel']
+    assert top[key].sort_values(key).values.tolist() == expected[key].sort_values(key).values.tolist()
+    assert top.groupby(['sexe', 'dpt'])['rank'].apply(list).map(lambda ranks: ranks == list(range(1, len(ranks) + 1))).all()
+
+
+def test_top_departments_matches_a_groupby():
+    profile = RegionalProfile.from_index(YearRangeIndex.from_names(names_table(random_rows(0))), 1990, 2010,
+                                         ['N1', 'N2', 'N3'])
+
+    top = profile.top_departments(2, 'location_quotient')
+
+    cells = profile.frame()
+    expected = cells.sort_values(['preusuel', 'location_quotient'], ascending=[True, False], kind='stable')
+    expected = expected.groupby('preusuel', observed=True).head(2)
+    assert top[['preusuel', 'dpt']].astype(str).values.tolist() == expected[['preusuel', 'dpt']].astype(str).values.tolist()
+    assert top['rank'].tolist() == [1, 2] * 3
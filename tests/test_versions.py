@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import random_rows, write_csv
+from namesviz.derived import DERIVED
+from namesviz.shared import METADATA, structures_dir
+from namesviz.versions import MANIFEST, DatasetRegistry
+
+
+def arrays(structure):
+    return {key: value for key, value in vars(structure).items() if isinstance(value, np.ndarray)}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return DatasetRegistry(str(tmp_path / 'versions'))
+
+
+def test_structures_are_saved_before_the_version_is_published(registry, tmp_path, monkeypatch):
+    seen = {}
+    write_manifest = registry._write_manifest
+
+    def check_then_write(manifest):
+        if manifest['versions']:
+            directory = structures_dir(os.path.join(registry.root, manifest['versions'][-1]['file']))
+            seen.update({kind: os.path.exists(os.path.join(directory, kind, METADATA)) for kind in DERIVED})
+        write_manifest(manifest)
+
+    monkeypatch.setattr(registry, '_write_manifest', check_then_write)
+    registry.refresh(write_csv(tmp_path / 'names.csv', random_rows(0)))
+
+    assert seen == dict.fromkeys(DERIVED, True)
+    assert os.path.exists(os.path.join(registry.root, MANIFEST))
+
+
+def test_updated_structures_equal_full_builds(registry, tmp_path):
+    rows = random_rows(0)
+    registry.refresh(write_csv(tmp_path / 'v1.csv', rows))
+
+    # Year 2000 rewritten, year 2011 appended
+    changed = pd.concat([rows[rows['annais'] != '2000'], random_rows(1, years=[2000, 2011])])
+    dataset = registry.refresh(write_csv(tmp_path / 'v2.csv', changed))
+    assert dataset['version'] == 2 and dataset['changed_years'] == [2000, 2011]
+
+    names = registry.load(2)
+    rebuilt = {}
+    for kind, build in DERIVED.items():
+        rebuilt[kind] = build(lambda: names, rebuilt.__getitem__)
+        assert os.path.exists(os.path.join(structures_dir(registry.snapshot_path(2)), kind, METADATA))
+        published = registry.structure(2, kind)
+        expected, actual = arrays(rebuilt[kind]), arrays(published)
+        assert expected.keys() == actual.keys()
+        for key in expected:
+            np.testing.assert_allclose(actual[key], expected[key], err_msg=f"{kind}.{key}")
+
+
+def test_refresh_without_prebuild_leaves_structures_to_readers(registry, tmp_path):
+    registry.refresh(write_csv(tmp_path / 'names.csv', random_rows(0)), prebuild=False)
+    assert not os.path.exists(structures_dir(registry.snapshot_path(1)))
+    registry.structure(1, 'ranking')
+    for kind in ('cube', 'ranking'):
+        assert os.path.exists(os.path.join(structures_dir(registry.snapshot_path(1)), kind, METADATA))
+
+
+def test_readers_update_structures_from_the_parent_version(registry, tmp_path):
+    rows = random_rows(0)
+    registry.refresh(write_csv(tmp_path / 'v1.csv', rows))
+    changed = pd.concat([rows[rows['annais'] != '2000'], random_rows(1, years=[2000])])
+    registry.refresh(write_csv(tmp_path / 'v2.csv', changed), prebuild=False)
+
+    names = registry.load(2)
+    rebuilt = {}
+    for kind, build in DERIVED.items():
+        rebuilt[kind] = build(lambda: names, rebuilt.__getitem__)
+    published = registry.structure(2, 'ranking')
+    expected, actual = arrays(rebuilt['ranking']), arrays(published)
+    for key in expected:
+        np.testing.assert_array_equal(actual[key], expected[key], err_msg=key)
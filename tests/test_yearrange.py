@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from conftest import names_table, random_rows
+from namesviz.charts import name_year_frames
+from namesviz.maps import GeometryAsset
+from namesviz.yearrange import YearRangeIndex
+
+
+@pytest.fixture(scope='module')
+def names():
+    return names_table(random_rows(0))
+
+
+@pytest.fixture(scope='module')
+def range_index(names):
+    return YearRangeIndex.from_names(names)
+
+
+def expected_years(names, range_index, name):
+    rows = names[names['preusuel'] == name]
+    table = rows.groupby(['annais', 'dpt'], observed=False)['nombre'].sum().unstack('dpt')
+    return table.reindex(index=range_index.years, columns=range_index.departments, fill_value=0).fillna(0)
+
+
+@pytest.mark.parametrize('name', ['N0', 'N1', 'N150', 'N299'])
+def test_name_department_years_match_a_groupby(names, range_index, name):
+    years = range_index.name_department_years(name)
+    assert years.shape == (len(range_index.years), len(range_index.departments))
+    np.testing.assert_array_equal(years, expected_years(names, range_index, name).to_numpy())
+
+
+def test_animation_frames_cover_every_department_of_the_map(names, range_index):
+    # A department of the map with no births and one code of the data missing from the map
+    codes = [str(dpt) for dpt in range_index.departments[1:]] + ['2A']
+    frames = name_year_frames(range_index, GeometryAsset(None, codes), 'N1')
+
+    assert frames['code'].tolist() == codes
+    expected = expected_years(names, range_index, 'N1')
+    expected.columns = expected.columns.astype(str)
+    for year in (range_index.years[0], range_index.years[-1]):
+        column = frames.set_index('code')[str(year)]
+        assert column['2A'] == 0
+        assert column.drop('2A').tolist() == expected.loc[year, codes[:-1]].astype(int).tolist()